@@ -1,14 +1,16 @@
 from typing import Callable
 import bpy
 from .lib import addon
-from .operator import mark_sharps as mark_sharps_operator
+from .operator import mark_sharps as mark_sharps_operator, export_archive as export_archive_operator, \
+    apply_archive as apply_archive_operator, revert as revert_operator, mark_sharps_edit as mark_sharps_edit_operator
 from .menu import mark_sharps as mark_sharps_menu
 from .panel import preferences as preferences_panel, wrong_version_prefs_panel
 
 if "_LOADED" in locals():
     import importlib
 
-    for mod in (addon, mark_sharps_operator, mark_sharps_menu, preferences_panel, wrong_version_prefs_panel):
+    for mod in (addon, mark_sharps_operator, export_archive_operator, apply_archive_operator, revert_operator,
+                mark_sharps_edit_operator, mark_sharps_menu, preferences_panel, wrong_version_prefs_panel):
         importlib.reload(mod)
 
 _LOADED = True
@@ -25,7 +27,7 @@ bl_info = {
     "version": (0, 1, 1),
     "blender": (3, 6, 0),
     "location": "View3D > Object",
-    "warning": "For use in Blender 3.x/4.0 only. It will not be loaded in newer versions.",
+    "warning": "For use in Blender 3.x/4.0. Newer versions only get sharp-mask archive import.",
     "doc_url": "https://github.com/SuperFLEB/blender_mark_sharps",
     "tracker_url": "https://github.com/SuperFLEB/blender_mark_sharps/issues",
     "support": "COMMUNITY",
@@ -35,20 +37,43 @@ bl_info = {
 # This can be used to register menus (MT) or header items (HT)
 menus: list[tuple[str, Callable]] = [
     ("VIEW3D_MT_editor_menus", addon.menuitem(mark_sharps_menu.mark_sharps_MT_MarkSharps)),
-    ("VIEW3D_MT_object_context_menu", addon.menuitem(mark_sharps_operator.mesh_OT_mark_sharps_selected))
+    ("VIEW3D_MT_object_context_menu", addon.menuitem(mark_sharps_operator.mesh_OT_mark_sharps_selected,
+                                                     "INVOKE_DEFAULT")),
+    ("VIEW3D_MT_edit_mesh_context_menu", addon.menuitem(mark_sharps_edit_operator.mesh_OT_mark_sharps_edit_selected)),
+    ("TOPBAR_MT_file_export", addon.menuitem(export_archive_operator.mesh_OT_mark_sharps_export_archive,
+                                             "INVOKE_DEFAULT")),
+    ("TOPBAR_MT_file_import", addon.menuitem(apply_archive_operator.mesh_OT_mark_sharps_apply_archive,
+                                             "INVOKE_DEFAULT")),
 ]
 
 registerable_modules = [
     mark_sharps_operator,
+    export_archive_operator,
+    apply_archive_operator,
+    revert_operator,
+    mark_sharps_edit_operator,
     mark_sharps_menu,
     preferences_panel,
 ]
 
+# Sharp-mask archives exported from older versions can still be applied in versions too new for the rest of the addon
+unsupported_version_menus: list[tuple[str, Callable]] = [
+    ("TOPBAR_MT_file_import", addon.menuitem(apply_archive_operator.mesh_OT_mark_sharps_apply_archive,
+                                             "INVOKE_DEFAULT")),
+]
+
+unsupported_version_modules = [
+    apply_archive_operator,
+    wrong_version_prefs_panel,
+]
+
 
 def register() -> None:
     if not is_supported_blender_version:
-        print("Mark Sharps: This Blender version is too new for this addon. Skipping registration except prefs panel.")
-        addon.register_classes([wrong_version_prefs_panel])
+        print("Mark Sharps: This Blender version is too new for this addon. Skipping registration except prefs panel "
+              "and sharp-mask archive import.")
+        addon.register_classes(unsupported_version_modules)
+        addon.register_menus(unsupported_version_menus)
         return
     addon.warn_unregisterable(registerable_modules)
     addon.register_classes(registerable_modules)
@@ -57,9 +82,10 @@ def register() -> None:
 
 def unregister() -> None:
     if not is_supported_blender_version:
-        print("Mark Sharps: This Blender version is too new for this addon, so only the prefs panel was registered. ",
-              "Unregistering prefs panel.")
-        addon.unregister_classes([wrong_version_prefs_panel])
+        print("Mark Sharps: This Blender version is too new for this addon, so only the prefs panel and sharp-mask "
+              "archive import were registered. Unregistering them.")
+        addon.unregister_menus(unsupported_version_menus)
+        addon.unregister_classes(unsupported_version_modules)
         return
     addon.unregister_menus(menus)
     addon.unregister_classes(registerable_modules)
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+"""
+Headless batch converter. Runs "Mark Sharps in File" on many .blend files, spread across a pool of background Blender
+processes, each fed files from a shared queue. Workers that crash or hang are restarted without stopping the batch.
+
+This script runs outside of Blender and only uses the standard library:
+
+    python batch_convert.py /path/to/blends --blender /path/to/blender --results results.jsonl
+
+With --scan-index, files are first scanned without Blender (see blend_scan.py): files without any Auto Smooth meshes are
+skipped, and the rest are converted most expensive first. Scan results are kept in the index file for the next batch.
+
+With --analyze, files are only analyzed (see batch_worker.py), and not changed. Each file's totals go in its result
+record.
+
+Each worker is "blender -b --python batch_worker.py" by default. Use --worker-command to run something else that speaks
+the same line protocol (e.g. tools/fake_batch_worker.py, for testing).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from math import radians
+from pathlib import Path
+from typing import Any, Iterable, TextIO
+
+try:
+    # Imported from the addon package (e.g. by the worker, or the operators)
+    from . import blend_scan
+except ImportError:
+    # Run as a script
+    import blend_scan
+
+# Worker messages are lines of JSON starting with this, to pick them out of Blender's own console output
+PROTOCOL_PREFIX = "@@mark_sharps "
+
+ADDON_DIR = Path(__file__).resolve().parents[1]
+WORKER_SCRIPT = Path(__file__).resolve().with_name("batch_worker.py")
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerTimeout(WorkerError):
+    pass
+
+
+class WorkerExited(WorkerError):
+    pass
+
+
+def emit(message: dict[str, Any], stream: TextIO = None) -> None:
+    """Write a protocol message. Used by workers."""
+    stream = stream or sys.stdout
+    stream.write(PROTOCOL_PREFIX + json.dumps(message) + "\n")
+    stream.flush()
+
+
+def output_path(path: str, output_dir: str) -> Path:
+    """Where to save the converted file in the output directory. Files from different directories may share a name,
+    so they are told apart by a hash of the full path (as batch_worker.py names analysis files). Links are followed,
+    so the same file always has the same output path."""
+    resolved = Path(path).resolve()
+    digest = hashlib.sha1(str(resolved).encode()).hexdigest()[:8]
+    return Path(output_dir, f"{resolved.stem}-{digest}{resolved.suffix}")
+
+
+@dataclass
+class FileResult:
+    path: str
+    status: str
+    attempts: int
+    seconds: float
+    worker: int
+    details: dict[str, Any] = field(default_factory=dict)
+
+
+class WorkerProcess:
+    """One running worker process, sent one file at a time over stdin and answering over stdout"""
+
+    def __init__(self, command: list[str], startup_timeout: float, verbose: bool = False):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=None if verbose else subprocess.DEVNULL, text=True, bufsize=1)
+        self.messages = queue.Queue()
+        self.verbose = verbose
+        threading.Thread(target=self._read, daemon=True).start()
+        try:
+            ready = self._receive(startup_timeout)
+        except WorkerError:
+            self.kill()
+            raise
+        if ready.get("event") != "ready":
+            self.kill()
+            raise WorkerError(f"Worker did not start: {ready}")
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            if line.startswith(PROTOCOL_PREFIX):
+                try:
+                    self.messages.put(json.loads(line[len(PROTOCOL_PREFIX):]))
+                except json.JSONDecodeError:
+                    pass
+            elif self.verbose:
+                sys.stderr.write(line)
+        # End of output means the process is gone
+        self.messages.put(None)
+
+    def _receive(self, timeout: float) -> dict[str, Any]:
+        try:
+            message = self.messages.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"No response in {timeout} seconds")
+        if message is None:
+            self.process.wait()
+            raise WorkerExited(f"Worker exited with code {self.process.returncode}")
+        return message
+
+    def request(self, message: dict[str, Any], timeout: float) -> dict[str, Any]:
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise WorkerExited("Worker closed its input")
+        return self._receive(timeout)
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+    def stop(self, timeout: float = 10) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class BatchRunner:
+    """Feeds files from a shared queue to a pool of worker processes, restarting workers that die or hang. With
+    follow_libraries, library files that workers report meshes linked from are added to the queue, each once. With
+    output_dir, converted files are saved there (see output_path) instead of over the originals, and a file whose
+    output path is already taken by another file is failed without being converted. The two can't be combined, as the
+    converted files would still link the original libraries rather than their converted copies. run converts the files and waits
+    for them; start converts them in the background, for callers that can't wait (e.g. a modal operator), which can
+    check finished and progress, and cancel."""
+
+    def __init__(self, worker_command: list[str], jobs: int, timeout: float, startup_timeout: float = 120,
+                 retries: int = 1, results: TextIO = None, verbose: bool = False, follow_libraries: bool = False,
+                 output_dir: str = None):
+        if follow_libraries and output_dir:
+            raise ValueError("Libraries can't be followed when saving to an output directory")
+        self.worker_command = worker_command
+        self.jobs = max(1, jobs)
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.retries = retries
+        self.results_stream = results
+        self.verbose = verbose
+        self.follow_libraries = follow_libraries
+        self.output_dir = output_dir
+        self.results: list[FileResult] = []
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Every file queued, so each is converted once however many files link it
+        self._queued: set[str] = set()
+        # The file each output path is claimed by
+        self._outputs: dict[Path, str] = {}
+        # Files taken from the queue and not yet finished, which may still add libraries to it
+        self._active = 0
+        self._threads: list[threading.Thread] = []
+        self._cancelled = threading.Event()
+        # Each slot's current worker, so cancel can stop them
+        self._workers: dict[int, WorkerProcess] = {}
+
+    def _enqueue(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        with self._lock:
+            if path in self._queued:
+                return False
+            self._queued.add(path)
+            if self.output_dir:
+                output = output_path(path, self.output_dir)
+                claimed = self._outputs.setdefault(output, path)
+        if self.output_dir and claimed != path:
+            # e.g. the same file by two paths, through a link. Converting both would save one over the other.
+            self._record(FileResult(path=path, status="failed", attempts=0, seconds=0, worker=-1,
+                                    details={"error": f"Output path {output} is already used by {claimed}"}))
+            return False
+        self._queue.put((path, 1))
+        return True
+
+    def _take(self) -> tuple[str, int] | None:
+        """Get the next file to convert, or None once the queue is empty and no file in progress can add to it"""
+        while not self._cancelled.is_set():
+            with self._lock:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    if not self._active:
+                        return None
+                    item = None
+                else:
+                    self._active += 1
+                    return item
+            time.sleep(0.05)
+        return None
+
+    def _done(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def _record(self, result: FileResult) -> None:
+        with self._lock:
+            self.results.append(result)
+            if self.results_stream:
+                self.results_stream.write(json.dumps(asdict(result)) + "\n")
+                self.results_stream.flush()
+            if self.verbose or result.status != "ok":
+                print(f"[{len(self.results)}] {result.status}: {result.path}", file=sys.stderr)
+
+    def _run_slot(self, slot: int) -> None:
+        worker = None
+        while (item := self._take()) is not None:
+            path, attempt = item
+            start = time.perf_counter()
+            try:
+                if worker is None:
+                    worker = WorkerProcess(self.worker_command, self.startup_timeout, self.verbose)
+                    with self._lock:
+                        self._workers[slot] = worker
+                    if self._cancelled.is_set():
+                        # Cancelled while it was starting
+                        worker.kill()
+                request = {"path": path}
+                if self.output_dir:
+                    request["output"] = str(output_path(path, self.output_dir))
+                reply = worker.request(request, self.timeout)
+                status = reply.get("status", "failed")
+                details = {k: v for k, v in reply.items() if k not in ("event", "path", "status")}
+            except WorkerTimeout as e:
+                if worker is not None:
+                    worker.kill()
+                worker = None
+                status, details = "timeout", {"error": str(e)}
+            except (WorkerError, OSError) as e:
+                worker = None
+                status, details = "crashed", {"error": str(e)}
+
+            if status != "ok" and self._cancelled.is_set():
+                status, details = "cancelled", {}
+            elif status != "ok" and attempt <= self.retries:
+                self._queue.put((path, attempt + 1))
+                self._done()
+                continue
+            if self.follow_libraries:
+                for library in details.get("libraries", []):
+                    if os.path.isfile(library) and self._enqueue(library) and self.verbose:
+                        print(f"Added library {library} (linked from {path})", file=sys.stderr)
+            self._record(FileResult(path=path, status=status, attempts=attempt,
+                                    seconds=round(time.perf_counter() - start, 3), worker=slot, details=details))
+            self._done()
+
+        if worker is not None:
+            worker.stop()
+
+    def start(self, paths: Iterable[str]) -> None:
+        """Start converting the files in the background"""
+        for path in paths:
+            self._enqueue(str(path))
+        # Libraries found along the way may need more workers than the files given, so start the pool at full size
+        # when following them
+        slots = self.jobs if self.follow_libraries else min(self.jobs, self._queue.qsize())
+        self._threads = [threading.Thread(target=self._run_slot, args=(slot,)) for slot in range(slots)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def finished(self) -> bool:
+        return not any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the files queued so far that are finished"""
+        with self._lock:
+            return len(self.results) / len(self._queued) if self._queued else 1.0
+
+    def cancel(self) -> None:
+        """Stop converting. Files not started yet are left out, and files being converted are stopped and recorded as
+        cancelled (Blender saves to a temporary file and renames it, so a stopped file is left as it was)."""
+        self._cancelled.set()
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.kill()
+
+    def wait(self) -> list[FileResult]:
+        for thread in self._threads:
+            thread.join()
+        return self.results
+
+    def run(self, paths: Iterable[str]) -> list[FileResult]:
+        self.start(paths)
+        return self.wait()
+
+
+def find_blend_files(sources: Iterable[str]) -> list[Path]:
+    """Expand directories (recursively) and manifests (text files listing one path per line) into .blend file paths"""
+    found = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            found += sorted(p for p in source.rglob("*.blend") if p.is_file())
+        elif source.suffix == ".blend":
+            found.append(source)
+        else:
+            with open(source, "r") as manifest:
+                lines = [line.strip() for line in manifest]
+            found += [Path(line) for line in lines if line and not line.startswith("#")]
+    return list(dict.fromkeys(p.resolve() for p in found))
+
+
+def select_files(paths: list[Path], index_path: str, jobs: int, libraries: bool = False) -> list[Path]:
+    """Scan the files (reusing indexed results), leaving out files with nothing to convert, and order the rest by
+    estimated cost, most expensive first, so the longest files don't start last. With libraries, the library files
+    the files link from (and those link from, and so on) are added, each once."""
+    index = blend_scan.ScanIndex(index_path)
+    results = index.scan(paths, jobs)
+    if libraries:
+        scanned = {result.path for result in results}
+        found = results
+        while found:
+            new = {library for result in found for library in result.libraries
+                   if library not in scanned and os.path.isfile(library)}
+            scanned |= new
+            found = index.scan(sorted(new), jobs)
+            results += found
+    index.save()
+    selected = sorted((result for result in results if result.needs_work), key=lambda result: result.cost,
+                      reverse=True)
+    unscanned = sum(result.error is not None for result in selected)
+    print(f"Mark Sharps: {len(selected)} of {len(results)} files to convert, estimated "
+          f"{sum(result.cost for result in selected):,.0f}s of work"
+          f"{f' ({unscanned} could not be scanned, and are converted anyway)' if unscanned else ''}")
+    return [Path(result.path) for result in selected]
+
+
+def operator_options(args: argparse.Namespace) -> dict[str, Any]:
+    """Build the mesh.mark_sharps_file operator properties from the command line arguments"""
+    options = {
+        "retain": args.retain,
+        "include_single_edges": not args.no_single_edges,
+        "crank_auto_smooth": args.crank_auto_smooth,
+        "engine": args.engine,
+    }
+    if args.engine == "LOW_MEMORY":
+        options["memory_limit"] = args.memory_limit
+    if args.analyze:
+        options["analyze"] = True
+    if args.disk_cache:
+        options["disk_cache_dir"] = str(Path(args.disk_cache).resolve())
+        options["disk_cache_size"] = args.disk_cache_size
+    if args.angle is not None:
+        options["override_angle"] = True
+        options["override_angle_value"] = radians(args.angle)
+    return options
+
+
+def worker_command(blender: str, custom_command: str | None, options: dict[str, Any],
+                   analysis_dir: str = None) -> list[str]:
+    command = shlex.split(custom_command) if custom_command else \
+        [blender, "-b", "--factory-startup", "-noaudio", "--python", str(WORKER_SCRIPT)]
+    command += ["--", "--addon-path", str(ADDON_DIR.parent), "--addon-name", ADDON_DIR.name,
+                "--options", json.dumps(options)]
+    if analysis_dir:
+        command += ["--analysis-dir", str(Path(analysis_dir).resolve())]
+    return command
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mark sharp edges created by Auto Smooth in many .blend files")
+    parser.add_argument("sources", nargs="+", help="Directories to search for .blend files, .blend files, "
+                                                   "or manifest files listing one .blend path per line")
+    parser.add_argument("--blender", default="blender", help="Blender executable (default: blender)")
+    parser.add_argument("--worker-command", help="Run this command as a worker instead of Blender")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to allow per file before restarting "
+                                                                  "the worker (default: 600)")
+    parser.add_argument("--retries", type=int, default=1, help="Retries for a file that fails, crashes or hangs")
+    parser.add_argument("--results", default="mark_sharps_results.jsonl",
+                        help="Per-file result records are written here, one JSON object per line")
+    parser.add_argument("--output-dir", help="Save converted files here instead of overwriting them, each named "
+                                             "NAME-HASH.blend, with a hash of its original path")
+    parser.add_argument("--retain", choices=["CLEAR_ALL", "RETAIN_SHARP", "RETAIN_SMOOTH"], default="CLEAR_ALL")
+    parser.add_argument("--no-single-edges", action="store_true", help="Don't mark single (non-manifold) edges")
+    parser.add_argument("--crank-auto-smooth", action="store_true", help="Set Auto Smooth angle to 180°")
+    parser.add_argument("--angle", type=float, help="Override the Auto Smooth angle (degrees)")
+    parser.add_argument("--engine", choices=["BMESH", "NUMPY", "LOW_MEMORY"], default="NUMPY")
+    parser.add_argument("--memory-limit", type=int, default=1024,
+                        help="Memory limit per mesh of the LOW_MEMORY engine, in MB (0 for none)")
+    parser.add_argument("--convert-libraries", action="store_true",
+                        help="Also convert the library files that meshes with Auto Smooth are linked from, each once "
+                             "however many files link it (linked meshes can't be converted in the files linking them)")
+    parser.add_argument("--disk-cache", help="Share calculated sharp edges between all workers and batches through a "
+                                             "disk cache in this directory, so meshes reused across files are only "
+                                             "calculated once")
+    parser.add_argument("--disk-cache-size", type=int, default=4096, help="Size limit of the disk cache, in MB")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Only analyze what would change in each file, without changing or saving it")
+    parser.add_argument("--analysis-dir", help="Write per-file analyses here instead of next to each file")
+    parser.add_argument("--scan-index", help="Scan files without Blender first, skipping files without Auto Smooth "
+                                             "meshes, and keep the scan results in this JSON file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show worker output and every result")
+    args = parser.parse_args(argv)
+    if args.convert_libraries and args.output_dir and not args.analyze:
+        # The copies saved in the output directory would still link the original, unconverted libraries
+        parser.error("--convert-libraries can't be combined with --output-dir: files saved to the output directory "
+                     "would still link the original libraries, not their converted copies")
+    return args
+
+
+def main(argv: list[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    paths = find_blend_files(args.sources)
+    if args.scan_index:
+        paths = select_files(paths, args.scan_index, args.jobs, args.convert_libraries)
+    command = worker_command(args.blender, args.worker_command, operator_options(args), args.analysis_dir)
+    if args.analysis_dir:
+        Path(args.analysis_dir).mkdir(parents=True, exist_ok=True)
+    output_dir = str(Path(args.output_dir).resolve()) if args.output_dir and not args.analyze else None
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    with open(args.results, "a") as results_file:
+        # Libraries are found by the scan when there is one, and otherwise reported by the workers as they go
+        runner = BatchRunner(command, jobs=args.jobs, timeout=args.timeout, retries=args.retries,
+                             results=results_file, verbose=args.verbose,
+                             follow_libraries=args.convert_libraries and not args.scan_index, output_dir=output_dir)
+        results = runner.run(paths)
+
+    failed = [r for r in results if r.status != "ok"]
+    action = "Analyzed" if args.analyze else "Converted"
+    print(f"Mark Sharps: {action} {len(results) - len(failed)} of {len(results)} files. "
+          f"Results written to {args.results}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Batch conversion worker, run inside a background Blender by batch_convert.py:
+
+    blender -b --factory-startup --python batch_worker.py -- --addon-path DIR --addon-name NAME --options JSON
+
+It loads the addon, then reads one JSON request ({"path": ..., "output": ...}) per line from stdin. For each, it opens
+the file, runs the mesh.mark_sharps_file operator, saves (to the output path, if the request has one), and answers
+with a protocol message on stdout. It exits when stdin closes.
+Meshes linked from libraries are left alone, and the library files they come from are listed in the answer, so that
+batch_convert.py --convert-libraries can convert them instead.
+
+With the analyze option, files are analyzed instead of converted: each file's analysis is streamed to
+FILE.analysis.jsonl (next to the file, or in --analysis-dir), its totals are included in the answer, and nothing is
+saved.
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import sys
+import time
+import traceback
+from pathlib import Path
+from types import ModuleType
+
+import bpy
+
+
+def parse_args() -> argparse.Namespace:
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--addon-path", required=True)
+    parser.add_argument("--addon-name", required=True)
+    parser.add_argument("--options", default="{}")
+    parser.add_argument("--analysis-dir")
+    return parser.parse_args(argv)
+
+
+def analysis_path(path: str, analysis_dir: str | None) -> Path:
+    if not analysis_dir:
+        return Path(path + ".analysis.jsonl")
+    # Files from different directories may share a name, so tell them apart by a hash of the full path
+    digest = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()[:8]
+    return Path(analysis_dir, f"{Path(path).stem}-{digest}.analysis.jsonl")
+
+
+def analyze(path: str, options: dict, analysis_dir: str | None) -> dict:
+    bpy.ops.wm.open_mainfile(filepath=path, load_ui=False)
+    report = analysis_path(path, analysis_dir)
+    result = bpy.ops.mesh.mark_sharps_file("EXEC_DEFAULT", **options, analysis_path=str(report))
+    if "FINISHED" not in result:
+        return {"status": "failed", "error": f"Operator returned {set(result)}"}
+    with open(report, "r", encoding="utf-8") as lines:
+        summary = json.loads(lines.readlines()[-1])
+    if summary.get("type") != "summary":
+        return {"status": "failed", "error": f"The analysis in {report} is incomplete"}
+    del summary["type"]
+    return {"status": "ok", "analysis": str(report), **summary}
+
+
+def convert(path: str, options: dict, output: str | None, library_lib: ModuleType) -> dict:
+    bpy.ops.wm.open_mainfile(filepath=path, load_ui=False)
+    meshes = sum(1 for mesh in bpy.data.meshes if mesh.use_auto_smooth and mesh.library is None)
+    # Linked meshes are skipped by the operator, and reported so the batch can convert their libraries instead
+    libraries = sorted(library_lib.linked_libraries(bpy.data.meshes))
+    result = bpy.ops.mesh.mark_sharps_file("EXEC_DEFAULT", **options)
+    if "FINISHED" not in result:
+        return {"status": "failed", "error": f"Operator returned {set(result)}"}
+
+    bpy.ops.wm.save_as_mainfile(filepath=output or path, check_existing=False, copy=output is not None)
+    return {"status": "ok", "meshes": meshes, "libraries": libraries, "output": output or path}
+
+
+def main() -> None:
+    args = parse_args()
+    sys.path.insert(0, args.addon_path)
+    addon = importlib.import_module(args.addon_name)
+    addon.register()
+    protocol = importlib.import_module(f"{args.addon_name}.cli.batch_convert")
+    library_lib = importlib.import_module(f"{args.addon_name}.lib.library")
+    options = json.loads(args.options)
+
+    protocol.emit({"event": "ready"})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        start = time.perf_counter()
+        try:
+            if options.get("analyze"):
+                reply = analyze(request["path"], options, args.analysis_dir)
+            else:
+                reply = convert(request["path"], options, request.get("output"), library_lib)
+        except Exception as e:
+            reply = {"status": "failed", "error": str(e), "traceback": traceback.format_exc()}
+        reply.update({"event": "done", "path": request["path"], "seconds": round(time.perf_counter() - start, 3)})
+        protocol.emit(reply)
+
+
+main()
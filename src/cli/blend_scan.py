@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+
+"""
+Blender-free .blend scanner. Reads the Mesh blocks of .blend files directly, using the struct layouts (SDNA) stored in
+each file, to find out whether a file has any meshes with Auto Smooth on (and so anything for Mark Sharps to do) and
+roughly how long converting it would take, without starting Blender:
+
+    python blend_scan.py /path/to/blends --index scan_index.json
+
+Uncompressed files are memory-mapped and only their block headers and Mesh blocks are read. Compressed files are
+decompressed as a stream (gzip with the standard library; Zstandard, used by Blender 3.0+, with compression.zstd on
+Python 3.14+ or the zstandard package). Results are kept in an index keyed by path, modification time and size, so
+unchanged files aren't scanned again. batch_convert.py --scan-index uses it to only convert files that need it. The
+library files a file links from are listed too, so they can be converted themselves.
+
+This script only uses the standard library (plus zstandard, if installed).
+"""
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Mesh.flag bit of Auto Smooth (ME_AUTOSMOOTH in DNA_mesh_types.h)
+ME_AUTOSMOOTH = 1 << 5
+# Mesh fields by their DNA names, which have changed between Blender versions
+EDGES_FIELDS = ("totedge", "edges_num")
+POLYS_FIELDS = ("totpoly", "polys_num", "faces_num")
+LOOPS_FIELDS = ("totloop", "corners_num")
+ANGLE_FIELDS = ("smoothresh", "smoothresh_legacy")
+# Library file path field (called name before Blender 2.93)
+LIBRARY_PATH_FIELDS = ("filepath", "name")
+
+# The NumPy engine's cost model from lib/planner.py (which needs Blender to import), in seconds
+MESH_OVERHEAD = 150e-6
+LOOP_COST = 0.15e-6
+EDGE_COST = 0.12e-6
+# Rough cost of opening and saving a file in a worker, in seconds, added to each file's estimate
+FILE_OVERHEAD = 0.5
+
+INDEX_VERSION = 2
+
+# struct format characters of the DNA types the Mesh fields use
+_TYPE_FORMATS = {
+    "char": "b", "uchar": "B", "int8_t": "b", "uint8_t": "B",
+    "short": "h", "ushort": "H", "int16_t": "h", "uint16_t": "H",
+    "int": "i", "uint": "I", "int32_t": "i", "uint32_t": "I",
+    "float": "f",
+}
+
+
+class BlendScanError(Exception):
+    pass
+
+
+@dataclass
+class MeshInfo:
+    name: str
+    auto_smooth: bool
+    # Auto Smooth angle, in radians
+    angle: float
+    edges: int
+    polys: int
+    loops: int
+
+    @property
+    def needs_work(self) -> bool:
+        return self.auto_smooth and self.polys > 0
+
+    @property
+    def cost(self) -> float:
+        return MESH_OVERHEAD + self.loops * LOOP_COST + self.edges * EDGE_COST
+
+
+@dataclass
+class ScanResult:
+    path: str
+    mtime_ns: int
+    size: int
+    # Blender version that saved the file, e.g. "306"
+    version: str | None = None
+    compression: str | None = None
+    meshes: list[MeshInfo] = field(default_factory=list)
+    # Absolute paths of the library files the file links from
+    libraries: list[str] = field(default_factory=list)
+    # Why the file couldn't be scanned, or None if it was
+    error: str | None = None
+
+    @property
+    def needs_work(self) -> bool:
+        """Whether converting the file might do anything. Files that couldn't be scanned might, too."""
+        return self.error is not None or any(mesh.needs_work for mesh in self.meshes)
+
+    @property
+    def cost(self) -> float:
+        """Estimated seconds to convert the file"""
+        return FILE_OVERHEAD + sum(mesh.cost for mesh in self.meshes if mesh.needs_work)
+
+    @classmethod
+    def from_dict(cls, record: dict[str, Any]) -> "ScanResult":
+        return cls(**{**record, "meshes": [MeshInfo(**mesh) for mesh in record.get("meshes", [])]})
+
+
+@dataclass
+class StructField:
+    type: str
+    offset: int
+    size: int
+
+
+class Sdna:
+    """The struct layouts stored in a file's DNA1 block"""
+
+    def __init__(self, data: bytes, endian: str, pointer_size: int):
+        self.endian = endian
+        self.pointer_size = pointer_size
+        self._layouts: dict[int, dict[str, StructField]] = {}
+        if data[:4] != b"SDNA":
+            raise BlendScanError("Bad SDNA block")
+        position = 4
+        self.names, position = self._read_strings(data, position, b"NAME")
+        self.types, position = self._read_strings(data, position, b"TYPE")
+        position = self._expect(data, position, b"TLEN")
+        self.type_sizes = struct.unpack_from(f"{endian}{len(self.types)}H", data, position)
+        position = self._align(position + 2 * len(self.types))
+        position = self._expect(data, position, b"STRC")
+        (count,) = struct.unpack_from(f"{endian}i", data, position)
+        position += 4
+        # Each struct is its type, then a (type, name) pair per field
+        self.structs: list[tuple[int, list[tuple[int, int]]]] = []
+        for _ in range(count):
+            struct_type, field_count = struct.unpack_from(f"{endian}2h", data, position)
+            fields = struct.unpack_from(f"{endian}{2 * field_count}h", data, position + 4)
+            self.structs.append((struct_type, list(zip(fields[::2], fields[1::2]))))
+            position += 4 + 4 * field_count
+        self._struct_by_type = {struct_type: index for index, (struct_type, _) in enumerate(self.structs)}
+
+    @staticmethod
+    def _align(position: int) -> int:
+        return (position + 3) & ~3
+
+    @staticmethod
+    def _expect(data: bytes, position: int, tag: bytes) -> int:
+        if data[position:position + 4] != tag:
+            raise BlendScanError(f"Bad SDNA block: expected {tag.decode()}")
+        return position + 4
+
+    def _read_strings(self, data: bytes, position: int, tag: bytes) -> tuple[list[str], int]:
+        position = self._expect(data, position, tag)
+        (count,) = struct.unpack_from(f"{self.endian}i", data, position)
+        position += 4
+        strings = []
+        for _ in range(count):
+            end = data.index(b"\0", position)
+            strings.append(data[position:end].decode("latin-1"))
+            position = end + 1
+        return strings, self._align(position)
+
+    def struct_name(self, index: int) -> str:
+        return self.types[self.structs[index][0]]
+
+    def layout(self, index: int) -> dict[str, StructField]:
+        """The fields of a struct by (bare) name. Fields are packed in order: DNA structs have explicit padding."""
+        if index not in self._layouts:
+            fields = {}
+            offset = 0
+            for type_index, name_index in self.structs[index][1]:
+                name = self.names[name_index]
+                pointer = name.startswith("*") or name.startswith("(*")
+                size = self.pointer_size if pointer else self.type_sizes[type_index]
+                for dimension in re.findall(r"\[(\d+)\]", name):
+                    size *= int(dimension)
+                bare = re.match(r"\(?\**(\w+)", name).group(1)
+                fields[bare] = StructField("pointer" if pointer else self.types[type_index], offset, size)
+                offset += size
+            self._layouts[index] = fields
+        return self._layouts[index]
+
+    def struct_index(self, type_name: str) -> int | None:
+        try:
+            return self._struct_by_type.get(self.types.index(type_name))
+        except ValueError:
+            return None
+
+
+def _open(path: str, magic: bytes) -> tuple[BinaryIO, str | None]:
+    """Open a .blend file for sequential reading, decompressing it as it's read if it's compressed"""
+    if magic[:2] == GZIP_MAGIC:
+        return gzip.open(path, "rb"), "gzip"
+    if magic == ZSTD_MAGIC:
+        try:
+            # Python 3.14+
+            from compression import zstd
+            return zstd.ZstdFile(path, "rb"), "zstd"
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise BlendScanError("Zstandard-compressed, and reading it needs Python 3.14+ or the zstandard package")
+        # Blender writes Zstandard files as many frames (for seeking), so keep reading across them
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True), "zstd"
+    with open(path, "rb") as file:
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), None
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise BlendScanError("Truncated file")
+    return data
+
+
+def _read_field(data: bytes, base: int, layout: dict[str, StructField], names: Iterable[str],
+                endian: str) -> int | float | None:
+    for name in names:
+        found = layout.get(name)
+        if found is not None and found.type in _TYPE_FORMATS:
+            return struct.unpack_from(endian + _TYPE_FORMATS[found.type], data, base + found.offset)[0]
+    return None
+
+
+def _mesh_info(data: bytes, sdna: Sdna, index: int) -> MeshInfo:
+    layout = sdna.layout(index)
+    id_field = layout["id"]
+    name_field = sdna.layout(sdna.struct_index("ID"))["name"]
+    name_start = id_field.offset + name_field.offset
+    # ID names start with the two-letter type code
+    name = data[name_start + 2:name_start + name_field.size].split(b"\0", 1)[0].decode("utf-8", "replace")
+    endian = sdna.endian
+    flag = _read_field(data, 0, layout, ("flag",), endian) or 0
+    return MeshInfo(
+        name=name,
+        auto_smooth=bool(flag & ME_AUTOSMOOTH),
+        angle=_read_field(data, 0, layout, ANGLE_FIELDS, endian) or 0.0,
+        edges=_read_field(data, 0, layout, EDGES_FIELDS, endian) or 0,
+        polys=_read_field(data, 0, layout, POLYS_FIELDS, endian) or 0,
+        loops=_read_field(data, 0, layout, LOOPS_FIELDS, endian) or 0,
+    )
+
+
+def _library_path(data: bytes, sdna: Sdna, index: int, blend_path: str) -> str | None:
+    layout = sdna.layout(index)
+    for name in LIBRARY_PATH_FIELDS:
+        found = layout.get(name)
+        if found is not None and found.type == "char" and found.size > 1:
+            path = data[found.offset:found.offset + found.size].split(b"\0", 1)[0].decode("utf-8", "replace")
+            if not path:
+                return None
+            # Library paths starting with // are relative to the linking file. (Blender stores indirectly linked
+            # libraries' paths relative to it too, when it saves the file.)
+            if path.startswith("//"):
+                path = os.path.join(os.path.dirname(os.path.abspath(blend_path)), path[2:])
+            # Files saved on Windows have backslashes, which normpath only turns into separators on Windows
+            return os.path.normpath(path.replace("\\", "/"))
+    return None
+
+
+def scan_file(path: str) -> ScanResult:
+    """Scan a .blend file's meshes. Errors are recorded in the result rather than raised."""
+    stat = os.stat(path)
+    result = ScanResult(str(path), stat.st_mtime_ns, stat.st_size)
+    try:
+        _scan(path, result)
+    except (OSError, ValueError, KeyError, TypeError, IndexError, struct.error, BlendScanError) as e:
+        result.error = str(e) or type(e).__name__
+        result.meshes = []
+        result.libraries = []
+    return result
+
+
+def _scan(path: str, result: ScanResult) -> None:
+    if result.size == 0:
+        raise BlendScanError("Empty file")
+    with open(path, "rb") as file:
+        magic = file.read(4)
+    stream, result.compression = _open(path, magic)
+    with stream:
+        header = _read_exactly(stream, 12)
+        if header[:7] != b"BLENDER":
+            raise BlendScanError("Not a .blend file")
+        if header[7:9].isdigit():
+            # The newer header (BLENDER17-01v0500) is only written by versions without Auto Smooth, which convert it to
+            # a modifier on loading
+            result.version = _read_exactly(stream, 5)[1:].decode("ascii")
+            return
+        pointer_size = {b"_": 4, b"-": 8}.get(header[7:8])
+        endian = {b"v": "<", b"V": ">"}.get(header[8:9])
+        if pointer_size is None or endian is None:
+            raise BlendScanError("Unrecognized .blend header")
+        result.version = header[9:12].decode("ascii")
+        # Block header: code, data length, old address, SDNA struct index, struct count
+        block_header = struct.Struct(endian + ("4siIii" if pointer_size == 4 else "4siQii"))
+
+        # The SDNA comes at the end of the file, so Mesh blocks (which are small) are kept until it has been read
+        mesh_blocks: list[tuple[int, bytes]] = []
+        library_blocks: list[tuple[int, bytes]] = []
+        sdna = None
+        while True:
+            code, length, _, sdna_index, _ = block_header.unpack(_read_exactly(stream, block_header.size))
+            if code == b"ENDB":
+                break
+            if code == b"ME\0\0":
+                mesh_blocks.append((sdna_index, _read_exactly(stream, length)))
+            elif code == b"LI\0\0":
+                library_blocks.append((sdna_index, _read_exactly(stream, length)))
+            elif code == b"DNA1":
+                sdna = Sdna(_read_exactly(stream, length), endian, pointer_size)
+            else:
+                stream.seek(length, os.SEEK_CUR)
+    if sdna is None:
+        raise BlendScanError("No SDNA block")
+    result.meshes = [_mesh_info(data, sdna, sdna_index) for sdna_index, data in mesh_blocks
+                     if sdna.struct_name(sdna_index) == "Mesh"]
+    libraries = (_library_path(data, sdna, sdna_index, path) for sdna_index, data in library_blocks
+                 if sdna.struct_name(sdna_index) == "Library")
+    result.libraries = list(dict.fromkeys(library for library in libraries if library))
+
+
+class ScanIndex:
+    """Scan results by path, loaded from and saved to a JSON file. A result is reused as long as its file's
+    modification time and size are unchanged."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.results: dict[str, ScanResult] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == INDEX_VERSION:
+                self.results = {key: ScanResult.from_dict(record) for key, record in data["files"].items()}
+
+    def get(self, path: str) -> ScanResult | None:
+        result = self.results.get(str(path))
+        if result is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return result if (result.mtime_ns, result.size) == (stat.st_mtime_ns, stat.st_size) else None
+
+    def scan(self, paths: Iterable[str], jobs: int = 1) -> list[ScanResult]:
+        """Get the results of the files, scanning those not in the index (or changed since), in a pool of threads"""
+        paths = [str(path) for path in paths]
+        cached = {path: self.get(path) for path in paths}
+        to_scan = [path for path, result in cached.items() if result is None]
+        with ThreadPoolExecutor(max(1, jobs)) as pool:
+            for result in pool.map(scan_file, to_scan):
+                cached[result.path] = self.results[result.path] = result
+        return [cached[path] for path in paths]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        data = {"version": INDEX_VERSION, "files": {key: asdict(result) for key, result in self.results.items()}}
+        # Write then rename, so an interrupted save doesn't lose the index
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Find which .blend files have meshes with Auto Smooth on, "
+                                                 "without starting Blender")
+    parser.add_argument("paths", nargs="+", help=".blend files")
+    parser.add_argument("--index", help="Keep results in this JSON file, and only scan files not in it or changed")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of files to scan at once")
+    parser.add_argument("--meshes", action="store_true", help="List each file's meshes")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    index = ScanIndex(args.index)
+    results = index.scan([Path(path).resolve() for path in args.paths], args.jobs)
+    index.save()
+    for result in results:
+        if result.error is not None:
+            print(f"{result.path}: could not scan ({result.error})")
+            continue
+        auto_smooth = [mesh for mesh in result.meshes if mesh.needs_work]
+        print(f"{result.path}: {len(auto_smooth)} of {len(result.meshes)} meshes to convert, "
+              f"estimated {result.cost:.2f}s")
+        for library in result.libraries:
+            print(f"  links from {library}")
+        if args.meshes:
+            for mesh in result.meshes:
+                print(f"  {mesh.name}: auto smooth {'on' if mesh.auto_smooth else 'off'}, {mesh.edges:,} edges, "
+                      f"{mesh.polys:,} faces")
+    needing_work = sum(result.needs_work for result in results)
+    print(f"Mark Sharps: {needing_work} of {len(results)} files need converting")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
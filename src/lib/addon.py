@@ -4,12 +4,24 @@ from typing import Callable, Type
 from types import ModuleType
 
 from hashlib import md5
+from . import pkginfo
 
 """
 This library contains helper functions useful in setup and management of Blender addons.
 It is required by the __init__.py, so don't remove it unless you fix dependencies.
 """
 
+def get_preferences(context: bpy.types.Context = None) -> bpy.types.AddonPreferences | None:
+    """Get this addon's preferences, or None if the addon was registered without being enabled (e.g. from a script)"""
+    addon = (context or bpy.context).preferences.addons.get(pkginfo.package_name())
+    return addon.preferences if addon else None
+
+
+def debugging() -> bool:
+    """Whether Blender was started with --debug or --debug-python, so registration should say what it does"""
+    return bool(bpy.app.debug or bpy.app.debug_python)
+
+
 def _collate_registerable(registerable_modules: list[ModuleType], attribute: str) -> list[Type] | list[Callable]:
     # Classes grouped by module
     mod_items = [getattr(mod, attribute) for mod in registerable_modules if hasattr(mod, attribute)]
@@ -120,23 +132,28 @@ def register_classes(registerable_modules: list[ModuleType], register: bool = Tr
     # Reverse order when unregistering
     classes = classes if register else classes[::-1]
 
+    verbose = debugging()
     for cls in classes:
-        # Always unregister. If we're registering, this ensures clean-up after a prior registration failure.
-        try:
-            bpy.utils.unregister_class(cls)
-        except RuntimeError:
-            if not register:
-                print("(!) Mark Sharps failed to unregister class:", cls)
+        # Unregister classes still registered. If we're registering, this ensures clean-up after a prior registration
+        # failure. (Registered classes get their own bl_rna, so there's no need to try, and fail, on every class.)
+        if not register or "bl_rna" in cls.__dict__:
+            try:
+                bpy.utils.unregister_class(cls)
+            except RuntimeError:
+                if not register:
+                    print("(!) Mark Sharps failed to unregister class:", cls)
 
         if register:
             bpy.utils.register_class(cls)
             if hasattr(cls, 'post_register') and callable(cls.post_register):
                 cls.post_register()
-            print("Mark Sharps registered class:", cls)
+            if verbose:
+                print("Mark Sharps registered class:", cls)
         else:
             if hasattr(cls, 'post_unregister') and callable(cls.post_unregister):
                 cls.post_unregister()
-            print("Mark Sharps unregistered class:", cls)
+            if verbose:
+                print("Mark Sharps unregistered class:", cls)
 
 
 def unregister_classes(registerable_modules: list[ModuleType]) -> None:
@@ -0,0 +1,209 @@
+import json
+import numpy as np
+from dataclasses import dataclass, asdict
+from time import perf_counter
+from typing import Any, Generator, Iterable, TextIO
+import bpy
+from bpy.types import Mesh
+from . import core, mark_sharps, planner, process
+from .mark_sharps import Engine
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core, mark_sharps, planner, process,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Analysis (read-only) runs: calculating what a run would change on each mesh without writing anything. Each mesh's
+statistics are streamed to a Text datablock and, optionally, a JSON-lines file as soon as it is analyzed, so a long
+audit can be interrupted and still leave a usable (partial) report.
+"""
+
+REPORT_TEXT_NAME = "Mark Sharps Analysis"
+
+
+@dataclass
+class MeshAnalysis:
+    mesh: str
+    edges: int
+    to_sharp: int = 0
+    to_smooth: int = 0
+    # Edges without exactly two faces (boundary, loose or non-manifold), which Include Single Edges applies to
+    single_edges: int = 0
+    seconds: float = 0.0
+    # Why the mesh would be skipped, or None if it was analyzed
+    skip: str | None = None
+
+    @property
+    def changed(self) -> int:
+        return self.to_sharp + self.to_smooth
+
+
+@dataclass
+class AnalysisStats:
+    meshes: int = 0
+    skipped: int = 0
+    changing: int = 0
+    edges: int = 0
+    to_sharp: int = 0
+    to_smooth: int = 0
+    single_edges: int = 0
+    seconds: float = 0.0
+
+    def add(self, analysis: MeshAnalysis) -> None:
+        if analysis.skip is not None:
+            self.skipped += 1
+            return
+        self.meshes += 1
+        self.changing += analysis.changed > 0
+        self.edges += analysis.edges
+        self.to_sharp += analysis.to_sharp
+        self.to_smooth += analysis.to_smooth
+        self.single_edges += analysis.single_edges
+        self.seconds += analysis.seconds
+
+    def summary(self) -> str:
+        return (f"Analyzed {self.meshes} mesh{'' if self.meshes == 1 else 'es'}: {self.changing} would change, with "
+                f"{self.to_sharp:,} edges becoming sharp and {self.to_smooth:,} becoming smooth")
+
+    def throughput(self) -> str:
+        if self.seconds <= 0:
+            return ""
+        return f"{self.meshes / self.seconds:,.1f} meshes/s, {self.edges / self.seconds:,.0f} edges/s"
+
+
+class AnalysisReport:
+    """Streams mesh analyses to a Text datablock (replacing its contents) and, if a path is given, a JSON-lines file: a
+    "run" line, a "mesh" line per mesh, and a "summary" line once the run finishes. Lines are written (and the file
+    flushed) as each mesh is added."""
+
+    def __init__(self, path: str = None, text_name: str | None = REPORT_TEXT_NAME, run_info: dict[str, Any] = None):
+        self.text: bpy.types.Text | None = None
+        self._file: TextIO | None = None
+        if text_name is not None:
+            self.text = bpy.data.texts.get(text_name) or bpy.data.texts.new(text_name)
+            self.text.clear()
+            self.text.write(f"{'Mesh':<32} {'Edges':>10} {'To sharp':>10} {'To smooth':>10} {'Single':>10} "
+                            f"{'Seconds':>9}\n")
+        if path:
+            self._file = open(path, "w", encoding="utf-8")
+            self._write_line({"type": "run", **(run_info or {})})
+
+    def _write_line(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def add(self, analysis: MeshAnalysis) -> None:
+        if self.text is not None:
+            if analysis.skip is not None:
+                self.text.write(f"{analysis.mesh[:32]:<32} skipped: {analysis.skip}\n")
+            else:
+                self.text.write(f"{analysis.mesh[:32]:<32} {analysis.edges:>10,} {analysis.to_sharp:>10,} "
+                                f"{analysis.to_smooth:>10,} {analysis.single_edges:>10,} {analysis.seconds:>9.4f}\n")
+        if self._file is not None:
+            record = asdict(analysis)
+            record["seconds"] = round(analysis.seconds, 6)
+            self._write_line({"type": "mesh", **record})
+
+    def finish(self, stats: AnalysisStats) -> None:
+        if self.text is not None:
+            self.text.write(f"\n{stats.summary()}. {stats.skipped} skipped.\n")
+        if self._file is not None:
+            self._write_line({"type": "summary", **asdict(stats)})
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def analyze_mesh_steps(mesh: Mesh, angle: float, retain: core.RetainStrategy, include_single_edges: bool,
+                       engine: Engine = Engine.NUMPY, block_size: int = None,
+                       memory: core.MemoryTracker = None) -> Generator[float, None, MeshAnalysis]:
+    """Step generator calculating the sharp flags the mesh would get, without writing them, and returning how they
+    differ from its current flags. The low-memory engine is used if asked for, and otherwise the NumPy engine (whose
+    angles go in the angle cache, so a later real run can reuse them)."""
+    arrays = mark_sharps.read_mesh_arrays(mesh)
+    if engine == Engine.LOW_MEMORY:
+        job = core.LowMemoryMaskJob(arrays, angle, retain, include_single_edges, memory, block_size)
+        while not job.step():
+            yield job.progress
+        mask, single_edges = job.mask, job.single_edges
+    else:
+        angles, manifold = yield from mark_sharps.edge_face_angles_steps(mesh, arrays, block_size=block_size)
+        mask = core.sharp_mask(angles, manifold, arrays.sharp, angle, retain, include_single_edges)
+        single_edges = len(manifold) - int(np.count_nonzero(manifold))
+    return MeshAnalysis(mesh.name_full, arrays.edge_count, to_sharp=int(np.count_nonzero(mask & ~arrays.sharp)),
+                        to_smooth=int(np.count_nonzero(arrays.sharp & ~mask)), single_edges=single_edges)
+
+
+class AnalysisJob:
+    """Analyzes a list of meshes a little at a time, like ProcessJob, adding each mesh to the report as it is done"""
+
+    def __init__(self, meshes: Iterable[Mesh], settings: process.MarkSettings, report: AnalysisReport,
+                 block_size: int = 250_000):
+        self.plan = planner.plan_meshes(meshes)
+        self.settings = settings
+        self.report = report
+        self.block_size = block_size
+        self.stats = AnalysisStats()
+        self.memory = core.MemoryTracker(settings.memory_limit)
+        self.mesh_seconds: dict[Mesh, float] = {}
+        self.progress = 0.0 if self.plan.runnable else 1.0
+        self.done = False
+        self._steps = self._run()
+
+    def _add(self, analysis: MeshAnalysis) -> None:
+        self.stats.add(analysis)
+        self.report.add(analysis)
+
+    def _run(self) -> Generator[float, None, None]:
+        settings = self.settings
+        for entry in self.plan.skipped:
+            self._add(MeshAnalysis(entry.mesh.name_full, entry.edges, skip=entry.skip))
+        total_cost = self.plan.total_cost
+        done_cost = 0.0
+        for entry in self.plan.runnable:
+            mesh = entry.mesh
+            steps = analyze_mesh_steps(mesh, settings.angle_for(mesh), settings.retain, settings.include_single_edges,
+                                       settings.engine, self.block_size, self.memory)
+            seconds = 0.0
+            start = perf_counter()
+            while True:
+                try:
+                    mesh_progress = next(steps)
+                except StopIteration as result:
+                    analysis = result.value
+                    break
+                seconds += perf_counter() - start
+                yield (done_cost + entry.cost * mesh_progress) / total_cost
+                start = perf_counter()
+            analysis.seconds = seconds + perf_counter() - start
+            self.mesh_seconds[mesh] = entry.seconds = analysis.seconds
+            self._add(analysis)
+            done_cost += entry.cost
+            yield done_cost / total_cost
+
+    def step(self) -> bool:
+        """Analyze the next piece. Returns whether all meshes are done."""
+        if not self.done:
+            try:
+                self.progress = next(self._steps)
+            except StopIteration:
+                self.progress = 1.0
+                self.done = True
+                self.report.finish(self.stats)
+        return self.done
+
+    def run(self) -> AnalysisStats:
+        while not self.step():
+            pass
+        return self.stats
+
+    def close(self) -> None:
+        """Stop analyzing. The report keeps the meshes analyzed so far, without a summary."""
+        self._steps.close()
+        self.report.close()
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import numpy as np
+
+"""
+A size-bounded, least-recently-used cache of per-mesh edge angles, so re-running the operators on unchanged geometry
+(e.g. tweaking the angle or retain strategy in the redo panel) only has to redo the threshold compare and write-back.
+"""
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class AngleCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[object, tuple[str, np.ndarray, np.ndarray]] = OrderedDict()
+
+    @staticmethod
+    def _entry_size(angles: np.ndarray, manifold: np.ndarray) -> int:
+        return angles.nbytes + manifold.nbytes
+
+    def get(self, key: object, fingerprint: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """Get the cached (angles, manifold) arrays for the key, if they were cached with the same fingerprint"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: object, fingerprint: str, angles: np.ndarray, manifold: np.ndarray) -> None:
+        self.discard(key)
+        size = self._entry_size(angles, manifold)
+        if size > self.max_bytes:
+            return
+        # Cached arrays are shared between runs, so guard them against being modified in place
+        angles.flags.writeable = False
+        manifold.flags.writeable = False
+        self._entries[key] = (fingerprint, angles, manifold)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, old_angles, old_manifold) = self._entries.popitem(last=False)
+            self.size -= self._entry_size(old_angles, old_manifold)
+
+    def discard(self, key: object) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= self._entry_size(entry[1], entry[2])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+cache = AngleCache()
@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from dataclasses import dataclass, asdict, field
+from hashlib import blake2b
+from typing import Callable, Iterable, Iterator
+from bpy.types import Mesh
+from . import core, mark_sharps, pkginfo
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core, mark_sharps, pkginfo,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Sharp-mask archives: files of precomputed sharp edge masks, so meshes can be marked later (e.g. in Blender 4.1 and
+later, where Auto Smooth is gone) without recalculating anything.
+
+File layout (integers are little-endian):
+    header: magic (8 bytes), format version (uint32)
+    mask blobs, one after another
+    index: a JSON list of ArchiveEntry fields
+    footer: index offset (uint64), index length (uint64), magic (8 bytes)
+
+Each blob is a mask bit-packed 8 edges to a byte, zlib-compressed unless that doesn't make it smaller. With the index at
+the end, an archive can be written in one pass, and read by memory-mapping it and decompressing one mask at a time.
+"""
+
+EXTENSION = pkginfo.ARCHIVE_EXTENSION
+MAGIC = b"MSHARPS\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sI")
+_FOOTER = struct.Struct("<QQ8s")
+
+
+class ArchiveError(Exception):
+    pass
+
+
+@dataclass
+class ArchiveEntry:
+    name: str
+    hash: str
+    edges: int
+    offset: int
+    length: int
+    compressed: bool
+    # The Auto Smooth angle to set along with the mask, if any (only revert files have them)
+    auto_smooth_angle: float | None = None
+
+
+def mesh_hash(mesh: Mesh) -> str:
+    """Hash the mesh's vertex positions and its edge and face topology. These read the same in every Blender version
+    (unlike e.g. normals, which are recalculated), so a mask exported from one version can be matched in another."""
+    digest = blake2b(f"edges:{len(mesh.edges)};".encode(), digest_size=16)
+    for collection, name, dtype, width in ((mesh.vertices, "co", np.float32, 3), (mesh.edges, "vertices", np.int32, 2),
+                                           (mesh.polygons, "loop_total", np.int32, 1),
+                                           (mesh.loops, "vertex_index", np.int32, 1)):
+        values = np.empty(len(collection) * width, dtype=dtype)
+        collection.foreach_get(name, values)
+        digest.update(f"{name}:{values.size};".encode())
+        digest.update(values.data)
+    return digest.hexdigest()
+
+
+class ArchiveWriter:
+    """Writes an archive one mask at a time. Use as a context manager; if an exception leaves the context, the partial
+    file is removed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: list[ArchiveEntry] = []
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+
+    def add(self, name: str, hash: str, mask: np.ndarray, auto_smooth_angle: float = None) -> ArchiveEntry:
+        packed = core.pack_mask(mask).tobytes()
+        compressed = zlib.compress(packed)
+        blob = compressed if len(compressed) < len(packed) else packed
+        entry = ArchiveEntry(name, hash, len(mask), self._file.tell(), len(blob), blob is compressed,
+                             auto_smooth_angle)
+        self._file.write(blob)
+        self.entries.append(entry)
+        return entry
+
+    def close(self) -> None:
+        # Entries without an angle are written without the field, as earlier versions of the addon wrote them
+        index = json.dumps([{key: value for key, value in asdict(entry).items()
+                             if key != "auto_smooth_angle" or value is not None} for entry in self.entries],
+                           separators=(",", ":")).encode()
+        offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(offset, len(index), MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        self._file.close()
+        os.remove(self.path)
+
+
+class ArchiveReader:
+    """Reads masks from a memory-mapped archive. Use as a context manager."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < _HEADER.size + _FOOTER.size:
+                raise ArchiveError(f"{path} is too small to be a sharp-mask archive")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = _HEADER.unpack_from(self._map, 0)
+            offset, length, footer_magic = _FOOTER.unpack_from(self._map, size - _FOOTER.size)
+            if magic != MAGIC or footer_magic != MAGIC:
+                raise ArchiveError(f"{path} is not a sharp-mask archive, or is incomplete")
+            if version > FORMAT_VERSION:
+                raise ArchiveError(f"{path} is a newer archive format (version {version}) than this addon can read")
+            self.entries = [ArchiveEntry(**entry) for entry in json.loads(self._map[offset:offset + length])]
+        except Exception:
+            self.close()
+            raise
+
+    def __iter__(self) -> Iterator[ArchiveEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def mask(self, entry: ArchiveEntry) -> np.ndarray:
+        blob = self._map[entry.offset:entry.offset + entry.length]
+        if entry.compressed:
+            blob = zlib.decompress(blob)
+        return core.unpack_mask(np.frombuffer(blob, dtype=np.uint8), entry.edges)
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def export_archive(path: str, meshes: Iterable[Mesh], compute_mask: Callable[[Mesh], np.ndarray]) -> int:
+    """Write the masks calculated by compute_mask for the meshes to an archive. Returns the number of masks written."""
+    with ArchiveWriter(path) as writer:
+        for mesh in meshes:
+            writer.add(mesh.name_full, mesh_hash(mesh), compute_mask(mesh))
+        return len(writer.entries)
+
+
+@dataclass
+class ApplyResult:
+    applied: int = 0
+    # Names of archived meshes that weren't applied, for reporting
+    mismatched: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+    linked: list[str] = field(default_factory=list)
+
+
+def apply_archive(path: str, meshes: Iterable[Mesh]) -> ApplyResult:
+    """Set the sharp edges (and any archived Auto Smooth angles) of the meshes matching archived masks by name, one
+    mask at a time. Meshes whose geometry has changed since the mask was exported are reported as mismatched, not
+    changed."""
+    by_name = {mesh.name_full: mesh for mesh in meshes}
+    result = ApplyResult()
+    with ArchiveReader(path) as reader:
+        for entry in reader:
+            mesh = by_name.get(entry.name)
+            if mesh is None:
+                result.missing.append(entry.name)
+            elif mesh.library is not None:
+                result.linked.append(entry.name)
+            elif len(mesh.edges) != entry.edges or mesh_hash(mesh) != entry.hash:
+                result.mismatched.append(entry.name)
+            else:
+                mark_sharps.write_sharp_edges(mesh, reader.mask(entry))
+                # Blender 4.1+ has no Auto Smooth angle to set
+                if entry.auto_smooth_angle is not None and hasattr(mesh, "auto_smooth_angle"):
+                    mesh.auto_smooth_angle = entry.auto_smooth_angle
+                result.applied += 1
+    return result
@@ -0,0 +1,134 @@
+from time import perf_counter
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import ID, Mesh, Object
+from . import mark_sharps, process
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (mark_sharps, process,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Opt-in automatic processing of meshes added to the open file, e.g. appended from an old library. Meshes in the file
+when it is loaded (or restored by undo/redo) are noted as seen; when the number of meshes changes, or an updated mesh
+(or mesh object) hasn't been seen, a timer processes only the meshes not seen before, a time slice per tick, so the
+append itself isn't held up. A mesh added without any update to it or its objects while another is removed (so the
+count stays the same) is picked up with the next added mesh.
+"""
+
+# Seconds to wait after a change before processing, so a multi-step append finishes first
+DELAY = 0.2
+# Seconds of processing per timer tick, and seconds between ticks
+TICK_BUDGET = 0.05
+TICK_INTERVAL = 0.01
+
+# Settings new meshes are processed with
+settings = process.MarkSettings(engine=mark_sharps.Engine.NUMPY)
+
+# Meshes are told apart by mark_sharps.mesh_key (the session UID, where available), which unlike pointers isn't reused
+# for a new mesh after one is freed
+_seen: set[int | str] = set()
+_mesh_count = 0
+_job: process.ProcessJob | None = None
+_HANDLERS = ("load_post", "undo_post", "redo_post", "depsgraph_update_post")
+
+
+def _note_all_seen() -> None:
+    global _seen, _mesh_count
+    _seen = {mark_sharps.mesh_key(mesh) for mesh in bpy.data.meshes}
+    _mesh_count = len(bpy.data.meshes)
+
+
+def new_meshes() -> list[Mesh]:
+    """Get the meshes not seen before that can be changed (not linked from a library), and note them all as seen"""
+    global _seen, _mesh_count
+    current = {}
+    for mesh in bpy.data.meshes:
+        current[mark_sharps.mesh_key(mesh)] = mesh
+    new = [mesh for key, mesh in current.items() if key not in _seen and mesh.library is None]
+    # Only keep the current meshes, so the set doesn't grow with meshes that have been removed
+    _seen = set(current)
+    _mesh_count = len(current)
+    return new
+
+
+def _cancel() -> None:
+    global _job
+    if _job is not None:
+        _job.close()
+        _job = None
+    if bpy.app.timers.is_registered(tick):
+        bpy.app.timers.unregister(tick)
+
+
+@persistent
+def on_reset(*args) -> None:
+    """A file was loaded, or undo/redo restored the file, so everything in it counts as seen"""
+    _cancel()
+    _note_all_seen()
+
+
+def _is_new(id_data: ID) -> bool:
+    """Whether an updated ID is (or is an object using) a mesh not seen before"""
+    original = id_data.original
+    if isinstance(original, Object):
+        original = original.data
+    return isinstance(original, Mesh) and mark_sharps.mesh_key(original) not in _seen
+
+
+@persistent
+def on_depsgraph_update(scene=None, depsgraph=None) -> None:
+    # Only added meshes matter. The number of meshes is cheap to check on every update, but stays the same when a mesh
+    # is added as another is removed, so the updated meshes (usually few) are also looked up among the seen ones.
+    if bpy.app.timers.is_registered(tick):
+        return
+    if len(bpy.data.meshes) != _mesh_count or \
+            (depsgraph is not None and any(_is_new(update.id) for update in depsgraph.updates)):
+        bpy.app.timers.register(tick, first_interval=DELAY)
+
+
+def tick() -> float | None:
+    """Timer callback: process the new meshes a time slice at a time. Returns when to be called again, or None when
+    there is nothing left to do."""
+    global _job
+    if _job is None:
+        meshes = new_meshes()
+        if not meshes:
+            return None
+        _job = process.ProcessJob(meshes, settings)
+    deadline = perf_counter() + TICK_BUDGET
+    while perf_counter() < deadline:
+        if _job.step():
+            print(f"Mark Sharps: Auto-processed new meshes. {_job.stats.summary()}")
+            _job = None
+            # Check again, in case more meshes were added while these were processed
+            return TICK_INTERVAL
+    return TICK_INTERVAL
+
+
+def register_handlers() -> None:
+    for handler in _HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler)
+        function = on_depsgraph_update if handler == "depsgraph_update_post" else on_reset
+        if function not in handlers:
+            handlers.append(function)
+    _note_all_seen()
+
+
+def unregister_handlers() -> None:
+    for handler in _HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler)
+        for function in (on_reset, on_depsgraph_update):
+            if function in handlers:
+                handlers.remove(function)
+    _cancel()
+
+
+def set_enabled(enabled: bool) -> None:
+    if enabled:
+        register_handlers()
+    else:
+        unregister_handlers()
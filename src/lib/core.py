@@ -0,0 +1,421 @@
+import numpy as np
+from dataclasses import dataclass
+from enum import Enum
+from hashlib import blake2b
+from math import pi
+
+"""
+Edge angle and sharp-edge calculations operating on plain arrays. This module must not import bpy or bmesh, so it can
+be used (and tested or benchmarked) outside of Blender.
+"""
+
+
+class RetainStrategy(Enum):
+    CLEAR_ALL = 0
+    RETAIN_SHARP = 1
+    RETAIN_SMOOTH = 2
+
+
+@dataclass
+class MeshArrays:
+    """Compact description of a mesh, as read from Blender with foreach_get. Either coords and loop_verts or
+    poly_normals must be given, so face normals can be calculated."""
+    loop_starts: np.ndarray
+    loop_totals: np.ndarray
+    loop_edges: np.ndarray
+    sharp: np.ndarray
+    coords: np.ndarray | None = None
+    loop_verts: np.ndarray | None = None
+    poly_normals: np.ndarray | None = None
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.sharp)
+
+    def normals(self) -> np.ndarray:
+        if self.poly_normals is None:
+            self.poly_normals = poly_normals(self.coords, self.loop_starts, self.loop_totals, self.loop_verts)
+        return self.poly_normals
+
+
+def polygon_loops(loop_starts: np.ndarray, loop_totals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Get the loop indices of all polygons in polygon order, and the polygon index of each of those loops"""
+    loop_faces = np.repeat(np.arange(len(loop_totals), dtype=np.int32), loop_totals)
+    first_loops = np.cumsum(loop_totals) - loop_totals
+    loop_indices = np.repeat(loop_starts - first_loops, loop_totals) + np.arange(len(loop_faces), dtype=np.int32)
+    return loop_indices, loop_faces
+
+
+def poly_normals(coords: np.ndarray, loop_starts: np.ndarray, loop_totals: np.ndarray,
+                 loop_verts: np.ndarray) -> np.ndarray:
+    """Calculate unit face normals using Newell's method, as Blender does for polygons"""
+    loop_indices, loop_faces = polygon_loops(loop_starts, loop_totals)
+    current = coords[loop_verts[loop_indices]].astype(np.float64)
+    # The previous vertex in each polygon, wrapping the first loop around to the polygon's last loop
+    first_loops = np.cumsum(loop_totals) - loop_totals
+    previous_index = np.arange(len(current)) - 1
+    previous_index[first_loops] = first_loops + loop_totals - 1
+    previous = current[previous_index]
+
+    diff = previous - current
+    total = previous + current
+    terms = np.stack((diff[:, 1] * total[:, 2], diff[:, 2] * total[:, 0], diff[:, 0] * total[:, 1]), axis=1)
+    normals = np.zeros((len(loop_totals), 3), dtype=np.float64)
+    np.add.at(normals, loop_faces, terms)
+
+    lengths = np.linalg.norm(normals, axis=1)
+    degenerate = lengths == 0
+    normals[degenerate] = (0, 0, 1)
+    lengths[degenerate] = 1
+    return (normals / lengths[:, None]).astype(np.float32)
+
+
+def angle_normalized(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Angle between rows of unit vectors, calculated the same (more accurate than acos) way as Blender's
+    angle_normalized_v3v3 so results match BMEdge.calc_face_angle"""
+    dot = np.einsum("ij,ij->i", a, b)
+    same_side = dot >= 0
+    # Where the normals face away from each other, measure against the negated second normal
+    b = np.where(same_side[:, None], b, -b)
+    half_chord = np.clip(np.linalg.norm(a - b, axis=1) / np.float32(2), -1, 1)
+    angles = np.float32(2) * np.arcsin(half_chord)
+    return np.where(same_side, angles, np.float32(pi) - angles).astype(np.float32)
+
+
+def add_edge_faces(edges: np.ndarray, faces: np.ndarray, face_counts: np.ndarray, first_faces: np.ndarray,
+                   last_faces: np.ndarray, memory: "MemoryTracker" = None) -> None:
+    """Add a block of loops, given as the edge and face of each loop, to every edge's face count and lowest and highest
+    face index. The faces are grouped by edge by sorting, as np.minimum.at and np.maximum.at are many times slower.
+    The temporary arrays are recorded in the memory tracker, if given."""
+    counts = np.bincount(edges, minlength=len(face_counts))
+    if memory:
+        memory.allocate(counts)
+    face_counts += counts.astype(np.int32, copy=False)
+    if memory:
+        memory.release(counts)
+    del counts
+    if not len(edges):
+        return
+    order = np.argsort(edges)
+    sorted_edges = edges[order]
+    sorted_faces = faces[order]
+    # The start of each run of loops of the same edge
+    starts = np.flatnonzero(np.diff(sorted_edges, prepend=sorted_edges[0] - 1))
+    if memory:
+        memory.allocate(order, sorted_edges, sorted_faces, starts)
+    unique_edges = sorted_edges[starts]
+    first_faces[unique_edges] = np.minimum(first_faces[unique_edges], np.minimum.reduceat(sorted_faces, starts))
+    last_faces[unique_edges] = np.maximum(last_faces[unique_edges], np.maximum.reduceat(sorted_faces, starts))
+    if memory:
+        memory.release(order, sorted_edges, sorted_faces, starts)
+
+
+class EdgeAngleJob:
+    """Calculates the angle between the faces of every edge in fixed-size blocks of loops, then of edges, so the work
+    can be spread across many calls to step(). Angles are -1 (as with BMEdge.calc_face_angle(-1)) for any edge that is
+    not shared by exactly two faces."""
+
+    def __init__(self, arrays: MeshArrays, block_size: int = None):
+        self.arrays = arrays
+        self._loop_indices, self._loop_faces = polygon_loops(arrays.loop_starts, arrays.loop_totals)
+        self.block_size = block_size or max(len(self._loop_indices), arrays.edge_count, 1)
+        self.face_counts = np.zeros(arrays.edge_count, dtype=np.int32)
+        # With exactly two faces, the lowest and highest face index are the faces on either side of the edge
+        self._first_faces = np.full(arrays.edge_count, np.iinfo(np.int32).max, dtype=np.int32)
+        self._last_faces = np.full(arrays.edge_count, -1, dtype=np.int32)
+        self.angles: np.ndarray | None = None
+        self.manifold: np.ndarray | None = None
+        self._loop_position = 0
+        self._edge_position = 0
+
+    @property
+    def done(self) -> bool:
+        return self._edge_position >= self.arrays.edge_count and self._loop_position >= len(self._loop_indices)
+
+    @property
+    def progress(self) -> float:
+        total = len(self._loop_indices) + self.arrays.edge_count
+        return (self._loop_position + self._edge_position) / total if total else 1.0
+
+    def _step_loops(self) -> None:
+        start, end = self._loop_position, min(self._loop_position + self.block_size, len(self._loop_indices))
+        edges = self.arrays.loop_edges[self._loop_indices[start:end]]
+        add_edge_faces(edges, self._loop_faces[start:end], self.face_counts, self._first_faces, self._last_faces)
+        self._loop_position = end
+
+    def _step_edges(self) -> None:
+        if self.angles is None:
+            self.manifold = self.face_counts == 2
+            self.angles = np.full(self.arrays.edge_count, -1, dtype=np.float32)
+        start, end = self._edge_position, min(self._edge_position + self.block_size, self.arrays.edge_count)
+        edges = start + np.flatnonzero(self.manifold[start:end])
+        normals = self.arrays.normals()
+        self.angles[edges] = angle_normalized(normals[self._first_faces[edges]], normals[self._last_faces[edges]])
+        self._edge_position = end
+
+    def step(self) -> bool:
+        """Process the next block. Returns whether the job is done."""
+        if self._loop_position < len(self._loop_indices):
+            self._step_loops()
+        elif not self.done or self.angles is None:
+            self._step_edges()
+        return self.done
+
+    def run(self) -> tuple[np.ndarray, np.ndarray]:
+        """Process all remaining blocks and return the (angles, manifold) arrays"""
+        while not self.step():
+            pass
+        return self.angles, self.manifold
+
+
+def edge_face_angles(arrays: MeshArrays) -> tuple[np.ndarray, np.ndarray]:
+    """Calculate the angle between the faces of every edge. Returns a tuple of (angles, manifold), where angles is -1
+    (as with BMEdge.calc_face_angle(-1)) for any edge that is not shared by exactly two faces."""
+    return EdgeAngleJob(arrays).run()
+
+
+class MemoryTracker:
+    """Tracks the bytes held by the arrays of a calculation and their peak, against an optional limit (0 for none)"""
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.current = 0
+        self.peak = 0
+
+    def allocate(self, *arrays: np.ndarray) -> None:
+        self.current += sum(array.nbytes for array in arrays)
+        self.peak = max(self.peak, self.current)
+
+    def release(self, *arrays: np.ndarray) -> None:
+        self.current -= sum(array.nbytes for array in arrays)
+
+    @property
+    def within_limit(self) -> bool:
+        return not self.limit or self.peak <= self.limit
+
+
+class LowMemoryMaskJob:
+    """Calculates the sharp mask of a mesh (as compute_sharp_mask does) while holding as little memory as possible:
+    only the mesh arrays, three int32s per edge of face bookkeeping, the mask, and fixed-size block buffers that are
+    reused for every block. Edge angles are never stored for the whole mesh. The block size is fitted to the memory
+    tracker's limit, if it has one, and everything held is recorded in the tracker."""
+
+    DEFAULT_BLOCK_SIZE = 1 << 16
+    MIN_BLOCK_SIZE = 1 << 10
+    # Bytes per block item: loop positions and their face indices (int64, plus int32 if polygons are out of order),
+    # two normals (3 x float32), dot products and angles (float32), and four bool masks
+    BLOCK_ITEM_BYTES = 8 + 8 + 4 + 24 + 8 + 4
+
+    def __init__(self, arrays: MeshArrays, angle: float, retain: RetainStrategy, include_single_edges: bool,
+                 memory: MemoryTracker = None, block_size: int = None):
+        self.arrays = arrays
+        self.angle = np.float64(angle)
+        self.retain = retain
+        self.include_single_edges = include_single_edges
+        self.memory = memory or MemoryTracker()
+        self._normals = arrays.normals()
+        self._loop_count = len(arrays.loop_edges)
+        edge_count = arrays.edge_count
+        self.memory.allocate(arrays.loop_starts, arrays.loop_totals, arrays.loop_edges, self._normals, arrays.sharp)
+
+        # Loops are processed in loop order, finding each loop's face by searching the sorted polygon loop starts
+        self._order = None
+        self._starts = arrays.loop_starts
+        if len(self._starts) and np.any(self._starts[1:] < self._starts[:-1]):
+            self._order = np.argsort(self._starts).astype(np.int32)
+            self._starts = self._starts[self._order]
+            self.memory.allocate(self._order, self._starts)
+
+        self.face_counts = np.zeros(edge_count, dtype=np.int32)
+        # With exactly two faces, the lowest and highest face index are the faces on either side of the edge
+        self._first_faces = np.full(edge_count, np.iinfo(np.int32).max, dtype=np.int32)
+        self._last_faces = np.full(edge_count, -1, dtype=np.int32)
+        self.mask = np.empty(edge_count, dtype=bool)
+        self.memory.allocate(self.face_counts, self._first_faces, self._last_faces, self.mask)
+        # Edges without exactly two faces (boundary, loose or non-manifold), counted as the edges are processed
+        self.single_edges = 0
+
+        self.block_size = self._fit_block_size(block_size or self.DEFAULT_BLOCK_SIZE)
+        self._loop_position = 0
+        self._edge_position = 0
+        self._buffers: dict[str, np.ndarray] = {}
+        self._allocate_buffers(positions=(np.int64, ()))
+
+    def _fit_block_size(self, max_size: int) -> int:
+        """The largest block size up to max_size whose buffers fit in what is left of the memory limit, though no
+        smaller than MIN_BLOCK_SIZE, below which per-block overhead dominates"""
+        if not self.memory.limit:
+            return max_size
+        fitting = (self.memory.limit - self.memory.current) // self.BLOCK_ITEM_BYTES
+        return max(1, min(max_size, max(fitting, self.MIN_BLOCK_SIZE)))
+
+    def _allocate_buffers(self, **specs: tuple[type, tuple[int, ...]]) -> None:
+        """Replace the block buffers with new ones of (dtype, extra dimensions), releasing the old ones"""
+        self.memory.release(*self._buffers.values())
+        self._buffers = {name: np.empty((self.block_size, *shape), dtype=dtype) for name, (dtype, shape) in specs.items()}
+        self.memory.allocate(*self._buffers.values())
+
+    @property
+    def done(self) -> bool:
+        return self._loop_position >= self._loop_count and self._edge_position >= self.arrays.edge_count
+
+    @property
+    def progress(self) -> float:
+        total = self._loop_count + self.arrays.edge_count
+        return (self._loop_position + self._edge_position) / total if total else 1.0
+
+    def _step_loops(self) -> None:
+        start, end = self._loop_position, min(self._loop_position + self.block_size, self._loop_count)
+        positions = self._buffers["positions"][:end - start]
+        positions[:] = np.arange(start, end)
+        sorted_faces = np.searchsorted(self._starts, positions, side="right")
+        self.memory.allocate(sorted_faces)
+        sorted_faces -= 1
+        faces = sorted_faces
+        if self._order is not None:
+            faces = self._order[sorted_faces]
+            self.memory.allocate(faces)
+        add_edge_faces(self.arrays.loop_edges[start:end], faces, self.face_counts, self._first_faces, self._last_faces,
+                       self.memory)
+        self.memory.release(sorted_faces)
+        if self._order is not None:
+            self.memory.release(faces)
+        del sorted_faces, faces
+        self._loop_position = end
+
+    def _block_angles(self, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+        """angle_normalized of the faces' normals, calculated in the block buffers"""
+        count = len(first)
+        buffers = {name: buffer[:count] for name, buffer in self._buffers.items()}
+        a, b, dot, angles, same, opposite = (buffers[name] for name in ("a", "b", "dot", "angles", "same", "opposite"))
+        # Edges without two faces have out-of-range face indices, so clip them; their angles aren't used
+        np.take(self._normals, first, axis=0, out=a, mode="clip")
+        np.take(self._normals, last, axis=0, out=b, mode="clip")
+        np.einsum("ij,ij->i", a, b, out=dot)
+        np.greater_equal(dot, 0, out=same)
+        np.logical_not(same, out=opposite)
+        np.negative(b, out=b, where=opposite[:, None])
+        np.subtract(a, b, out=a)
+        np.multiply(a, a, out=a)
+        np.add.reduce(a, axis=1, out=angles)
+        np.sqrt(angles, out=angles)
+        np.divide(angles, np.float32(2), out=angles)
+        np.clip(angles, -1, 1, out=angles)
+        np.arcsin(angles, out=angles)
+        np.multiply(angles, np.float32(2), out=angles)
+        np.subtract(np.float32(pi), angles, out=angles, where=opposite)
+        return angles
+
+    def _step_edges(self) -> None:
+        if "manifold" not in self._buffers:
+            # The loop buffers are done with, so swap them for the edge buffers
+            self._allocate_buffers(a=(np.float32, (3,)), b=(np.float32, (3,)), dot=(np.float32, ()),
+                                   angles=(np.float32, ()), same=(bool, ()), opposite=(bool, ()),
+                                   manifold=(bool, ()), marked=(bool, ()))
+        start, end = self._edge_position, min(self._edge_position + self.block_size, self.arrays.edge_count)
+        count = end - start
+        manifold = self._buffers["manifold"][:count]
+        marked = self._buffers["marked"][:count]
+        np.equal(self.face_counts[start:end], 2, out=manifold)
+        self.single_edges += count - int(np.count_nonzero(manifold))
+        if len(self._normals):
+            angles = self._block_angles(self._first_faces[start:end], self._last_faces[start:end])
+            np.greater(angles, self.angle, out=marked)
+        else:
+            marked[:] = False
+        if self.include_single_edges:
+            np.logical_not(manifold, out=manifold)
+            np.logical_or(marked, manifold, out=marked)
+        else:
+            np.logical_and(marked, manifold, out=marked)
+
+        sharp, mask = self.arrays.sharp[start:end], self.mask[start:end]
+        if self.retain == RetainStrategy.RETAIN_SHARP:
+            np.logical_or(sharp, marked, out=mask)
+        elif self.retain == RetainStrategy.RETAIN_SMOOTH:
+            np.logical_and(sharp, marked, out=mask)
+        else:
+            mask[:] = marked
+        self._edge_position = end
+
+    def _release(self) -> None:
+        """Drop everything but the mask, and stop tracking everything (the mask now belongs to the caller)"""
+        arrays = self.arrays
+        self.memory.release(*self._buffers.values(), self.face_counts, self._first_faces, self._last_faces, self.mask,
+                            arrays.loop_starts, arrays.loop_totals, arrays.loop_edges, self._normals, arrays.sharp)
+        if self._order is not None:
+            self.memory.release(self._order, self._starts)
+        self._buffers = {}
+        self.face_counts = self._first_faces = self._last_faces = self._order = None
+
+    def step(self) -> bool:
+        """Process the next block. Returns whether the job is done."""
+        if self._loop_position < self._loop_count:
+            self._step_loops()
+        elif self._edge_position < self.arrays.edge_count:
+            self._step_edges()
+        if self.done and self.face_counts is not None:
+            self._release()
+        return self.done
+
+    def run(self) -> np.ndarray:
+        """Process all remaining blocks and return the mask"""
+        while not self.step():
+            pass
+        return self.mask
+
+
+def sharp_mask(angles: np.ndarray, manifold: np.ndarray, sharp: np.ndarray, angle: float, retain: RetainStrategy,
+               include_single_edges: bool) -> np.ndarray:
+    """Build the new sharp flags for every edge from the edge angles and existing sharp flags"""
+    marked = np.where(manifold, angles > np.float64(angle), include_single_edges)
+    if retain == RetainStrategy.RETAIN_SHARP:
+        return sharp | marked
+    if retain == RetainStrategy.RETAIN_SMOOTH:
+        return sharp & marked
+    return marked
+
+
+def compute_sharp_mask(arrays: MeshArrays, angle: float, retain: RetainStrategy = RetainStrategy.CLEAR_ALL,
+                       include_single_edges: bool = True) -> np.ndarray:
+    """Calculate the sharp flag of every edge of the mesh, as mark_auto_smooth would set it"""
+    angles, manifold = edge_face_angles(arrays)
+    return sharp_mask(angles, manifold, arrays.sharp, angle, retain, include_single_edges)
+
+
+def geometry_hash(arrays: MeshArrays) -> str:
+    """Hash everything in the mesh arrays that the edge angles depend on (not the sharp flags). Only arrays that were
+    read are hashed, so hashes are only comparable between arrays read the same way. The hash is remembered on the
+    arrays object, since several stages of a run may need it."""
+    if (known := getattr(arrays, "_geometry_hash", None)) is not None:
+        return known
+    digest = blake2b(f"edges:{arrays.edge_count};".encode(), digest_size=16)
+    for name in ("loop_starts", "loop_totals", "loop_edges", "coords", "loop_verts", "poly_normals"):
+        values = getattr(arrays, name)
+        # Normals calculated from the coordinates don't need to be hashed along with them
+        if values is None or (name == "poly_normals" and arrays.coords is not None):
+            continue
+        values = np.ascontiguousarray(values)
+        digest.update(f"{name}:{values.dtype.str}:{values.size};".encode())
+        digest.update(values.data)
+    arrays._geometry_hash = digest.hexdigest()
+    return arrays._geometry_hash
+
+
+def result_key(arrays: MeshArrays, angle: float, retain: RetainStrategy, include_single_edges: bool) -> str:
+    """Hash everything the sharp mask calculated from the arrays depends on: the geometry, the settings, and (unless
+    they are all cleared) the existing sharp flags"""
+    digest = blake2b(geometry_hash(arrays).encode(), digest_size=16)
+    digest.update(f"{float(angle)!r}:{retain.name}:{include_single_edges};".encode())
+    if retain != RetainStrategy.CLEAR_ALL:
+        digest.update(np.ascontiguousarray(arrays.sharp).data)
+    return digest.hexdigest()
+
+
+def pack_mask(mask: np.ndarray) -> np.ndarray:
+    """Pack a boolean mask into bits, 8 edges per byte"""
+    return np.packbits(mask)
+
+
+def unpack_mask(packed: np.ndarray, count: int) -> np.ndarray:
+    return np.unpackbits(packed, count=count).astype(bool)
@@ -0,0 +1,294 @@
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+import numpy as np
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+from . import core
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+A persistent cache of calculated sharp masks, shared by every file, Blender session and process using the same cache
+directory, so meshes reused across many files are only calculated once. Masks are keyed by core.result_key (a hash of
+the geometry, the angle, the retain strategy and Include Single Edges, plus the existing sharp flags if they're kept).
+
+The cache is one append-only file, memory-mapped for reading (integers are little-endian):
+    header: magic (8 bytes), format version (uint32), reserved (uint32)
+    records, one after another: key (16 bytes), edge count (uint32), blob length (uint32), blob CRC-32 (uint32),
+        kind (uint8), padding (3 bytes), then the blob
+
+A mask record's blob is the mask bit-packed 8 edges to a byte, zlib-compressed unless that doesn't make it smaller. A
+"touch" record (with no blob) marks a mask as used, so the order of a key's last record is the order of last use. When
+the file grows past its size limit, it is rewritten with only the most recently used masks.
+
+Writers take an exclusive lock on a separate lock file, and readers a shared one while reading new records, so several
+Blender processes can use the cache at once. Appended records never change, so masks are read without the lock.
+"""
+
+EXTENSION = ".mscache"
+MAGIC = b"MSCACHE\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_RECORD = struct.Struct("<16sIIIB3x")
+
+KIND_MASK = 0
+KIND_MASK_COMPRESSED = 1
+KIND_TOUCH = 2
+
+DEFAULT_MAX_BYTES = 1024 * 2 ** 20
+# When the cache is over its limit, it is rewritten down to this fraction of it, so it isn't rewritten on every write
+COMPACT_TO = 0.75
+
+
+def default_directory() -> str:
+    return os.path.join(tempfile.gettempdir(), "mark_sharps_cache")
+
+
+@dataclass
+class _Entry:
+    # Offset of the blob in the file
+    offset: int
+    edges: int
+    length: int
+    crc: int
+    compressed: bool
+
+
+class DiskCache:
+    """The sharp mask cache in a directory, limited to about max_bytes"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, "masks" + EXTENSION)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock_file = open(os.path.join(directory, "masks.lock"), "a+b")
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self._identity: tuple[int, int] | None = None
+        # Entries in order of last use, oldest first
+        self._index: dict[bytes, _Entry] = {}
+        # Offset up to which the file has been read
+        self._scanned = 0
+        # Keys used since the last flush, to be marked as used in the file
+        self._touched: set[bytes] = set()
+        self._warned = False
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        fd = self._lock_file.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            # Windows only has exclusive locks. LK_LOCK retries for about 10 seconds before failing.
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def _close_file(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._identity = None
+        self._index = {}
+        self._scanned = 0
+
+    def _refresh(self, locked: bool = False) -> None:
+        """Read records added since the last refresh, starting over if the file was replaced (compacted)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close_file()
+            return
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            self._close_file()
+            self._file = open(self.path, "rb")
+            self._identity = (stat.st_dev, stat.st_ino)
+        if stat.st_size > self._scanned:
+            if locked:
+                self._scan()
+            else:
+                with self._locked(False):
+                    self._scan()
+
+    def _scan(self) -> None:
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            return
+        if self._map is None or len(self._map) < size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self._map)
+        position = self._scanned
+        if position == 0:
+            magic, version, _ = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise OSError(f"{self.path} is not a version {FORMAT_VERSION} Mark Sharps cache")
+            position = _HEADER.size
+        index = self._index
+        # A record that runs past the end is still being written (or its writer died), so stop before it
+        while position + _RECORD.size <= size:
+            key, edges, length, crc, kind = _RECORD.unpack_from(self._map, position)
+            end = position + _RECORD.size + length
+            if end > size:
+                break
+            entry = index.pop(key, None)
+            if kind != KIND_TOUCH:
+                entry = _Entry(position + _RECORD.size, edges, length, crc, kind == KIND_MASK_COMPRESSED)
+            if entry is not None:
+                index[key] = entry
+            position = end
+        self._scanned = position
+
+    def _warn(self, error: Exception) -> None:
+        if not self._warned:
+            print(f"Mark Sharps: Disk cache unavailable: {error}")
+            self._warned = True
+
+    def get(self, key: str, edges: int) -> np.ndarray | None:
+        """Get the cached mask for the result key, or None if there isn't one for that many edges"""
+        try:
+            self._refresh()
+            entry = self._index.get(bytes.fromhex(key))
+            if entry is not None and entry.edges == edges:
+                blob = self._map[entry.offset:entry.offset + entry.length]
+                if zlib.crc32(blob) == entry.crc:
+                    packed = zlib.decompress(blob) if entry.compressed else blob
+                    self._touched.add(bytes.fromhex(key))
+                    self.hits += 1
+                    return core.unpack_mask(np.frombuffer(packed, dtype=np.uint8), edges)
+        except (OSError, ValueError, zlib.error) as e:
+            self._warn(e)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, mask: np.ndarray) -> None:
+        """Add a calculated mask. Failures to write are reported once, and otherwise ignored."""
+        packed = core.pack_mask(mask).tobytes()
+        compressed = zlib.compress(packed)
+        blob = compressed if len(compressed) < len(packed) else packed
+        kind = KIND_MASK_COMPRESSED if blob is compressed else KIND_MASK
+        try:
+            with self._locked(True):
+                self._refresh(locked=True)
+                if bytes.fromhex(key) in self._index:
+                    return
+                self._append(_RECORD.pack(bytes.fromhex(key), len(mask), len(blob), zlib.crc32(blob), kind) + blob)
+                if self._scanned > self.max_bytes:
+                    self._compact()
+        except (OSError, ValueError) as e:
+            self._warn(e)
+
+    def _append(self, data: bytes) -> None:
+        """Append records to the file, creating it if needed. The caller holds the exclusive lock."""
+        with open(self.path, "ab") as file:
+            if file.tell() < _HEADER.size:
+                file.truncate(0)
+                file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+            elif file.tell() != self._scanned:
+                # A writer died partway through a record: drop it, so the new record follows the last complete one
+                file.truncate(self._scanned)
+            file.write(data)
+        self._refresh(locked=True)
+
+    def _compact(self) -> None:
+        """Rewrite the file with only the most recently used masks. The caller holds the exclusive lock and has read
+        the whole file."""
+        for key in self._touched:
+            if key in self._index:
+                self._index[key] = self._index.pop(key)
+        self._touched.clear()
+        kept = []
+        total = _HEADER.size
+        for key, entry in reversed(self._index.items()):
+            total += _RECORD.size + entry.length
+            if total > self.max_bytes * COMPACT_TO:
+                break
+            kept.append((key, entry))
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+            for key, entry in reversed(kept):
+                file.write(_RECORD.pack(key, entry.edges, entry.length, entry.crc,
+                                        KIND_MASK_COMPRESSED if entry.compressed else KIND_MASK))
+                file.write(self._map[entry.offset:entry.offset + entry.length])
+        # Other processes keep reading the old file until they notice it was replaced. (On Windows, the file can't be
+        # replaced while others have it open, so it is left to grow until it can be.)
+        try:
+            self._close_file()
+            os.replace(temp_path, self.path)
+        except OSError:
+            os.remove(temp_path)
+        self._refresh(locked=True)
+
+    def flush(self) -> None:
+        """Mark the masks used since the last flush as used, so they are kept over older ones when the file is
+        compacted"""
+        if not self._touched:
+            return
+        try:
+            with self._locked(True):
+                self._refresh(locked=True)
+                touched = [key for key in self._touched if key in self._index]
+                if touched:
+                    self._append(b"".join(_RECORD.pack(key, 0, 0, 0, KIND_TOUCH) for key in touched))
+        except (OSError, ValueError) as e:
+            self._warn(e)
+        self._touched.clear()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self) -> None:
+        self.flush()
+        self._close_file()
+        self._lock_file.close()
+
+
+# Open caches by directory, so they are shared by all runs in a session
+_caches: dict[str, DiskCache] = {}
+
+
+def open_cache(directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES) -> DiskCache:
+    directory = os.path.abspath(directory or default_directory())
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = DiskCache(directory, max_bytes)
+    cache.max_bytes = max_bytes
+    return cache
+
+
+def close_all() -> None:
+    for cache in _caches.values():
+        cache.close()
+    _caches.clear()
@@ -0,0 +1,62 @@
+import numpy as np
+from hashlib import blake2b
+from typing import TYPE_CHECKING
+from bpy.types import Mesh
+from . import core, pkginfo
+
+if TYPE_CHECKING:
+    from .process import MarkSettings
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core, pkginfo,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Fingerprints stamped on processed meshes (as an ID custom property), so incremental runs can skip meshes that have not
+changed since they were last processed with the same settings
+"""
+
+PROPERTY_NAME = "mark_sharps_fingerprint"
+
+
+def _counts(mesh: Mesh) -> str:
+    return f"{len(mesh.vertices)},{len(mesh.edges)},{len(mesh.loops)},{len(mesh.polygons)}"
+
+
+def _settings(settings: "MarkSettings") -> str:
+    angle = "auto" if settings.angle is None else f"{float(settings.angle)!r}"
+    return f"{angle},{settings.retain.name},{int(settings.include_single_edges)},{int(settings.crank_auto_smooth)}"
+
+
+def _digest(arrays: core.MeshArrays, sharp: np.ndarray) -> str:
+    digest = blake2b(core.geometry_hash(arrays).encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(sharp).data)
+    return digest.hexdigest()
+
+
+def _prefix(mesh: Mesh, settings: "MarkSettings") -> str:
+    """The parts of the fingerprint that can be checked without reading the mesh data: addon version, element counts,
+    settings, and the Auto Smooth angle"""
+    version = ".".join(str(v) for v in pkginfo.version())
+    return f"{version}|{_counts(mesh)}|{_settings(settings)}|{float(mesh.auto_smooth_angle)!r}|"
+
+
+def stamp(mesh: Mesh, arrays: core.MeshArrays, sharp: np.ndarray, settings: "MarkSettings") -> None:
+    """Stamp a processed mesh with its fingerprint. The arrays are the mesh's geometry, and sharp is its sharp flags
+    after processing."""
+    mesh[PROPERTY_NAME] = _prefix(mesh, settings) + _digest(arrays, sharp)
+
+
+def may_match(mesh: Mesh, settings: "MarkSettings") -> bool:
+    """Cheap check of whether the mesh's fingerprint could still match, without reading its data. If this is False,
+    the mesh has changed (or was never processed with these settings) and needs processing."""
+    stamped = mesh.get(PROPERTY_NAME)
+    return isinstance(stamped, str) and stamped.startswith(_prefix(mesh, settings))
+
+
+def matches(mesh: Mesh, arrays: core.MeshArrays, settings: "MarkSettings") -> bool:
+    """Full check of whether the mesh is unchanged since it was stamped with these settings"""
+    return may_match(mesh, settings) and mesh[PROPERTY_NAME] == _prefix(mesh, settings) + _digest(arrays, arrays.sharp)
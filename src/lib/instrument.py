@@ -0,0 +1,171 @@
+import json
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, ContextManager, Hashable, Iterator
+
+"""
+Optional instrumentation of a run: time spent in each stage of each mesh's processing (traversal, reading arrays, disk
+cache lookups, angle calculation, mask building, writing back and mesh updates), changed edge counts and peak memory.
+Instrumented code calls the module functions (stage(), changed(), ...), which do nothing unless a Recorder has been
+started.
+"""
+
+STAGES = ("traversal", "read", "cache", "angles", "mask", "write", "update")
+
+
+@dataclass
+class MeshRecord:
+    mesh: str
+    edges: int
+    stages: dict[str, float] = field(default_factory=dict)
+    seconds: float = 0.0
+    changed_edges: int = 0
+    # Peak memory allocated while processing the mesh, beyond what was allocated when it started. Only measured when
+    # meshes are processed one at a time.
+    peak_memory: int | None = None
+
+    @property
+    def edges_per_second(self) -> float:
+        return self.edges / self.seconds if self.seconds else 0.0
+
+
+class Recorder:
+    """Collects stage timings and per-mesh records for one run. Peak memory is measured with tracemalloc (which NumPy
+    reports its allocations to) if trace_memory is set; this slows pure-Python code such as the BMesh engine down."""
+
+    def __init__(self, trace_memory: bool = True):
+        self.records: dict[Hashable, MeshRecord] = {}
+        self.stages: dict[str, float] = {}
+        self.started = datetime.now(timezone.utc)
+        self.seconds = 0.0
+        self.peak_memory: int | None = None
+        self._start = perf_counter()
+        self._mesh_baselines: dict[Hashable, int] = {}
+        self._tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    def record(self, mesh: Any) -> MeshRecord:
+        if mesh not in self.records:
+            self.records[mesh] = MeshRecord(mesh.name_full, len(mesh.edges))
+        return self.records[mesh]
+
+    def add(self, name: str, seconds: float, mesh: Any = None) -> None:
+        """Add time to a stage of the run, and of the mesh if one is given"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if mesh is not None:
+            stages = self.record(mesh).stages
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, name: str, mesh: Any = None) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - start, mesh)
+
+    def mesh_started(self, mesh: Any) -> None:
+        self.record(mesh)
+        if self._tracing:
+            tracemalloc.reset_peak()
+            self._mesh_baselines[mesh] = tracemalloc.get_traced_memory()[0]
+
+    def mesh_finished(self, mesh: Any) -> None:
+        if mesh in self._mesh_baselines:
+            self.record(mesh).peak_memory = tracemalloc.get_traced_memory()[1] - self._mesh_baselines.pop(mesh)
+
+    def finish(self, mesh_seconds: dict[Any, float] = None) -> None:
+        """Stop recording, taking each mesh's total time from mesh_seconds if given"""
+        self.seconds = perf_counter() - self._start
+        for mesh, seconds in (mesh_seconds or {}).items():
+            if mesh in self.records:
+                self.records[mesh].seconds = seconds
+        if self._tracing:
+            self.peak_memory = max((record.peak_memory or 0 for record in self.records.values()), default=0) or \
+                               tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracing = False
+
+    def summary(self) -> str:
+        staged = sum(self.stages.values()) or 1
+        parts = [f"{name} {self.stages[name]:.3f}s ({self.stages[name] / staged:.0%})"
+                 for name in STAGES if name in self.stages]
+        text = f"Timing: {', '.join(parts) or 'nothing recorded'}"
+        if self.records:
+            slowest = max(self.records.values(), key=lambda record: record.seconds)
+            text += f". Slowest mesh: {slowest.mesh} ({slowest.seconds:.3f}s, {slowest.edges_per_second:,.0f} edges/s)"
+        if self.peak_memory:
+            text += f". Peak memory {self.peak_memory / 2 ** 20:,.1f} MB"
+        return text
+
+    def log_lines(self, run_info: dict[str, Any] = None) -> list[str]:
+        """JSON lines for the run log: one describing the run, then one for each mesh"""
+        run = {"type": "run", "started": self.started.isoformat(), "seconds": round(self.seconds, 6),
+               "meshes": len(self.records), "edges": sum(record.edges for record in self.records.values()),
+               "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+               "peak_memory": self.peak_memory, **(run_info or {})}
+        lines = [json.dumps(run)]
+        for record in self.records.values():
+            mesh = asdict(record)
+            mesh["stages"] = {name: round(seconds, 6) for name, seconds in record.stages.items()}
+            mesh["seconds"] = round(record.seconds, 6)
+            mesh["edges_per_second"] = round(record.edges_per_second, 1)
+            lines.append(json.dumps({"type": "mesh", **mesh}))
+        return lines
+
+    def write_log(self, path: str, run_info: dict[str, Any] = None) -> None:
+        """Append the run to a JSON-lines log file"""
+        with open(path, "a", encoding="utf-8") as log:
+            log.writelines(line + "\n" for line in self.log_lines(run_info))
+
+
+active: Recorder | None = None
+_NOT_RECORDING = nullcontext()
+
+
+def start(trace_memory: bool = True) -> Recorder:
+    global active
+    if active is not None:
+        active.finish()
+    active = Recorder(trace_memory)
+    return active
+
+
+def stop(mesh_seconds: dict[Any, float] = None) -> Recorder | None:
+    """Stop recording and return the recorder, if one was started"""
+    global active
+    recorder, active = active, None
+    if recorder is not None:
+        recorder.finish(mesh_seconds)
+    return recorder
+
+
+def stage(name: str, mesh: Any = None) -> ContextManager:
+    """Time the code in this context as a stage of the run (and of the mesh, if given), when recording"""
+    if active is None:
+        return _NOT_RECORDING
+    return active.timed(name, mesh)
+
+
+def add(name: str, seconds: float, mesh: Any = None) -> None:
+    if active is not None:
+        active.add(name, seconds, mesh)
+
+
+def changed(mesh: Any, count: int) -> None:
+    if active is not None:
+        active.record(mesh).changed_edges += count
+
+
+def mesh_started(mesh: Any) -> None:
+    if active is not None:
+        active.mesh_started(mesh)
+
+
+def mesh_finished(mesh: Any) -> None:
+    if active is not None:
+        active.mesh_finished(mesh)
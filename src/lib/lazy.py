@@ -0,0 +1,41 @@
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Iterable
+
+"""
+Deferred imports, so registering the addon (e.g. on every Blender start, or every farm job) doesn't pay for the engine
+modules and what they import (NumPy, BMesh, the caches and pools). A lazily imported module is only run the first time
+one of its attributes is used, which for the engines is when an operator first runs.
+"""
+
+
+def lazy_import(name: str, package: str) -> ModuleType:
+    """Import a module (by relative name, as in "from . import") without running it until it is first used. A module
+    already imported is returned as is."""
+    full_name = importlib.util.resolve_name(name, package)
+    module = sys.modules.get(full_name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(full_name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[full_name] = module
+    spec.loader.exec_module(module)
+    # Set it on its parent package, as the import statement would
+    parent, _, child = full_name.rpartition(".")
+    setattr(sys.modules[parent], child, module)
+    return module
+
+
+def is_loaded(module: ModuleType) -> bool:
+    """Whether a module has been run (a lazily imported module stops being a LazyLoader stand-in once it is used)"""
+    return type(module) is ModuleType
+
+
+def reload_loaded(modules: Iterable[ModuleType]) -> None:
+    """Reload the modules that have been run, for the addon's reload blocks. The rest are reloaded when first used."""
+    for module in modules:
+        if is_loaded(module):
+            importlib.reload(module)
@@ -0,0 +1,50 @@
+import os
+from dataclasses import dataclass, field
+from typing import Iterable
+import bpy
+from bpy.types import Library, Mesh
+
+"""
+Meshes linked from library files: Mark Sharps can't usefully change them (changes are lost when the file is saved), so
+the library files themselves are converted instead, each once however many meshes (or files) link from it, and then
+reloaded.
+"""
+
+
+@dataclass
+class LinkedLibrary:
+    """A library file with linked meshes that need converting"""
+    path: str
+    libraries: list[Library] = field(default_factory=list)
+    meshes: list[str] = field(default_factory=list)
+
+
+def library_path(library: Library) -> str:
+    """The library's absolute file path. Paths of indirectly linked libraries are relative to the library linking
+    them."""
+    return os.path.normpath(bpy.path.abspath(library.filepath, library=library.parent))
+
+
+def linked_libraries(meshes: Iterable[Mesh]) -> dict[str, LinkedLibrary]:
+    """Group the linked meshes with Auto Smooth on by the file they come from. The same file may be linked as more than
+    one library (e.g. by different relative paths), so they are grouped by absolute path."""
+    found: dict[str, LinkedLibrary] = {}
+    paths: dict[Library, str] = {}
+    for mesh in meshes:
+        library = mesh.library
+        if library is None or not mesh.use_auto_smooth:
+            continue
+        if library not in paths:
+            paths[library] = library_path(library)
+        linked = found.get(paths[library])
+        if linked is None:
+            linked = found[paths[library]] = LinkedLibrary(paths[library])
+        if library not in linked.libraries:
+            linked.libraries.append(library)
+        linked.meshes.append(mesh.name_full)
+    return found
+
+
+def reload(linked: LinkedLibrary) -> None:
+    for library in linked.libraries:
+        library.reload()
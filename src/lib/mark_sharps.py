@@ -1,37 +1,271 @@
 import bmesh
+import bpy
+import numpy as np
 from enum import Enum
+from itertools import islice
 from math import pi
+from typing import Any, Generator, Iterable
 from bpy.types import Mesh
+from . import core, angle_cache, instrument
+from .core import RetainStrategy
 
+if "_LOADED" in locals():
+    import importlib
 
-class RetainStrategy(Enum):
-    CLEAR_ALL = 0
-    RETAIN_SHARP = 1
-    RETAIN_SMOOTH = 2
+    for mod in (core, angle_cache, instrument,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
 
 
-def mark_auto_smooth(mesh: Mesh, angle: float = None, retain: RetainStrategy = RetainStrategy.CLEAR_ALL,
-                     include_single_edges: bool = True, crank_auto_smooth: bool = False) -> None:
-    if not mesh.use_auto_smooth:
-        return
+class Engine(Enum):
+    BMESH = 0
+    NUMPY = 1
+    LOW_MEMORY = 2
 
-    if angle is None:
-        angle = mesh.auto_smooth_angle
 
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
-    for edge in bm.edges:
+# Blender 4.0 stores sharp edges as a generic boolean edge attribute
+use_sharp_edge_attribute = bpy.app.version >= (4, 0, 0)
+
+
+def read_sharp_edges(mesh: Mesh) -> np.ndarray:
+    """Read the sharp flag of every edge of the mesh"""
+    sharp = np.zeros(len(mesh.edges), dtype=bool)
+    if not use_sharp_edge_attribute:
+        mesh.edges.foreach_get("use_edge_sharp", sharp)
+    elif (attribute := mesh.attributes.get("sharp_edge")) is not None:
+        attribute.data.foreach_get("value", sharp)
+    return sharp
+
+
+def write_sharp_edges(mesh: Mesh, sharp: np.ndarray, existing: np.ndarray = None) -> int:
+    """Set the sharp flag of every edge of the mesh in bulk, leaving all other mesh data alone. Nothing is written if
+    the flags are unchanged from the existing flags (read from the mesh if not given). Returns the number of edges
+    changed."""
+    with instrument.stage("write", mesh):
+        if existing is None:
+            existing = read_sharp_edges(mesh)
+        changed = int(np.count_nonzero(sharp != existing))
+        instrument.changed(mesh, changed)
+        if not changed:
+            return 0
+
+        if not use_sharp_edge_attribute:
+            mesh.edges.foreach_set("use_edge_sharp", sharp)
+        else:
+            attribute = mesh.attributes.get("sharp_edge") or mesh.attributes.new("sharp_edge", "BOOLEAN", "EDGE")
+            attribute.data.foreach_set("value", sharp)
+    # Only the edge flags changed, so tag the mesh for re-evaluation rather than doing a full mesh.update()
+    with instrument.stage("update", mesh):
+        mesh.update_tag()
+    return changed
+
+
+def read_mesh_arrays(mesh: Mesh) -> core.MeshArrays:
+    """Read the arrays needed to calculate edge angles: polygon normals, polygon loop starts and totals, loop edge
+    indices, and the existing sharp flags of the edges"""
+    with instrument.stage("read", mesh):
+        poly_count = len(mesh.polygons)
+
+        poly_normals = np.empty(poly_count * 3, dtype=np.float32)
+        mesh.polygons.foreach_get("normal", poly_normals)
+        loop_starts = np.empty(poly_count, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+        loop_totals = np.empty(poly_count, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        loop_edges = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("edge_index", loop_edges)
+
+        return core.MeshArrays(loop_starts=loop_starts, loop_totals=loop_totals, loop_edges=loop_edges,
+                               sharp=read_sharp_edges(mesh),
+                               poly_normals=poly_normals.reshape(-1, 3))
+
+
+def mesh_key(mesh: Mesh) -> int | str:
+    """A key identifying the mesh for the rest of the session, even across undo and renames if possible"""
+    return getattr(mesh, "session_uid", None) or mesh.name_full
+
+
+def run_steps(steps: Generator[float, None, Any]) -> Any:
+    """Run a step generator (yielding progress between chunks of work) to completion and return its result"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as finished:
+            return finished.value
+
+
+def edge_face_angles_steps(mesh: Mesh, arrays: core.MeshArrays, use_cache: bool = True,
+                           block_size: int = None) -> Generator[float, None, tuple[np.ndarray, np.ndarray]]:
+    """Get the (angles, manifold) arrays of the mesh's edges, from the angle cache if the geometry hasn't changed.
+    Calculation is done in blocks of block_size, yielding progress between them."""
+    key = fingerprint = None
+    if use_cache:
+        key = mesh_key(mesh)
+        fingerprint = core.geometry_hash(arrays)
+        cached = angle_cache.cache.get(key, fingerprint)
+        if cached is not None:
+            return cached
+
+    job = core.EdgeAngleJob(arrays, block_size)
+    while True:
+        with instrument.stage("angles", mesh):
+            done = job.step()
+        if done:
+            break
+        yield job.progress
+
+    if use_cache:
+        angle_cache.cache.put(key, fingerprint, job.angles, job.manifold)
+    return job.angles, job.manifold
+
+
+def edge_face_angles(mesh: Mesh, arrays: core.MeshArrays, use_cache: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """Get the (angles, manifold) arrays of the mesh's edges, from the angle cache if the geometry hasn't changed"""
+    return run_steps(edge_face_angles_steps(mesh, arrays, use_cache))
+
+
+def mark_bmesh_edges(edges: Iterable[bmesh.types.BMEdge], angle: float, retain: RetainStrategy,
+                     include_single_edges: bool) -> int:
+    """Set BMesh edges smooth or sharp by angle, as Auto Smooth would shade them. Returns the number of edges
+    changed."""
+    changed = 0
+    for edge in edges:
         if retain == RetainStrategy.CLEAR_ALL or \
                 (retain == RetainStrategy.RETAIN_SMOOTH and not edge.smooth) or \
                 (retain == RetainStrategy.RETAIN_SHARP and edge.smooth):
             edge_angle = edge.calc_face_angle(-1)
-            if edge_angle == -1 and include_single_edges:
-                edge.smooth = False
-                continue
-            edge.smooth = True if edge_angle == -1 else (edge_angle <= angle)
+            smooth = not include_single_edges if edge_angle == -1 else edge_angle <= angle
+            if edge.smooth != smooth:
+                edge.smooth = smooth
+                changed += 1
+    return changed
+
+
+def _history_edges(bm: bmesh.types.BMesh) -> list[bmesh.types.BMEdge]:
+    """The selected edges of the elements in the BMesh's selection history (the edges of selected faces, and the
+    selected edges of selected vertices), without duplicates"""
+    found = {}
+    for element in bm.select_history:
+        if not element.select:
+            continue
+        if isinstance(element, bmesh.types.BMEdge):
+            found[element] = None
+        elif isinstance(element, bmesh.types.BMFace):
+            found.update(dict.fromkeys(element.edges))
+        else:
+            found.update(dict.fromkeys(edge for edge in element.link_edges if edge.select))
+    return list(found)
+
+
+def selected_edges(bm: bmesh.types.BMesh, count: int = None) -> list[bmesh.types.BMEdge]:
+    """Get the selected edges of the BMesh, which include the edges of selected faces. If the number of selected
+    edges is known (e.g. from Mesh.total_edge_sel), give it as count: when the selection history accounts for all of
+    them (elements clicked one by one), they are taken from it at a cost that follows the selection. Otherwise (box,
+    lasso or select all, which don't add to the history) every edge is visited until they are all found, which costs
+    up to one pass over the mesh."""
+    if count == 0:
+        return []
+    if count is not None:
+        found = _history_edges(bm)
+        if len(found) == count:
+            return found
+    found = []
+    for edge in bm.edges:
+        if edge.select:
+            found.append(edge)
+            if len(found) == count:
+                break
+    return found
+
+
+def _mark_auto_smooth_bmesh(mesh: Mesh, angle: float, retain: RetainStrategy, include_single_edges: bool,
+                            block_size: int = None) -> Generator[float, None, np.ndarray]:
+    existing = read_sharp_edges(mesh)
+    bm = bmesh.new()
+    try:
+        with instrument.stage("read", mesh):
+            bm.from_mesh(mesh)
+        edge_count = len(bm.edges)
+        edges = iter(bm.edges)
+        for done in range(0, edge_count, block_size or edge_count or 1):
+            if done:
+                yield done / edge_count
+            with instrument.stage("angles", mesh):
+                mark_bmesh_edges(islice(edges, block_size), angle, retain, include_single_edges)
+        # Only the sharp flags are written back, as the other engines do, rather than the whole mesh with to_mesh()
+        with instrument.stage("write", mesh):
+            sharp = np.fromiter((not edge.smooth for edge in bm.edges), dtype=bool, count=edge_count)
+    finally:
+        bm.free()
+    write_sharp_edges(mesh, sharp, existing)
+    return sharp
+
+
+def _mark_auto_smooth_numpy(mesh: Mesh, angle: float, retain: RetainStrategy, include_single_edges: bool,
+                            use_cache: bool, arrays: core.MeshArrays = None,
+                            block_size: int = None) -> Generator[float, None, np.ndarray]:
+    if arrays is None:
+        arrays = read_mesh_arrays(mesh)
+    angles, manifold = yield from edge_face_angles_steps(mesh, arrays, use_cache, block_size)
+    with instrument.stage("mask", mesh):
+        mask = core.sharp_mask(angles, manifold, arrays.sharp, angle, retain, include_single_edges)
+    write_sharp_edges(mesh, mask, arrays.sharp)
+    return mask
+
+
+def _mark_auto_smooth_low_memory(mesh: Mesh, angle: float, retain: RetainStrategy, include_single_edges: bool,
+                                 arrays: core.MeshArrays = None, memory: core.MemoryTracker = None,
+                                 block_size: int = None) -> Generator[float, None, np.ndarray]:
+    if arrays is None:
+        arrays = read_mesh_arrays(mesh)
+    job = core.LowMemoryMaskJob(arrays, angle, retain, include_single_edges, memory, block_size)
+    while True:
+        # The low-memory engine builds the mask along with the angles, so both are timed as angles
+        with instrument.stage("angles", mesh):
+            done = job.step()
+        if done:
+            break
+        yield job.progress
+    write_sharp_edges(mesh, job.mask, arrays.sharp)
+    return job.mask
+
+
+def mark_edges_steps(mesh: Mesh, angle: float, retain: RetainStrategy = RetainStrategy.CLEAR_ALL,
+                     include_single_edges: bool = True, engine: Engine = Engine.NUMPY, use_cache: bool = True,
+                     arrays: core.MeshArrays = None, block_size: int = None,
+                     memory: core.MemoryTracker = None) -> Generator[float, None, np.ndarray]:
+    """Step generator version of mark_edges, processing edges in blocks of block_size and yielding the mesh's progress
+    (0 to 1) between blocks. The generator's return value is the new sharp flags. The low-memory engine records what
+    it holds in the memory tracker, and fits its block size to the tracker's limit."""
+    if engine == Engine.LOW_MEMORY:
+        return (yield from _mark_auto_smooth_low_memory(mesh, angle, retain, include_single_edges, arrays, memory,
+                                                        block_size))
+    if engine == Engine.NUMPY:
+        return (yield from _mark_auto_smooth_numpy(mesh, angle, retain, include_single_edges, use_cache, arrays,
+                                                   block_size))
+    return (yield from _mark_auto_smooth_bmesh(mesh, angle, retain, include_single_edges, block_size))
+
+
+def mark_edges(mesh: Mesh, angle: float, retain: RetainStrategy = RetainStrategy.CLEAR_ALL,
+               include_single_edges: bool = True, engine: Engine = Engine.NUMPY, use_cache: bool = True,
+               arrays: core.MeshArrays = None) -> np.ndarray:
+    """Mark the mesh's edges sharp or smooth by angle, regardless of its Auto Smooth setting, and return the new sharp
+    flags. Arrays already read from the mesh can be passed in to be reused by the NumPy engine."""
+    return run_steps(mark_edges_steps(mesh, angle, retain, include_single_edges, engine, use_cache, arrays))
+
+
+def mark_auto_smooth(mesh: Mesh, angle: float = None, retain: RetainStrategy = RetainStrategy.CLEAR_ALL,
+                     include_single_edges: bool = True, crank_auto_smooth: bool = False,
+                     engine: Engine = Engine.NUMPY, use_cache: bool = True) -> None:
+    """Mark edges sharp or smooth as Auto Smooth would shade them. The NumPy engine keeps each mesh's edge angles in
+    the angle cache (unless use_cache is False), so re-runs on unchanged geometry skip the angle calculation."""
+    if not mesh.use_auto_smooth:
+        return
+
+    if angle is None:
+        angle = mesh.auto_smooth_angle
 
-    bm.to_mesh(mesh)
-    mesh.update()
+    mark_edges(mesh, angle, retain, include_single_edges, engine, use_cache)
 
     if crank_auto_smooth:
         mesh.auto_smooth_angle = pi
@@ -1,5 +1,5 @@
 from typing import Iterable
-from bpy.types import Mesh, Object
+from bpy.types import Collection, Mesh, Object
 
 
 def may_have_meshes(objs: Iterable[Object]) -> bool:
@@ -15,39 +15,93 @@ def may_have_meshes(objs: Iterable[Object]) -> bool:
     return False
 
 
-def get_meshes(obj: Object, found: set[Mesh] = None) -> set[Mesh]:
-    """Get a set of meshes in the given object, as well as its instanced children and collection contents. Does not
-    return meshes from children of a parent-child relationship if they are not instanced."""
+class MeshIndex:
+    """Finds the meshes in objects, their instanced children and instanced collections (including nested child
+    collections), without recursion. Each collection's meshes are resolved once and remembered, so an index should
+    only be kept for as long as the scene can't change, e.g. for one operator run."""
 
-    if found is None:
-        found = set()
+    def __init__(self):
+        self._collections: dict[Collection, frozenset[Mesh]] = {}
 
-    if obj.instance_type == "NONE":
-        pass
-    elif obj.instance_type == "COLLECTION":
-        for coll_obj in obj.instance_collection.objects:
-            get_meshes(coll_obj, found)
-    else:
-        for inst_obj in obj.children:
-            get_meshes(inst_obj, found)
+    def _expand_objects(self, objs: Iterable[Object]) -> tuple[set[Mesh], list[Collection]]:
+        """Get the meshes of the objects and their instanced children, and the collections they instance"""
+        meshes = set()
+        collections = []
+        stack = list(objs)
+        seen = set()
+        while stack:
+            obj = stack.pop()
+            if obj in seen:
+                continue
+            seen.add(obj)
+            if isinstance(obj.data, Mesh):
+                meshes.add(obj.data)
+            if obj.instance_type == "NONE":
+                pass
+            elif obj.instance_type == "COLLECTION":
+                if obj.instance_collection is not None:
+                    collections.append(obj.instance_collection)
+            else:
+                stack.extend(obj.children)
+        return meshes, collections
 
-    if isinstance(obj.data, Mesh):
-        found.add(obj.data)
+    def collection_meshes(self, collection: Collection) -> frozenset[Mesh]:
+        """Get the meshes in a collection, its child collections, and everything they instance"""
+        if collection in self._collections:
+            return self._collections[collection]
 
-    return found
+        # Depth-first, resolving a collection once everything it depends on is resolved. Each stack entry is a
+        # collection and, once expanded, its own meshes and the collections it depends on.
+        stack: list[tuple[Collection, tuple[set[Mesh], list[Collection]] | None]] = [(collection, None)]
+        in_progress = set()
+        while stack:
+            current, expanded = stack[-1]
+            if current in self._collections:
+                stack.pop()
+                continue
+            if expanded is None:
+                in_progress.add(current)
+                meshes, instanced = self._expand_objects(current.objects)
+                dependencies = list(current.children) + instanced
+                stack[-1] = (current, (meshes, dependencies))
+                # A collection that is already in progress is (indirectly) instancing itself, so skip it to avoid
+                # looping forever
+                stack.extend((dependency, None) for dependency in dependencies
+                             if dependency not in self._collections and dependency not in in_progress)
+                continue
+            meshes, dependencies = expanded
+            for dependency in dependencies:
+                meshes |= self._collections.get(dependency, frozenset())
+            self._collections[current] = frozenset(meshes)
+            in_progress.discard(current)
+            stack.pop()
+        return self._collections[collection]
 
+    def object_meshes(self, objs: Iterable[Object], found: set[Mesh] = None) -> set[Mesh]:
+        """Get a set of meshes in the given objects, as well as their instanced children and collection contents"""
+        if found is None:
+            found = set()
+        meshes, collections = self._expand_objects(objs)
+        found |= meshes
+        # Many objects may instance the same collection, but its meshes only need adding once
+        for collection in dict.fromkeys(collections):
+            found |= self.collection_meshes(collection)
+        return found
 
-def get_meshes_multiple(objs: Iterable[Object], found: set[Mesh] = None) -> set[Mesh]:
-    """Get a set of meshes in the given objects, as well as their instanced children and collection contents. Does not
+
+def get_meshes(obj: Object, found: set[Mesh] = None, index: MeshIndex = None) -> set[Mesh]:
+    """Get a set of meshes in the given object, as well as its instanced children and collection contents. Does not
     return meshes from children of a parent-child relationship if they are not instanced."""
-    if found is None:
-        found = set()
-    for obj in objs:
-        get_meshes(obj, found)
-    return found
+    return get_meshes_multiple((obj,), found, index)
+
+
+def get_meshes_multiple(objs: Iterable[Object], found: set[Mesh] = None, index: MeshIndex = None) -> set[Mesh]:
+    """Get a set of meshes in the given objects, as well as their instanced children and collection contents. Does not
+    return meshes from children of a parent-child relationship if they are not instanced. Pass the same index to
+    several calls to share the collections resolved between them."""
+    return (index or MeshIndex()).object_meshes(objs, found)
 
 
 def get_meshes_shallow(objs: Iterable[Object], found: set[Mesh] = None) -> set[Mesh]:
     """Get a set of meshes from the given objects, not traversing into instanced children or collections"""
     return {obj.data for obj in objs if isinstance(obj.data, Mesh)} | (found or set())
-
@@ -0,0 +1,229 @@
+import os
+import numpy as np
+from concurrent.futures import Future, Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import fields
+from enum import Enum
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from time import perf_counter
+from . import core
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Thread and process pools for calculating sharp masks of many meshes at once. Only the array math runs in the pools;
+reading arrays from and writing results to meshes must stay on Blender's main thread. This module must not import bpy,
+since process pool workers import it in a plain Python process.
+"""
+
+# Results are (angles, manifold, mask, seconds spent calculating)
+MaskResult = tuple[np.ndarray, np.ndarray, np.ndarray, float]
+
+
+class Backend(Enum):
+    SERIAL = 0
+    THREAD = 1
+    PROCESS = 2
+
+
+DEFAULT_BACKEND = Backend.THREAD
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def compute(arrays: core.MeshArrays, angle: float, retain: core.RetainStrategy,
+            include_single_edges: bool) -> MaskResult:
+    start = perf_counter()
+    angles, manifold = core.edge_face_angles(arrays)
+    mask = core.sharp_mask(angles, manifold, arrays.sharp, angle, retain, include_single_edges)
+    return angles, manifold, mask, perf_counter() - start
+
+
+def _compute_batch(items: list[tuple[core.MeshArrays, float]], retain: str,
+                   include_single_edges: bool) -> list[MaskResult]:
+    """Pool task for a batch of small meshes, whose arrays are cheap enough to pass by pickling"""
+    return [compute(arrays, angle, core.RetainStrategy[retain], include_single_edges) for arrays, angle in items]
+
+
+# Shared memory layout: {name: (offset, dtype, shape)} for each array in one shared memory block
+Layout = dict[str, tuple[int, str, tuple[int, ...]]]
+
+
+def _layout(arrays: dict[str, np.ndarray]) -> tuple[Layout, int]:
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = (offset, array.dtype.str, array.shape)
+        # Keep every array 8-byte aligned
+        offset += -(-array.nbytes // 8) * 8
+    return layout, max(offset, 1)
+
+
+def _views(shm: SharedMemory, layout: Layout) -> dict[str, np.ndarray]:
+    return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout.items()}
+
+
+def _compute_shared(shm_name: str, layout: Layout, angle: float, retain: str, include_single_edges: bool) -> float:
+    """Process pool task: read the mesh arrays from shared memory and write the results back into it. Returns the
+    seconds spent calculating."""
+    # Spawned workers share the parent's resource tracker, so attaching here doesn't stop the parent unlinking the block
+    shm = SharedMemory(name=shm_name)
+    views = arrays = None
+    try:
+        views = _views(shm, layout)
+        arrays = core.MeshArrays(**{f.name: views.get(f.name) for f in fields(core.MeshArrays)})
+        *results, seconds = compute(arrays, angle, core.RetainStrategy[retain], include_single_edges)
+        for name, result in zip(("angles", "manifold", "mask"), results):
+            views[name][...] = result
+        return seconds
+    finally:
+        # Views into the block must be gone before it can be closed
+        del views, arrays
+        shm.close()
+
+
+# Run in each new worker process, before any task is unpickled. Registering the addon package and its lib package as
+# bare namespaces lets workers import this module without running the addon's __init__.py (which needs bpy).
+_WORKER_SETUP = """
+import sys, types
+for name, path in packages:
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        sys.modules[name] = module
+"""
+
+
+class MaskExecutor:
+    """Calculates sharp masks in a thread pool, a process pool (passing arrays through shared memory), or serially
+    on the calling thread"""
+
+    def __init__(self, backend: Backend = DEFAULT_BACKEND, workers: int = 0):
+        self.backend = backend
+        self.workers = workers or default_workers()
+        self._pool: Executor | None = None
+        if backend == Backend.THREAD:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="mark_sharps")
+        elif backend == Backend.PROCESS:
+            lib_dir = Path(__file__).parent
+            packages = [(__package__.rpartition(".")[0], str(lib_dir.parent)), (__package__, str(lib_dir))]
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"), initializer=exec,
+                                             initargs=(_WORKER_SETUP, {"packages": packages}))
+
+    @property
+    def max_pending(self) -> int:
+        """How many meshes to have read and waiting in the pool at once, to keep workers busy without holding every
+        mesh's arrays in memory"""
+        return 1 if self._pool is None else self.workers * 2
+
+    def submit(self, arrays: core.MeshArrays, angle: float, retain: core.RetainStrategy,
+               include_single_edges: bool) -> "Future[MaskResult]":
+        if self.backend == Backend.THREAD:
+            return self._pool.submit(compute, arrays, angle, retain, include_single_edges)
+        if self.backend == Backend.PROCESS:
+            return self._submit_shared(arrays, angle, retain, include_single_edges)
+        future = Future()
+        try:
+            future.set_result(compute(arrays, angle, retain, include_single_edges))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit_batch(self, items: list[tuple[core.MeshArrays, float]], retain: core.RetainStrategy,
+                     include_single_edges: bool) -> "list[Future[MaskResult]]":
+        """Calculate masks for a batch of (arrays, angle) pairs of small meshes as one pool task, to save the per-task
+        overhead. Returns a future for each item."""
+        futures = [Future() for _ in items]
+        if self._pool is None:
+            batch = Future()
+            try:
+                batch.set_result([compute(arrays, angle, retain, include_single_edges) for arrays, angle in items])
+            except Exception as e:
+                batch.set_exception(e)
+        else:
+            batch = self._pool.submit(_compute_batch, items, retain.name, include_single_edges)
+
+        def distribute(task: Future) -> None:
+            try:
+                for future, result in zip(futures, task.result()):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+
+        batch.add_done_callback(distribute)
+        return futures
+
+    def _submit_shared(self, arrays: core.MeshArrays, angle: float, retain: core.RetainStrategy,
+                       include_single_edges: bool) -> "Future[MaskResult]":
+        inputs = {f.name: np.ascontiguousarray(getattr(arrays, f.name)) for f in fields(core.MeshArrays)
+                  if getattr(arrays, f.name) is not None}
+        edge_count = arrays.edge_count
+        outputs = {"angles": np.empty(edge_count, dtype=np.float32), "manifold": np.empty(edge_count, dtype=bool),
+                   "mask": np.empty(edge_count, dtype=bool)}
+        layout, size = _layout(inputs | outputs)
+        shm = SharedMemory(create=True, size=size)
+        views = _views(shm, layout)
+        for name, array in inputs.items():
+            views[name][...] = array
+        del views
+
+        result = Future()
+
+        def collect(task: Future) -> None:
+            try:
+                seconds = task.result()
+                views = _views(shm, layout)
+                values = tuple(views[name].copy() for name in outputs)
+                del views
+                result.set_result((*values, seconds))
+            except Exception as e:
+                result.set_exception(e)
+            finally:
+                shm.close()
+                shm.unlink()
+
+        self._pool.submit(_compute_shared, shm.name, layout, angle, retain.name,
+                          include_single_edges).add_done_callback(collect)
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "MaskExecutor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+
+_shared_executor: MaskExecutor | None = None
+
+
+def shared_executor(backend: Backend = DEFAULT_BACKEND, workers: int = 0) -> MaskExecutor:
+    """Get an executor that is kept between runs (starting worker processes is slow), replacing it if the backend or
+    worker count changed"""
+    global _shared_executor
+    workers = workers or default_workers()
+    if _shared_executor is None or (_shared_executor.backend, _shared_executor.workers) != (backend, workers):
+        shutdown_shared_executor()
+        _shared_executor = MaskExecutor(backend, workers)
+    return _shared_executor
+
+
+def shutdown_shared_executor() -> None:
+    global _shared_executor
+    if _shared_executor is not None:
+        _shared_executor.shutdown()
+        _shared_executor = None
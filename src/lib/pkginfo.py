@@ -1,3 +1,15 @@
+import sys
+
+# The sharp-mask archive file extension. It is here, not in archive.py, so the archive operators can declare it without
+# loading the archive module.
+ARCHIVE_EXTENSION = ".msharps"
+
+
 def package_name() -> str:
     # Trim ".lib" from the package name of this module to get the "root" package name
     return __package__[:-4]
+
+
+def version() -> tuple[int, int, int]:
+    """The addon version from bl_info"""
+    return sys.modules[package_name()].bl_info["version"]
@@ -0,0 +1,136 @@
+import bpy
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterable
+from bpy.types import Mesh
+
+"""
+Planning of a run over many meshes: cheaply filtering out meshes there is nothing to do for, estimating how expensive
+each of the rest is, and ordering and batching them so the work spreads evenly over time slices and pool workers
+"""
+
+# Rough cost model of the NumPy engine, in seconds: a fixed overhead per mesh (reading arrays, hashing, writing flags,
+# Python bookkeeping) plus the per-loop face counting and per-edge angle calculation. Only the relative costs matter for
+# scheduling; the absolute values just make estimates comparable to actual times in the report.
+MESH_OVERHEAD = 150e-6
+LOOP_COST = 0.15e-6
+EDGE_COST = 0.12e-6
+
+# Meshes estimated below this cost are batched together until a batch reaches it
+BATCH_COST = 0.005
+
+REPORT_TEXT_NAME = "Mark Sharps Plan"
+
+LINKED = "linked from a library"
+
+
+@dataclass
+class PlanEntry:
+    mesh: Mesh
+    edges: int
+    loops: int
+    cost: float
+    # Why there is nothing to do for the mesh, or None if it will be processed
+    skip: str | None = None
+    # Actual processing time, once processed
+    seconds: float | None = None
+
+
+def estimate_cost(edges: int, loops: int) -> float:
+    return MESH_OVERHEAD + loops * LOOP_COST + edges * EDGE_COST
+
+
+def skip_reason(mesh: Mesh) -> str | None:
+    """Why marking sharp edges on the mesh would do nothing, or None if it would. Only checks that are cheap compared
+    to processing the mesh are made."""
+    if mesh.library is not None:
+        # Changes to linked meshes would be lost on saving: the library file itself needs converting
+        return LINKED
+    if not mesh.use_auto_smooth:
+        return "Auto Smooth is off"
+    if not len(mesh.polygons):
+        return "no faces"
+    # Sharp edges don't change the shading of flat faces
+    smooth = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get("use_smooth", smooth)
+    if not smooth.any():
+        return "all faces flat-shaded"
+    return None
+
+
+class Plan:
+    """The meshes of a run, largest first, with those there is nothing to do for set aside"""
+
+    def __init__(self, entries: list[PlanEntry], batch_cost: float = BATCH_COST):
+        self.entries = sorted(entries, key=lambda entry: entry.cost, reverse=True)
+        self.batch_cost = batch_cost
+
+    @property
+    def runnable(self) -> list[PlanEntry]:
+        return [entry for entry in self.entries if entry.skip is None]
+
+    @property
+    def skipped(self) -> list[PlanEntry]:
+        return [entry for entry in self.entries if entry.skip is not None]
+
+    @property
+    def total_cost(self) -> float:
+        return sum(entry.cost for entry in self.runnable)
+
+    def batches(self) -> list[list[PlanEntry]]:
+        """Split the runnable meshes into batches, each mesh on its own except for small meshes, which are grouped
+        until their total estimated cost reaches the batch cost"""
+        batches = []
+        current, current_cost = [], 0.0
+        for entry in self.runnable:
+            if entry.cost >= self.batch_cost:
+                batches.append([entry])
+                continue
+            current.append(entry)
+            current_cost += entry.cost
+            if current_cost >= self.batch_cost:
+                batches.append(current)
+                current, current_cost = [], 0.0
+        if current:
+            batches.append(current)
+        return batches
+
+    def report(self) -> list[str]:
+        """A table of the planned meshes with their estimated cost and (once run) actual time"""
+        runnable = self.runnable
+        total_cost = self.total_cost or 1
+        ran = [entry for entry in runnable if entry.seconds is not None]
+        total_seconds = sum(entry.seconds for entry in ran) or 1
+        lines = [
+            f"Mark Sharps plan: {len(runnable)} meshes in {len(self.batches())} batches, {len(self.skipped)} skipped, "
+            f"estimated {self.total_cost:.3f}s",
+        ]
+        if ran:
+            lines.append(f"Ran {len(ran)} meshes in {sum(entry.seconds for entry in ran):.3f}s")
+        lines += ["", f"{'Batch':>5}  {'Mesh':<32} {'Edges':>10} {'Loops':>10} {'Est. s':>9} {'Est. %':>7} "
+                      f"{'Actual s':>9} {'Actual %':>8}"]
+        for number, batch in enumerate(self.batches(), 1):
+            for entry in batch:
+                actual = "" if entry.seconds is None else f"{entry.seconds:>9.4f} {entry.seconds / total_seconds:>8.1%}"
+                lines.append(f"{number:>5}  {entry.mesh.name_full[:32]:<32} {entry.edges:>10,} {entry.loops:>10,} "
+                             f"{entry.cost:>9.4f} {entry.cost / total_cost:>7.1%} {actual}".rstrip())
+        if self.skipped:
+            lines += ["", "Skipped:"]
+            lines += [f"  {entry.mesh.name_full}: {entry.skip}" for entry in self.skipped]
+        return lines
+
+
+def plan_meshes(meshes: Iterable[Mesh], batch_cost: float = BATCH_COST) -> Plan:
+    entries = []
+    for mesh in meshes:
+        edges, loops = len(mesh.edges), len(mesh.loops)
+        entries.append(PlanEntry(mesh, edges, loops, estimate_cost(edges, loops), skip_reason(mesh)))
+    return Plan(entries, batch_cost)
+
+
+def write_report(plan: Plan, name: str = REPORT_TEXT_NAME) -> bpy.types.Text:
+    """Write the plan's report to a Text datablock, replacing its contents"""
+    text = bpy.data.texts.get(name) or bpy.data.texts.new(name)
+    text.clear()
+    text.write("\n".join(plan.report()) + "\n")
+    return text
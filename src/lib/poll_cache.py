@@ -0,0 +1,45 @@
+import bpy
+from bpy.app.handlers import persistent
+from typing import Callable
+
+"""
+Caching of expensive operator poll results. Polls of operators shown in menus and headers run on every redraw, so
+results that depend on e.g. the selection are remembered until a handler sees something change (a depsgraph update,
+which selection changes cause, a file load, or undo/redo).
+"""
+
+# (result, poll message) keyed by (poll name, view layer pointer), since each view layer has its own selection
+PollResult = tuple[bool, str | None]
+_cache: dict[tuple[str, int], PollResult] = {}
+
+_HANDLERS = ("depsgraph_update_post", "load_post", "undo_post", "redo_post")
+
+
+def cached_poll(name: str, context: bpy.types.Context, compute: Callable[[bpy.types.Context], PollResult]) -> PollResult:
+    """Get the cached result of the named poll in this context, calculating it with compute if it is not cached"""
+    view_layer = getattr(context, "view_layer", None)
+    key = (name, view_layer.as_pointer() if view_layer else 0)
+    if key not in _cache:
+        _cache[key] = compute(context)
+    return _cache[key]
+
+
+@persistent
+def invalidate(*args) -> None:
+    _cache.clear()
+
+
+def register_handlers() -> None:
+    for handler in _HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler)
+        if invalidate not in handlers:
+            handlers.append(invalidate)
+    invalidate()
+
+
+def unregister_handlers() -> None:
+    for handler in _HANDLERS:
+        handlers = getattr(bpy.app.handlers, handler)
+        if invalidate in handlers:
+            handlers.remove(invalidate)
+    invalidate()
@@ -0,0 +1,373 @@
+import numpy as np
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from enum import Enum
+from math import pi
+from time import perf_counter
+from typing import Any, Generator, Iterable
+from bpy.types import Mesh
+from . import core, mark_sharps, fingerprint, angle_cache, parallel, planner, instrument, revert, disk_cache
+from .core import RetainStrategy
+from .mark_sharps import Engine
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core, mark_sharps, fingerprint, angle_cache, parallel, planner, instrument, revert,
+                disk_cache,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+Processing of many meshes in one operator run, on top of the single-mesh functions in mark_sharps
+"""
+
+
+@dataclass
+class MarkSettings:
+    angle: float | None = None
+    retain: RetainStrategy = RetainStrategy.CLEAR_ALL
+    include_single_edges: bool = True
+    crank_auto_smooth: bool = False
+    engine: Engine = Engine.NUMPY
+    deduplicate: bool = True
+    incremental: bool = False
+    # Memory limit of the low-memory engine in bytes, or 0 for none
+    memory_limit: int = 0
+
+    def angle_for(self, mesh: Mesh) -> float:
+        return mesh.auto_smooth_angle if self.angle is None else self.angle
+
+    def as_dict(self) -> dict[str, Any]:
+        """The settings as plain values (enums by name), e.g. for JSON"""
+        return {name: value.name if isinstance(value, Enum) else value for name, value in asdict(self).items()}
+
+
+@dataclass
+class RunStats:
+    meshes: int = 0
+    skipped: int = 0
+    computed: int = 0
+    deduplicated: int = 0
+    cached: int = 0
+    unchanged: int = 0
+    edges: int = 0
+    seconds: float = 0.0
+    # Peak bytes held by the low-memory engine for any one mesh, and its limit
+    peak_memory: int = 0
+    memory_limit: int = 0
+
+    def summary(self) -> str:
+        text = f"Marked sharp edges on {self.meshes} mesh{'' if self.meshes == 1 else 'es'}"
+        if self.deduplicated:
+            text += f", {self.deduplicated} reused from identical meshes"
+        if self.cached:
+            text += f", {self.cached} from the disk cache"
+        if self.unchanged:
+            text += f", {self.unchanged} skipped as unchanged"
+        if self.peak_memory:
+            text += f", peak memory {self.peak_memory / 2 ** 20:,.1f} MB"
+            if self.memory_limit:
+                over = self.peak_memory > self.memory_limit
+                text += f" ({'over' if over else 'within'} the {self.memory_limit / 2 ** 20:,.0f} MB limit)"
+        return text
+
+    def throughput(self) -> str:
+        if self.seconds <= 0:
+            return ""
+        return f"{self.meshes / self.seconds:,.1f} meshes/s, {self.edges / self.seconds:,.0f} edges/s"
+
+
+@dataclass
+class _Task:
+    """A mesh that needs its sharp edges calculated"""
+    mesh: Mesh
+    angle: float
+    arrays: core.MeshArrays | None
+    key: str | None
+    # The sharp flags before processing, if they are being remembered for reverting
+    previous: np.ndarray | None = None
+    # The result key to store the mask under in the disk cache, if one is being used
+    cache_key: str | None = None
+
+
+class MeshProcessor:
+    """Marks sharp edges on meshes, remembering the results so meshes with identical geometry, settings and (if they
+    matter) existing sharp flags are computed only once. If a revert store is given, the previous sharp flags of
+    each mesh changed are remembered in it. If a disk cache is given, masks are looked up in it before being computed,
+    and added to it after."""
+
+    def __init__(self, settings: MarkSettings, revert_store: revert.RevertStore = None,
+                 mask_cache: disk_cache.DiskCache = None):
+        self.settings = settings
+        self.revert_store = revert_store
+        self.mask_cache = mask_cache
+        self.stats = RunStats(memory_limit=settings.memory_limit)
+        self.memory = core.MemoryTracker(settings.memory_limit)
+        # Time spent on each mesh, on the main thread and in pool workers
+        self.mesh_seconds: dict[Mesh, float] = defaultdict(float)
+        self._results: dict[str, np.ndarray] = {}
+        # Tasks for identical meshes, waiting for a result still being calculated in a pool
+        self._waiting: dict[str, list[_Task]] = {}
+
+    def _prepare(self, mesh: Mesh) -> _Task | None:
+        """Check whether the mesh needs processing, reusing an earlier identical result if there is one. Returns the
+        task to calculate, or None if the mesh is already done."""
+        settings = self.settings
+        if not mesh.use_auto_smooth:
+            self.stats.skipped += 1
+            return None
+        angle = settings.angle_for(mesh)
+
+        # The cheap fingerprint check avoids hashing the arrays of meshes that have obviously changed
+        check_unchanged = settings.incremental and fingerprint.may_match(mesh, settings)
+
+        arrays = key = None
+        use_cache = self.mask_cache is not None
+        if settings.deduplicate or settings.incremental or use_cache or settings.engine != Engine.BMESH:
+            arrays = mark_sharps.read_mesh_arrays(mesh)
+        if check_unchanged and fingerprint.matches(mesh, arrays, settings):
+            self.stats.unchanged += 1
+            return None
+        if settings.deduplicate or use_cache:
+            key = core.result_key(arrays, angle, settings.retain, settings.include_single_edges)
+
+        task = _Task(mesh, angle, arrays, key if settings.deduplicate else None)
+        if self.revert_store is not None:
+            task.previous = arrays.sharp if arrays is not None else mark_sharps.read_sharp_edges(mesh)
+        if task.key is not None and task.key in self._results:
+            self._write_duplicate(task, core.unpack_mask(self._results[task.key], arrays.edge_count))
+            return None
+        if use_cache:
+            with instrument.stage("cache", mesh):
+                mask = self.mask_cache.get(key, arrays.edge_count)
+            if mask is not None:
+                mark_sharps.write_sharp_edges(mesh, mask, arrays.sharp)
+                self.stats.cached += 1
+                if task.key is not None:
+                    self._results[task.key] = core.pack_mask(mask)
+                self._finish(task, mask)
+                return None
+            task.cache_key = key
+        return task
+
+    def _write_duplicate(self, task: _Task, mask: np.ndarray) -> None:
+        mark_sharps.write_sharp_edges(task.mesh, mask, task.arrays.sharp)
+        self.stats.deduplicated += 1
+        self._finish(task, mask)
+
+    def _finish_computed(self, task: _Task, mask: np.ndarray) -> None:
+        self.stats.computed += 1
+        if task.key is not None:
+            self._results[task.key] = core.pack_mask(mask)
+        if task.cache_key is not None:
+            with instrument.stage("cache", task.mesh):
+                self.mask_cache.put(task.cache_key, mask)
+        self._finish(task, mask)
+
+    def _finish(self, task: _Task, mask: np.ndarray) -> None:
+        settings = self.settings
+        if self.revert_store is not None:
+            self.revert_store.remember(task.mesh, task.previous, mask,
+                                       task.mesh.auto_smooth_angle if settings.crank_auto_smooth else None)
+        if settings.crank_auto_smooth:
+            task.mesh.auto_smooth_angle = pi
+        if settings.incremental:
+            fingerprint.stamp(task.mesh, task.arrays, mask, settings)
+        self.stats.meshes += 1
+        self.stats.edges += len(task.mesh.edges)
+
+    def process(self, mesh: Mesh) -> None:
+        mark_sharps.run_steps(self.process_steps(mesh))
+
+    def process_steps(self, mesh: Mesh, block_size: int = None) -> Generator[float, None, None]:
+        """Step generator version of process, processing edges in blocks of block_size and yielding the mesh's
+        progress (0 to 1) between blocks. Only time spent working (not suspended between steps) is counted."""
+        start = perf_counter()
+        instrument.mesh_started(mesh)
+        task = self._prepare(mesh)
+        if task is not None:
+            steps = mark_sharps.mark_edges_steps(task.mesh, task.angle, self.settings.retain,
+                                                 self.settings.include_single_edges, self.settings.engine,
+                                                 arrays=task.arrays, block_size=block_size, memory=self.memory)
+            while True:
+                try:
+                    progress = next(steps)
+                except StopIteration as result:
+                    mask = result.value
+                    break
+                self._add_seconds(mesh, perf_counter() - start)
+                yield progress
+                start = perf_counter()
+            self._finish_computed(task, mask)
+            self.stats.peak_memory = self.memory.peak
+        instrument.mesh_finished(mesh)
+        self._add_seconds(mesh, perf_counter() - start)
+
+    def close(self) -> None:
+        if self.mask_cache is not None:
+            self.mask_cache.flush()
+
+    def _add_seconds(self, mesh: Mesh, seconds: float) -> None:
+        self.mesh_seconds[mesh] += seconds
+        self.stats.seconds += seconds
+
+    def _collect(self, pending: dict[Future, _Task], done: Iterable[Future]) -> None:
+        """Write the results of finished pool calculations to their meshes, and to any identical meshes waiting on
+        them"""
+        for future in done:
+            start = perf_counter()
+            task = pending.pop(future)
+            angles, manifold, mask, seconds = future.result()
+            # The pool calculates angles and the mask together
+            instrument.add("angles", seconds, task.mesh)
+            angle_cache.cache.put(mark_sharps.mesh_key(task.mesh), core.geometry_hash(task.arrays), angles, manifold)
+            mark_sharps.write_sharp_edges(task.mesh, mask, task.arrays.sharp)
+            self._finish_computed(task, mask)
+            self.mesh_seconds[task.mesh] += seconds + perf_counter() - start
+            for duplicate in self._waiting.pop(task.key, []):
+                start = perf_counter()
+                self._write_duplicate(duplicate, mask)
+                self.mesh_seconds[duplicate.mesh] += perf_counter() - start
+
+    def _prepare_parallel(self, mesh: Mesh) -> _Task | None:
+        """Prepare a mesh for calculating in a pool. Returns None if it was finished without the pool, from an
+        identical mesh's or the angle cache's results, or is waiting on an identical mesh being calculated."""
+        settings = self.settings
+        task = self._prepare(mesh)
+        if task is None:
+            return None
+        if task.key is not None and task.key in self._waiting:
+            self._waiting[task.key].append(task)
+            return None
+        if cached := angle_cache.cache.get(mark_sharps.mesh_key(mesh), core.geometry_hash(task.arrays)):
+            with instrument.stage("mask", mesh):
+                mask = core.sharp_mask(*cached, task.arrays.sharp, task.angle, settings.retain,
+                                       settings.include_single_edges)
+            mark_sharps.write_sharp_edges(mesh, mask, task.arrays.sharp)
+            self._finish_computed(task, mask)
+            return None
+        if task.key is not None:
+            self._waiting[task.key] = []
+        return task
+
+    def parallel_steps(self, batches: list[list[Mesh]],
+                       executor: parallel.MaskExecutor) -> Generator[float, None, None]:
+        """Process batches of meshes with the NumPy engine, calculating masks in the executor's pool, one pool task
+        per batch. Mesh data is only read and written here, on the calling (main) thread. Yields the fraction of
+        meshes done while waiting on the pool."""
+        settings = self.settings
+        pending: dict[Future, _Task] = {}
+        mesh_count = sum(len(batch) for batch in batches) or 1
+        queued = 0
+        start = perf_counter()
+        for batch in batches:
+            tasks = []
+            for mesh in batch:
+                mesh_start = perf_counter()
+                if (task := self._prepare_parallel(mesh)) is not None:
+                    tasks.append(task)
+                self.mesh_seconds[mesh] += perf_counter() - mesh_start
+            queued += len(batch)
+            if len(tasks) == 1:
+                task = tasks[0]
+                pending[executor.submit(task.arrays, task.angle, settings.retain, settings.include_single_edges)] = task
+            elif tasks:
+                futures = executor.submit_batch([(task.arrays, task.angle) for task in tasks], settings.retain,
+                                                settings.include_single_edges)
+                pending.update(zip(futures, tasks))
+            while len(pending) >= executor.max_pending:
+                self._collect(pending, wait(pending, timeout=0.05, return_when=FIRST_COMPLETED).done)
+                self.stats.seconds += perf_counter() - start
+                yield (queued - len(pending)) / mesh_count
+                start = perf_counter()
+
+        while pending:
+            self._collect(pending, wait(pending, timeout=0.05, return_when=FIRST_COMPLETED).done)
+            self.stats.seconds += perf_counter() - start
+            yield 1 - len(pending) / mesh_count
+            start = perf_counter()
+        self.stats.seconds += perf_counter() - start
+
+
+class ProcessJob:
+    """Processes a list of meshes a little at a time, so the work can be spread over many calls to step(), e.g. from a
+    modal operator. The meshes are planned first, skipping those there is nothing to do for and ordering the rest
+    largest first. Meshes are processed a block of edges at a time, with small meshes batched between steps, or with an
+    executor (and the NumPy engine), calculated in its pool."""
+
+    def __init__(self, meshes: Iterable[Mesh], settings: MarkSettings, executor: parallel.MaskExecutor = None,
+                 block_size: int = 250_000, revert_store: revert.RevertStore = None,
+                 mask_cache: disk_cache.DiskCache = None):
+        self.plan = planner.plan_meshes(meshes)
+        self.executor = executor
+        self.block_size = block_size
+        self.processor = MeshProcessor(settings, revert_store, mask_cache)
+        self.processor.stats.skipped += len(self.plan.skipped)
+        self.progress = 0.0 if self.plan.runnable else 1.0
+        self.done = False
+        self._steps = self._run()
+
+    @property
+    def stats(self) -> RunStats:
+        return self.processor.stats
+
+    @property
+    def mesh_seconds(self) -> dict[Mesh, float]:
+        return self.processor.mesh_seconds
+
+    def _run(self) -> Generator[float, None, None]:
+        batches = self.plan.batches()
+        if self.executor is not None and self.processor.settings.engine == Engine.NUMPY:
+            yield from self.processor.parallel_steps([[entry.mesh for entry in batch] for batch in batches],
+                                                     self.executor)
+            return
+        total_cost = self.plan.total_cost
+        done_cost = 0.0
+        for batch in batches:
+            if len(batch) > 1:
+                # Small meshes are processed a whole batch per step
+                for entry in batch:
+                    self.processor.process(entry.mesh)
+                    done_cost += entry.cost
+            else:
+                entry = batch[0]
+                for mesh_progress in self.processor.process_steps(entry.mesh, self.block_size):
+                    yield (done_cost + entry.cost * mesh_progress) / total_cost
+                done_cost += entry.cost
+            yield done_cost / total_cost
+
+    def _record_seconds(self) -> None:
+        for entry in self.plan.runnable:
+            if entry.mesh in self.processor.mesh_seconds:
+                entry.seconds = self.processor.mesh_seconds[entry.mesh]
+
+    def step(self) -> bool:
+        """Do the next piece of work. Returns whether all meshes are done."""
+        if not self.done:
+            try:
+                self.progress = next(self._steps)
+            except StopIteration:
+                self.progress = 1.0
+                self.done = True
+                self._record_seconds()
+                self.processor.close()
+        return self.done
+
+    def run(self) -> RunStats:
+        while not self.step():
+            pass
+        return self.stats
+
+    def close(self) -> None:
+        """Stop processing. Meshes that are already processed are kept. Meshes in progress are left as they were, since
+        edge flags are only written once a mesh is finished."""
+        self._steps.close()
+        self._record_seconds()
+        self.processor.close()
+
+
+def process_meshes(meshes: Iterable[Mesh], settings: MarkSettings, executor: parallel.MaskExecutor = None,
+                   mask_cache: disk_cache.DiskCache = None) -> RunStats:
+    return ProcessJob(meshes, settings, executor, block_size=None, mask_cache=mask_cache).run()
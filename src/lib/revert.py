@@ -0,0 +1,97 @@
+import zlib
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Iterable
+from bpy.types import Mesh
+from . import core, mark_sharps, archive
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (core, mark_sharps, archive,):  # list all imports here
+        importlib.reload(mod)
+_LOADED = True
+
+"""
+A lightweight alternative to global undo for large runs: the sharp flags each changed mesh had before the run, kept
+bit-packed and compressed in memory (about an eighth of a byte per edge, usually much less), optionally saved to a
+sidecar file next to the .blend file, and restored in bulk by the Revert operator. The last run's store, which the
+Revert operator polls, is kept in revert_state.
+"""
+
+
+@dataclass
+class RevertEntry:
+    edges: int
+    blob: bytes
+    compressed: bool
+    # The Auto Smooth angle before the run, if the run changed it
+    auto_smooth_angle: float | None = None
+
+    def mask(self) -> np.ndarray:
+        packed = zlib.decompress(self.blob) if self.compressed else self.blob
+        return core.unpack_mask(np.frombuffer(packed, dtype=np.uint8), self.edges)
+
+
+@dataclass
+class RevertResult:
+    reverted: int = 0
+    # Names of meshes that weren't reverted, for reporting
+    mismatched: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+
+
+class RevertStore:
+    """The sharp flags (and Auto Smooth angles) meshes had before a run, for the meshes the run changed"""
+
+    def __init__(self):
+        self.entries: dict[str, RevertEntry] = {}
+        # The sidecar file the store was saved to, if any
+        self.sidecar: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(entry.blob) for entry in self.entries.values())
+
+    def remember(self, mesh: Mesh, previous: np.ndarray, sharp: np.ndarray, auto_smooth_angle: float = None) -> None:
+        """Remember the mesh's previous sharp flags, if they differ from its new flags or its Auto Smooth angle was
+        changed. A mesh's first remembered flags are kept, so the store always reverts to before the run."""
+        name = mesh.name_full
+        if name in self.entries or (auto_smooth_angle is None and np.array_equal(previous, sharp)):
+            return
+        packed = core.pack_mask(previous).tobytes()
+        compressed = zlib.compress(packed)
+        blob = compressed if len(compressed) < len(packed) else packed
+        self.entries[name] = RevertEntry(len(previous), blob, blob is compressed, auto_smooth_angle)
+
+    def restore(self, meshes: Iterable[Mesh]) -> RevertResult:
+        """Put the remembered flags back on the meshes, matched by name. Meshes whose edge count has changed since
+        are reported as mismatched, not changed."""
+        by_name = {mesh.name_full: mesh for mesh in meshes}
+        result = RevertResult()
+        for name, entry in self.entries.items():
+            mesh = by_name.get(name)
+            if mesh is None:
+                result.missing.append(name)
+            elif len(mesh.edges) != entry.edges:
+                result.mismatched.append(name)
+            else:
+                mark_sharps.write_sharp_edges(mesh, entry.mask())
+                if entry.auto_smooth_angle is not None:
+                    mesh.auto_smooth_angle = entry.auto_smooth_angle
+                result.reverted += 1
+        return result
+
+    def save(self, path: str, meshes: Iterable[Mesh]) -> int:
+        """Save the remembered flags and Auto Smooth angles of the meshes as a sharp-mask archive, which the Revert
+        operator (or archive import) can apply after the file is reloaded. Returns the number of masks saved."""
+        by_name = {mesh.name_full: mesh for mesh in meshes}
+        with archive.ArchiveWriter(path) as writer:
+            for name, entry in self.entries.items():
+                if name in by_name:
+                    writer.add(name, archive.mesh_hash(by_name[name]), entry.mask(), entry.auto_smooth_angle)
+        self.sidecar = path
+        return len(writer.entries)
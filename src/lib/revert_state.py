@@ -0,0 +1,55 @@
+import os
+from typing import TYPE_CHECKING
+import bpy
+from bpy.app.handlers import persistent
+
+if TYPE_CHECKING:
+    from .revert import RevertStore
+
+"""
+What there is to revert: the last revertible run's store, and the revert file saved next to the .blend file. Kept
+apart from revert.py, which needs NumPy and the engines, so the Revert operator's poll (run on every redraw of the
+menu) doesn't load them.
+"""
+
+SIDECAR_EXTENSION = ".msharps-revert"
+
+# The store of the last run, for the Revert operator
+last_run: "RevertStore | None" = None
+
+
+def sidecar_path() -> str | None:
+    """The revert sidecar file of the open .blend file, or None if the file has never been saved"""
+    return bpy.data.filepath + SIDECAR_EXTENSION if bpy.data.filepath else None
+
+
+def has_sidecar() -> bool:
+    path = sidecar_path()
+    return path is not None and os.path.exists(path)
+
+
+def remove_sidecar(path: str) -> None:
+    """Remove a revert file once it has been reverted, so the Revert operator doesn't offer it again. Raises OSError
+    if it exists but can't be removed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@persistent
+def forget(*args) -> None:
+    """Forget the last run's store, e.g. when another file is loaded"""
+    global last_run
+    last_run = None
+
+
+def register_handlers() -> None:
+    if forget not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(forget)
+
+
+def unregister_handlers() -> None:
+    if forget in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(forget)
+    forget()
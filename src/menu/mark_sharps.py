@@ -1,11 +1,11 @@
 import bpy
-from ..operator import mark_sharps
+from ..operator import mark_sharps, revert
 from ..lib import addon
 
 if "_LOADED" in locals():
     import importlib
 
-    for mod in (mark_sharps,):  # list all imports here
+    for mod in (mark_sharps, revert,):  # list all imports here
         importlib.reload(mod)
 _LOADED = True
 
@@ -14,8 +14,10 @@ class mark_sharps_MT_MarkSharps(addon.SimpleMenu):
     bl_idname = "mark_sharps_MT_mark_sharps"
     bl_label = "Mark Sharps"
     items = [
-        (mark_sharps.mesh_OT_mark_sharps_file, "EXEC_DEFAULT", "All Meshes in File"),
-        (mark_sharps.mesh_OT_mark_sharps_selected, "EXEC_DEFAULT", "Selected Object(s)")
+        (mark_sharps.mesh_OT_mark_sharps_file, "INVOKE_DEFAULT", "All Meshes in File"),
+        (mark_sharps.mesh_OT_mark_sharps_selected, "INVOKE_DEFAULT", "Selected Object(s)"),
+        (mark_sharps.mesh_OT_mark_sharps_file_no_undo, "INVOKE_DEFAULT", "All Meshes in File (Revertible, No Undo)"),
+        (revert.mesh_OT_mark_sharps_revert, "EXEC_DEFAULT", "Revert Last Revertible Run"),
     ]
 
 REGISTER_CLASSES = [mark_sharps_MT_MarkSharps]
@@ -0,0 +1,52 @@
+from typing import Set
+import bpy
+from bpy.props import StringProperty
+from bpy.types import Operator
+from bpy_extras.io_utils import ImportHelper
+from ..lib import lazy, pkginfo
+
+archive_lib = lazy.lazy_import("..lib.archive", __package__)
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (lazy, pkginfo,):  # list all imports here
+        importlib.reload(mod)
+    lazy.reload_loaded((archive_lib,))
+_LOADED = True
+
+"""
+This operator is also registered in Blender 4.1 and later, where the rest of the addon is not, so it must not rely on
+Auto Smooth or anything else removed in 4.1.
+"""
+
+
+class mesh_OT_mark_sharps_apply_archive(Operator, ImportHelper):
+    """Mark sharp edges on meshes in this file from a sharp-mask archive exported by Mark Sharps, without
+    recalculating them. Meshes are matched by name, and only changed if their geometry matches the exported mesh."""
+    bl_idname = "mesh.mark_sharps_apply_archive"
+    bl_label = "Apply Sharp-Mask Archive"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = pkginfo.ARCHIVE_EXTENSION
+    filter_glob: StringProperty(default=f"*{pkginfo.ARCHIVE_EXTENSION}", options={'HIDDEN'})
+
+    def execute(self, context) -> Set[str]:
+        try:
+            result = archive_lib.apply_archive(self.filepath, bpy.data.meshes)
+        except (OSError, archive_lib.ArchiveError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        for names, problem in ((result.mismatched, "geometry differs from the exported mesh"),
+                               (result.missing, "not found in this file"),
+                               (result.linked, "linked from a library, so can't be changed")):
+            if names:
+                print(f"Mark Sharps: Sharp edges not applied to {len(names)} meshes ({problem}):")
+                print("\n".join(f" - {name}" for name in names))
+                self.report({'WARNING'}, f"{len(names)} meshes not applied, {problem} (see the system console)")
+        self.report({'INFO'}, f"Applied sharp edges to {result.applied} mesh{'' if result.applied == 1 else 'es'}")
+        return {'FINISHED'}
+
+
+REGISTER_CLASSES = [mesh_OT_mark_sharps_apply_archive]
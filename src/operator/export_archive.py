@@ -0,0 +1,54 @@
+from typing import Set, TYPE_CHECKING
+import bpy
+from bpy.props import StringProperty
+from bpy.types import Mesh, Operator
+from bpy_extras.io_utils import ExportHelper
+from ..lib import lazy, pkginfo
+from .mark_sharps import MarkSharpsOptions
+
+if TYPE_CHECKING:
+    import numpy as np
+
+archive_lib = lazy.lazy_import("..lib.archive", __package__)
+core = lazy.lazy_import("..lib.core", __package__)
+mark_sharps_lib = lazy.lazy_import("..lib.mark_sharps", __package__)
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (lazy, pkginfo,):  # list all imports here
+        importlib.reload(mod)
+    lazy.reload_loaded((archive_lib, core, mark_sharps_lib,))
+_LOADED = True
+
+
+class mesh_OT_mark_sharps_export_archive(Operator, ExportHelper, MarkSharpsOptions):
+    """Calculate the sharp edges "Auto Smooth" would create for all meshes in the file and save them to a sharp-mask
+    archive, to be applied later (e.g. in Blender 4.1 or later) without changing this file"""
+    bl_idname = "mesh.mark_sharps_export_archive"
+    bl_label = "Export Sharp-Mask Archive"
+    bl_options = {'REGISTER'}
+
+    filename_ext = pkginfo.ARCHIVE_EXTENSION
+    filter_glob: StringProperty(default=f"*{pkginfo.ARCHIVE_EXTENSION}", options={'HIDDEN'})
+
+    def _compute_mask(self, mesh: Mesh) -> "np.ndarray":
+        arrays = mark_sharps_lib.read_mesh_arrays(mesh)
+        angles, manifold = mark_sharps_lib.edge_face_angles(mesh, arrays)
+        angle = self._angle()
+        if angle is None:
+            angle = mesh.auto_smooth_angle
+        return core.sharp_mask(angles, manifold, arrays.sharp, angle, core.RetainStrategy[self.retain],
+                               self.include_single_edges)
+
+    def execute(self, context) -> Set[str]:
+        meshes = [mesh for mesh in bpy.data.meshes if mesh.use_auto_smooth]
+        count = archive_lib.export_archive(self.filepath, meshes, self._compute_mask)
+        self.report({'INFO'}, f"Exported sharp edges of {count} mesh{'' if count == 1 else 'es'} to {self.filepath}")
+        return {'FINISHED'}
+
+    def draw(self, context) -> None:
+        self._draw_options(self.layout)
+
+
+REGISTER_CLASSES = [mesh_OT_mark_sharps_export_archive]
@@ -1,19 +1,46 @@
+import cProfile
+import os
+import tempfile
+from dataclasses import asdict
 from math import pi
-from typing import Set
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Iterable, Set, TYPE_CHECKING
 import bpy
-from ..lib import mark_sharps as mark_sharps_lib, object as object_lib
-from bpy.types import Operator
-from bpy.props import EnumProperty, BoolProperty, FloatProperty
+from ..lib import addon, lazy, object as object_lib, poll_cache, pkginfo, revert_state
+from bpy.types import Operator, Mesh
+from bpy.props import EnumProperty, BoolProperty, FloatProperty, IntProperty, StringProperty
+
+if TYPE_CHECKING:
+    from ..lib.analyze import AnalysisReport
+    from ..lib.disk_cache import DiskCache
+    from ..lib.parallel import MaskExecutor
+    from ..lib.process import MarkSettings
+
+# The engines, caches and pools are only loaded when an operator first runs
+mark_sharps_lib = lazy.lazy_import("..lib.mark_sharps", __package__)
+process_lib = lazy.lazy_import("..lib.process", __package__)
+parallel_lib = lazy.lazy_import("..lib.parallel", __package__)
+planner_lib = lazy.lazy_import("..lib.planner", __package__)
+instrument_lib = lazy.lazy_import("..lib.instrument", __package__)
+revert_lib = lazy.lazy_import("..lib.revert", __package__)
+analyze_lib = lazy.lazy_import("..lib.analyze", __package__)
+disk_cache_lib = lazy.lazy_import("..lib.disk_cache", __package__)
+library_lib = lazy.lazy_import("..lib.library", __package__)
+batch_convert = lazy.lazy_import("..cli.batch_convert", __package__)
 
 if "_LOADED" in locals():
     import importlib
 
-    for mod in (mark_sharps_lib, object_lib,):  # list all imports here
+    for mod in (addon, lazy, object_lib, poll_cache, pkginfo, revert_state,):  # list all imports here
         importlib.reload(mod)
+    lazy.reload_loaded((mark_sharps_lib, process_lib, parallel_lib, planner_lib, instrument_lib, revert_lib,
+                        analyze_lib, disk_cache_lib, library_lib, batch_convert,))
 _LOADED = True
 
 
-class MarkSharpsBaseOperator(Operator):
+class MarkSharpsOptions:
+    """The sharp-edge options shared by all Mark Sharps operators, including archive export"""
     retain: EnumProperty(
         items=[
             ("CLEAR_ALL", "Clear Existing Sharp/Smooth", "Clear existing Sharp and Smooth edges"),
@@ -24,24 +51,16 @@ class MarkSharpsBaseOperator(Operator):
         default="CLEAR_ALL"
     )
     include_single_edges: BoolProperty(default=True, name="Include Single Edges")
-    crank_auto_smooth: BoolProperty(default=False, name="Set Auto-smooth to 180°")
     override_angle: BoolProperty(default=False, name="Override Angle")
     override_angle_value: FloatProperty(default=pi/6, subtype="ANGLE",  min=0.0, max=pi, name="Angle")
 
-    def _mark_mesh(self, mesh):
-        mark_sharps_lib.mark_auto_smooth(
-            mesh,
-            angle=self.override_angle_value if self.override_angle else None,
-            retain=mark_sharps_lib.RetainStrategy[self.retain],
-            include_single_edges=self.include_single_edges,
-            crank_auto_smooth=self.crank_auto_smooth
-        )
+    def _angle(self) -> float | None:
+        """The angle to mark by, or None to use each mesh's Auto Smooth angle"""
+        return self.override_angle_value if self.override_angle else None
 
-    def draw(self, context):
-        layout = self.layout
+    def _draw_options(self, layout) -> None:
         layout.prop(self, "retain", text="")
         layout.prop(self, "include_single_edges")
-        layout.prop(self, "crank_auto_smooth")
         layout.label(text="Override Auto-Smooth Angle:")
         row = layout.row()
         row.prop(self, "override_angle", text="")
@@ -49,16 +68,394 @@ class MarkSharpsBaseOperator(Operator):
         subrow.enabled = self.override_angle
         subrow.prop(self, "override_angle_value", text="")
 
+
+class MarkingOptions(MarkSharpsOptions):
+    """The options of the operators that mark sharp edges on meshes"""
+    crank_auto_smooth: BoolProperty(default=False, name="Set Auto-smooth to 180°")
+
+    def _draw_options(self, layout) -> None:
+        super()._draw_options(layout)
+        layout.prop(self, "crank_auto_smooth")
+
+
+class MarkSharpsBaseOperator(Operator, MarkingOptions):
+    engine: EnumProperty(
+        items=[
+            ("BMESH", "BMesh", "Calculate edge angles one edge at a time using BMesh"),
+            ("NUMPY", "NumPy", "Calculate all edge angles at once using NumPy array operations (faster on large meshes)"),
+            ("LOW_MEMORY", "Low Memory", "Calculate edge angles in fixed-size blocks using NumPy, holding as little "
+                                         "memory as possible (for very large meshes)"),
+        ],
+        name="Engine",
+        default="NUMPY"
+    )
+    memory_limit: IntProperty(default=1024, min=0, name="Memory Limit (MB)",
+                              description="Memory the Low Memory engine may hold per mesh, including the mesh data it reads. "
+                                          "0 for no limit")
+    deduplicate: BoolProperty(default=True, name="Deduplicate Identical Meshes",
+                              description="Calculate sharp edges once for meshes with identical geometry and settings, "
+                                          "and copy the result to the others")
+    incremental: BoolProperty(default=False, name="Skip Unchanged Meshes",
+                              description="Skip meshes that have not changed since they were last processed with the "
+                                          "same settings, and stamp processed meshes so later runs can skip them")
+    dry_run: BoolProperty(default=False, name="Dry Run", options={'SKIP_SAVE'},
+                          description="Only plan the run, writing the meshes that would be processed and their "
+                                      "estimated cost to the \"Mark Sharps Plan\" text, without changing any meshes")
+    analyze: BoolProperty(default=False, name="Analyze Only", options={'SKIP_SAVE'},
+                          description="Only calculate what would change on each mesh (edges becoming sharp or smooth, "
+                                      "single edges and time), streaming it to the \"Mark Sharps Analysis\" text and "
+                                      "the analysis file, without changing any meshes")
+    analysis_path: StringProperty(default="", subtype="FILE_PATH", name="Analysis File",
+                                  description="Also stream the analysis to this JSON-lines file (leave empty for none)")
+    report_plan: BoolProperty(default=False, name="Write Plan Report",
+                              description="After processing, write the meshes processed with their estimated cost and "
+                                          "actual time to the \"Mark Sharps Plan\" text")
+    convert_libraries: BoolProperty(default=False, name="Convert Linked Libraries",
+                                    description="Meshes linked from library files can't be changed here, so convert "
+                                                "the library files themselves (each once), in background Blender "
+                                                "processes, then reload them. This saves the library files")
+    disk_cache_dir: StringProperty(default="", subtype="DIR_PATH", name="Disk Cache Directory",
+                                   options={'HIDDEN', 'SKIP_SAVE'},
+                                   description="Use the sharp mask disk cache in this directory, whether or not it is "
+                                               "turned on in the addon preferences (e.g. for batch conversion)")
+    disk_cache_size: IntProperty(default=0, min=0, name="Disk Cache Size (MB)", options={'HIDDEN', 'SKIP_SAVE'},
+                                 description="Size limit of the disk cache. 0 uses the addon preferences' limit")
+    run_modal: BoolProperty(default=True, name="Cancellable", options={'HIDDEN', 'SKIP_SAVE'},
+                            description="When invoked from the UI, process meshes a chunk at a time, showing progress "
+                                        "and allowing Esc to cancel")
+
+    # Seconds of processing per timer tick when running modal
+    tick_budget = 0.05
+    # Whether to remember the previous sharp flags of changed meshes for the Revert operator
+    use_revert_store = False
+    # The meshes to process, from the context. Each operator defines this as a method.
+    _meshes: Callable[[Any], Iterable[Mesh]]
+
+    def _settings(self) -> "MarkSettings":
+        return process_lib.MarkSettings(
+            angle=self._angle(),
+            retain=mark_sharps_lib.RetainStrategy[self.retain],
+            include_single_edges=self.include_single_edges,
+            crank_auto_smooth=self.crank_auto_smooth,
+            engine=mark_sharps_lib.Engine[self.engine],
+            deduplicate=self.deduplicate,
+            incremental=self.incremental,
+            memory_limit=self.memory_limit * 2 ** 20
+        )
+
+    @classmethod
+    def post_unregister(cls) -> None:
+        # Nothing to shut down if no run ever loaded them
+        if lazy.is_loaded(parallel_lib):
+            parallel_lib.shutdown_shared_executor()
+        if lazy.is_loaded(disk_cache_lib):
+            disk_cache_lib.close_all()
+
+    def _executor(self, context) -> "MaskExecutor | None":
+        """The thread or process pool to calculate NumPy engine masks in, as set in the addon preferences"""
+        if self.engine != "NUMPY":
+            return None
+        prefs = addon.get_preferences(context)
+        backend = parallel_lib.Backend[prefs.parallel_backend] if prefs else parallel_lib.DEFAULT_BACKEND
+        if backend == parallel_lib.Backend.SERIAL:
+            return None
+        return parallel_lib.shared_executor(backend, prefs.parallel_workers if prefs else 0)
+
+    def _mask_cache(self, context) -> "DiskCache | None":
+        """The disk cache of sharp masks, if one is given for this run or turned on in the addon preferences"""
+        prefs = addon.get_preferences(context)
+        if self.disk_cache_dir:
+            directory = bpy.path.abspath(self.disk_cache_dir)
+        elif prefs and prefs.disk_cache:
+            directory = bpy.path.abspath(prefs.disk_cache_dir) if prefs.disk_cache_dir else None
+        else:
+            return None
+        size = self.disk_cache_size or (prefs.disk_cache_size if prefs else 0)
+        try:
+            return disk_cache_lib.open_cache(directory, size * 2 ** 20 if size else disk_cache_lib.DEFAULT_MAX_BYTES)
+        except OSError as e:
+            self.report({'WARNING'}, f"Disk cache not used: {e}")
+            return None
+
+    def _dry_run(self, context) -> Set[str]:
+        plan = planner_lib.plan_meshes(self._meshes(context))
+        text = planner_lib.write_report(plan)
+        self.report({'INFO'}, f"Dry run: {len(plan.runnable)} meshes to process, {len(plan.skipped)} skipped. "
+                              f"See the \"{text.name}\" text for the plan.")
+        return {'FINISHED'}
+
+    def _write_plan_report(self) -> None:
+        if self.report_plan:
+            planner_lib.write_report(self._job.plan)
+
+    def _profiled(self, function: Callable[[], Any]) -> Any:
+        """Call the function, profiling it if profiling is on for this run"""
+        if self._profile is None:
+            return function()
+        self._profile.enable()
+        try:
+            return function()
+        finally:
+            self._profile.disable()
+
+    def _start_job(self, context, **job_options) -> None:
+        prefs = addon.get_preferences(context)
+        self._profile = cProfile.Profile() if prefs and prefs.profile else None
+        if prefs and prefs.instrumentation:
+            instrument_lib.start()
+
+        self._revert_store = revert_lib.RevertStore() if self.use_revert_store and not self.analyze else None
+
+        def start() -> None:
+            with instrument_lib.stage("traversal"):
+                meshes = list(self._meshes(context))
+            if self.analyze:
+                self._job = analyze_lib.AnalysisJob(meshes, self._settings(), self._analysis_report(),
+                                                    **job_options)
+            else:
+                self._job = process_lib.ProcessJob(meshes, self._settings(), self._executor(context),
+                                                   revert_store=self._revert_store,
+                                                   mask_cache=self._mask_cache(context), **job_options)
+
+        self._profiled(start)
+
+    def _analysis_report(self) -> "AnalysisReport":
+        path = bpy.path.abspath(self.analysis_path) if self.analysis_path else None
+        try:
+            return analyze_lib.AnalysisReport(path, run_info=self._run_info())
+        except OSError as e:
+            self.report({'WARNING'}, f"Could not write the analysis file {path}: {e}")
+            return analyze_lib.AnalysisReport(run_info=self._run_info())
+
+    def _run_info(self) -> dict[str, Any]:
+        """Describes the run for the instrumentation log and analysis file"""
+        info = {"operator": self.bl_idname, "file": bpy.data.filepath, "blender": bpy.app.version_string,
+                "addon_version": ".".join(str(part) for part in pkginfo.version()),
+                "settings": self._settings().as_dict()}
+        if getattr(self, "_job", None) is not None:
+            info["stats"] = asdict(self._job.stats)
+        return info
+
+    def _keep_revert_store(self) -> None:
+        """Make the run's revert store the one the Revert operator uses"""
+        revert_state.last_run = self._revert_store
+        # Registered on the first kept store rather than with the addon, as there is nothing to forget before it
+        revert_state.register_handlers()
+        self.report({'INFO'}, f"Previous sharp edges of {len(self._revert_store)} meshes kept for reverting "
+                              f"({self._revert_store.nbytes / 1024:,.1f} KB)")
+
+    def _library_options(self) -> dict[str, Any]:
+        """This run's options, for converting library files with the batch worker"""
+        options = {name: getattr(self, name) for name in ("retain", "include_single_edges", "crank_auto_smooth",
+                                                          "override_angle", "override_angle_value", "engine",
+                                                          "memory_limit", "deduplicate")}
+        mask_cache = self._job.processor.mask_cache
+        if mask_cache is not None:
+            options.update(disk_cache_dir=mask_cache.directory, disk_cache_size=mask_cache.max_bytes // 2 ** 20)
+        return options
+
+    def _start_libraries(self, convert: bool) -> None:
+        """Report the meshes skipped for being linked from libraries or, if convert, start converting their libraries
+        in background Blender processes (self._libraries), to be reloaded by _finish_libraries once done"""
+        self._libraries = None
+        linked = library_lib.linked_libraries(entry.mesh for entry in self._job.plan.skipped
+                                              if entry.skip == planner_lib.LINKED)
+        if not linked:
+            return
+        meshes = sum(len(library.meshes) for library in linked.values())
+        if not convert:
+            print(f"Mark Sharps: Skipped {meshes} meshes linked from libraries:")
+            print("\n".join(f" - {path}: {', '.join(library.meshes)}" for path, library in linked.items()))
+            self.report({'WARNING'}, f"Skipped {meshes} linked meshes, which can't be changed here. Use Convert "
+                                     f"Linked Libraries to convert their {len(linked)} library files instead.")
+            return
+        if not bpy.app.binary_path:
+            self.report({'WARNING'}, "Can't convert linked libraries: Blender's executable path isn't known")
+            return
+        command = batch_convert.worker_command(bpy.app.binary_path, None, self._library_options())
+        # Libraries the libraries link from are converted too
+        self._libraries = batch_convert.BatchRunner(command, jobs=min(len(linked), os.cpu_count() or 1), timeout=600,
+                                                    follow_libraries=True)
+        self._linked = linked
+        self._libraries.start(linked)
+
+    def _finish_libraries(self) -> None:
+        """Reload the converted libraries, and report how their conversion went"""
+        results = self._libraries.wait()
+        self._libraries = None
+        failed = [result for result in results if result.status != "ok"]
+        for result in results:
+            if result.status == "ok" and result.path in self._linked:
+                library_lib.reload(self._linked[result.path])
+        for result in failed:
+            print(f"Mark Sharps: Could not convert library {result.path}: {result.status} "
+                  f"{result.details.get('error', '')}")
+        self.report({'WARNING'} if failed else {'INFO'},
+                    f"Converted and reloaded {len(results) - len(failed)} of {len(results)} library files"
+                    f"{' (see the system console for failures)' if failed else ''}")
+
+    def _finish_job(self, context) -> None:
+        """Keep the revert store, write the plan report, instrumentation log and profile, as requested"""
+        if self._revert_store is not None:
+            self._keep_revert_store()
+        self._write_plan_report()
+        prefs = addon.get_preferences(context)
+        if self.analyze:
+            self.report({'INFO'}, f"See the \"{analyze_lib.REPORT_TEXT_NAME}\" text for the analysis")
+        recorder = instrument_lib.stop(self._job.mesh_seconds)
+        if recorder is not None:
+            self.report({'INFO'}, recorder.summary())
+            if prefs and prefs.instrumentation_log:
+                path = bpy.path.abspath(prefs.instrumentation_log)
+                try:
+                    recorder.write_log(path, self._run_info())
+                except OSError as e:
+                    self.report({'WARNING'}, f"Could not write the run log to {path}: {e}")
+        if self._profile is not None:
+            directory = bpy.path.abspath(prefs.profile_dir) if prefs and prefs.profile_dir else tempfile.gettempdir()
+            path = os.path.join(directory, f"mark_sharps_{datetime.now():%Y%m%d_%H%M%S_%f}.prof")
+            try:
+                self._profile.dump_stats(path)
+                self.report({'INFO'}, f"Profile saved to {path}")
+            except OSError as e:
+                self.report({'WARNING'}, f"Could not save the profile to {path}: {e}")
+
+    def execute(self, context) -> Set[str]:
+        if self.dry_run:
+            return self._dry_run(context)
+        self._start_job(context, block_size=None)
+        stats = self._profiled(self._job.run)
+        self.report({'INFO'}, stats.summary())
+        self._finish_job(context)
+        if not self.analyze:
+            # Not run modally, so this waits for the libraries (e.g. in batch workers)
+            self._start_libraries(self.convert_libraries)
+            if self._libraries is not None:
+                self._finish_libraries()
+        return {'FINISHED'}
+
+    def invoke(self, context, event) -> Set[str]:
+        if self.dry_run or not self.run_modal or bpy.app.background:
+            return self.execute(context)
+        self._start_job(context)
+        self._libraries = None
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, 100)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event) -> Set[str]:
+        if self._libraries is not None:
+            return self._modal_libraries(context, event)
+        if event.type == 'ESC':
+            return self._finish_modal(context, cancelled=True)
+        if event.type == 'TIMER':
+            if self._profiled(self._tick):
+                return self._finish_modal(context)
+            context.window_manager.progress_update(self._job.progress * 100)
+        # Swallow other events, so the meshes can't be edited out from under the job
+        return {'RUNNING_MODAL'}
+
+    def _tick(self) -> bool:
+        """Work on the job for up to the tick budget. Returns whether it is done."""
+        deadline = perf_counter() + self.tick_budget
+        while perf_counter() < deadline:
+            if self._job.step():
+                return True
+        return False
+
+    def _modal_libraries(self, context, event) -> Set[str]:
+        """Wait for the library conversion, polling it on each timer event, so Blender stays responsive"""
+        if event.type == 'ESC':
+            self._libraries.cancel()
+        if event.type == 'TIMER':
+            if self._libraries.finished:
+                self._finish_libraries()
+                return self._end_modal(context)
+            context.window_manager.progress_update(self._libraries.progress * 100)
+        return {'RUNNING_MODAL'}
+
+    def _finish_modal(self, context, cancelled: bool = False) -> Set[str]:
+        self._job.close()
+        stats = self._job.stats
+        if cancelled:
+            self.report({'WARNING'}, f"Cancelled. {stats.summary()} before cancelling ({stats.throughput()})")
+        else:
+            self.report({'INFO'}, f"{stats.summary()} ({stats.throughput()})")
+        self._finish_job(context)
+        if not self.analyze:
+            self._start_libraries(self.convert_libraries and not cancelled)
+            if self._libraries is not None:
+                self.report({'INFO'}, f"Converting {len(self._linked)} library files in the background (Esc to "
+                                      f"cancel)")
+                context.window_manager.progress_update(0)
+                return {'RUNNING_MODAL'}
+        return self._end_modal(context)
+
+    def _end_modal(self, context) -> Set[str]:
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        # Finish even when cancelled, so the meshes processed so far are kept and can be undone (or reverted)
+        return {'FINISHED'}
+
+    def draw(self, context):
+        layout = self.layout
+        self._draw_options(layout)
+        layout.prop(self, "engine")
+        if self.engine == "LOW_MEMORY":
+            layout.prop(self, "memory_limit")
+        layout.prop(self, "deduplicate")
+        layout.prop(self, "incremental")
+        layout.prop(self, "convert_libraries")
+        layout.prop(self, "report_plan")
+        layout.prop(self, "dry_run")
+        layout.prop(self, "analyze")
+        row = layout.row()
+        row.enabled = self.analyze
+        row.prop(self, "analysis_path")
+
 class mesh_OT_mark_sharps_file(MarkSharpsBaseOperator):
     """Mark sharp edges created by the "Auto Smooth" option for all meshes in the file"""
     bl_idname = "mesh.mark_sharps_file"
     bl_label = "Mark Sharps in File"
     bl_options = {'REGISTER', 'UNDO'}
 
-    def execute(self, context) -> Set[str]:
-        for mesh in bpy.data.meshes:
-            self._mark_mesh(mesh)
-        return {'FINISHED'}
+    def _meshes(self, context) -> Iterable[Mesh]:
+        return bpy.data.meshes
+
+
+class mesh_OT_mark_sharps_file_no_undo(mesh_OT_mark_sharps_file):
+    """Mark sharp edges created by the "Auto Smooth" option for all meshes in the file, without a global undo step
+    (which copies the whole file). The previous sharp edges of changed meshes are kept instead, for Revert Mark
+    Sharps."""
+    bl_idname = "mesh.mark_sharps_file_no_undo"
+    bl_label = "Mark Sharps in File (Revertible, No Undo)"
+    bl_options = {'REGISTER'}
+
+    use_revert_store = True
+
+    save_sidecar: BoolProperty(default=False, name="Save Revert File",
+                               description="Also save the previous sharp edges to a file next to the .blend file, so "
+                                           "they can be reverted after reloading it")
+
+    def _keep_revert_store(self) -> None:
+        super()._keep_revert_store()
+        if not self.save_sidecar:
+            return
+        path = revert_state.sidecar_path()
+        if path is None:
+            self.report({'WARNING'}, "The file has not been saved, so no revert file was saved")
+            return
+        try:
+            self._revert_store.save(path, bpy.data.meshes)
+        except OSError as e:
+            self.report({'WARNING'}, f"Could not save the revert file {path}: {e}")
+
+    def draw(self, context) -> None:
+        super().draw(context)
+        self.layout.prop(self, "save_sidecar")
 
 
 class mesh_OT_mark_sharps_selected(MarkSharpsBaseOperator):
@@ -69,15 +466,31 @@ class mesh_OT_mark_sharps_selected(MarkSharpsBaseOperator):
 
     include_children: BoolProperty(default=True, name="Include Collection Contents/Instanced Children", description="Include instanced children and Collection Instance contents")
 
+    @classmethod
+    def post_register(cls) -> None:
+        poll_cache.register_handlers()
+
+    @classmethod
+    def post_unregister(cls) -> None:
+        poll_cache.unregister_handlers()
+        super().post_unregister()
+
+    @staticmethod
+    def _poll_selection(context) -> poll_cache.PollResult:
+        selected_objects = context.selected_objects
+        if len(selected_objects) == 0:
+            return False, "No objects selected"
+        if object_lib.may_have_meshes(selected_objects):
+            return True, None
+        return False, "No selected objects contain mesh data"
+
     @classmethod
     def poll(cls, context) -> bool:
-        if len(bpy.context.selected_objects) == 0:
-            cls.poll_message_set("No objects selected")
-            return False
-        if object_lib.may_have_meshes(bpy.context.selected_objects):
-            return True
-        cls.poll_message_set("No selected objects contain mesh data")
-        return False
+        # This polls on every redraw of the menus it's in, so only check the selection again after it may have changed
+        result, message = poll_cache.cached_poll(cls.bl_idname, context, cls._poll_selection)
+        if message:
+            cls.poll_message_set(message)
+        return result
 
     def draw(self, context) -> None:
         layout = self.layout
@@ -85,15 +498,10 @@ class mesh_OT_mark_sharps_selected(MarkSharpsBaseOperator):
         layout.separator()
         super().draw(context)
 
-    def execute(self, context) -> Set[str]:
+    def _meshes(self, context) -> Iterable[Mesh]:
         if self.include_children:
-            meshes = object_lib.get_meshes_multiple(bpy.context.selected_objects)
-        else:
-            meshes = object_lib.get_meshes_shallow(bpy.context.selected_objects)
-
-        for mesh in meshes:
-            self._mark_mesh(mesh)
-        return {'FINISHED'}
+            return object_lib.get_meshes_multiple(bpy.context.selected_objects)
+        return object_lib.get_meshes_shallow(bpy.context.selected_objects)
 
 
-REGISTER_CLASSES = [mesh_OT_mark_sharps_file, mesh_OT_mark_sharps_selected]
+REGISTER_CLASSES = [mesh_OT_mark_sharps_file, mesh_OT_mark_sharps_file_no_undo, mesh_OT_mark_sharps_selected]
@@ -0,0 +1,73 @@
+from typing import Set
+from bpy.types import Operator, Mesh
+from ..lib import lazy
+from .mark_sharps import MarkSharpsOptions
+
+mark_sharps_lib = lazy.lazy_import("..lib.mark_sharps", __package__)
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (lazy,):  # list all imports here
+        importlib.reload(mod)
+    lazy.reload_loaded((mark_sharps_lib,))
+_LOADED = True
+
+
+class mesh_OT_mark_sharps_edit_selected(Operator, MarkSharpsOptions):
+    """Mark sharp edges created by the "Auto Smooth" option on the selected edges (including the edges of selected
+    faces) of the meshes being edited, leaving the rest of the mesh alone. Auto Smooth isn't set to 180°, as that would
+    change the shading of the edges that weren't selected."""
+    bl_idname = "mesh.mark_sharps_edit_selected"
+    bl_label = "Mark Sharps on Selected Edges"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context) -> bool:
+        if context.mode != 'EDIT_MESH':
+            cls.poll_message_set("Only available in Edit Mode")
+            return False
+        # total_edge_sel is kept up to date by edit mode, so this doesn't need to look at the edges
+        if not any(isinstance(obj.data, Mesh) and obj.data.total_edge_sel for obj in
+                   context.objects_in_mode_unique_data):
+            cls.poll_message_set("No edges or faces selected")
+            return False
+        return True
+
+    def execute(self, context) -> Set[str]:
+        # Imported here rather than on registration, like the engines
+        import bmesh
+
+        retain = mark_sharps_lib.RetainStrategy[self.retain]
+        meshes = edges = changed = skipped = 0
+        for obj in context.objects_in_mode_unique_data:
+            mesh = obj.data
+            if not isinstance(mesh, Mesh) or not mesh.total_edge_sel:
+                continue
+            if not mesh.use_auto_smooth:
+                skipped += 1
+                continue
+            angle = self._angle()
+            if angle is None:
+                angle = mesh.auto_smooth_angle
+            bm = bmesh.from_edit_mesh(mesh)
+            # Only the selected edges' angles are calculated, so the cost follows the selection, not the mesh
+            selected = mark_sharps_lib.selected_edges(bm, mesh.total_edge_sel)
+            mesh_changed = mark_sharps_lib.mark_bmesh_edges(selected, angle, retain, self.include_single_edges)
+            if mesh_changed:
+                bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+            meshes += 1
+            edges += len(selected)
+            changed += mesh_changed
+
+        if skipped:
+            self.report({'WARNING'}, f"Skipped {skipped} mesh{'' if skipped == 1 else 'es'} without Auto Smooth")
+        self.report({'INFO'}, f"Changed {changed:,} of {edges:,} selected edges on {meshes} "
+                              f"mesh{'' if meshes == 1 else 'es'}")
+        return {'FINISHED'}
+
+    def draw(self, context) -> None:
+        self._draw_options(self.layout)
+
+
+REGISTER_CLASSES = [mesh_OT_mark_sharps_edit_selected]
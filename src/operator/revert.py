@@ -0,0 +1,79 @@
+from typing import Set
+import bpy
+from bpy.types import Operator
+from ..lib import lazy, revert_state
+
+archive_lib = lazy.lazy_import("..lib.archive", __package__)
+
+if "_LOADED" in locals():
+    import importlib
+
+    for mod in (lazy, revert_state,):  # list all imports here
+        importlib.reload(mod)
+    lazy.reload_loaded((archive_lib,))
+_LOADED = True
+
+
+class mesh_OT_mark_sharps_revert(Operator):
+    """Put back the sharp edges meshes had before the last revertible (no undo) Mark Sharps run, or, after reloading
+    the file, from its saved revert file"""
+    bl_idname = "mesh.mark_sharps_revert"
+    bl_label = "Revert Mark Sharps"
+    # Like the run it reverts, this skips the global undo step
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def post_unregister(cls) -> None:
+        # The handlers are registered by the run that keeps a store
+        revert_state.unregister_handlers()
+
+    @classmethod
+    def poll(cls, context) -> bool:
+        # Runs on every redraw of the menu, so it only looks at revert_state, which doesn't load the engines
+        if revert_state.last_run is not None or revert_state.has_sidecar():
+            return True
+        cls.poll_message_set("No revertible Mark Sharps run to revert")
+        return False
+
+    def _report_skipped(self, names: list[str], problem: str) -> None:
+        if names:
+            print(f"Mark Sharps: Sharp edges not reverted on {len(names)} meshes ({problem}):")
+            print("\n".join(f" - {name}" for name in names))
+            self.report({'WARNING'}, f"{len(names)} meshes not reverted, {problem} (see the system console)")
+
+    def _revert_sidecar(self) -> Set[str]:
+        path = revert_state.sidecar_path()
+        try:
+            result = archive_lib.apply_archive(path, bpy.data.meshes)
+        except (OSError, archive_lib.ArchiveError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self._report_skipped(result.mismatched, "geometry changed since the run")
+        self._report_skipped(result.missing, "not found in this file")
+        self.report({'INFO'}, f"Reverted sharp edges on {result.applied} mesh{'' if result.applied == 1 else 'es'} "
+                              f"from {path}")
+        self._remove_sidecar(path)
+        return {'FINISHED'}
+
+    def _remove_sidecar(self, path: str) -> None:
+        try:
+            revert_state.remove_sidecar(path)
+        except OSError as e:
+            self.report({'WARNING'}, f"Could not remove the reverted revert file {path}: {e}")
+
+    def execute(self, context) -> Set[str]:
+        store = revert_state.last_run
+        if store is None:
+            return self._revert_sidecar()
+        result = store.restore(bpy.data.meshes)
+        revert_state.last_run = None
+        # The run's revert file holds the same flags, and reverting again would undo any changes made since
+        if store.sidecar is not None:
+            self._remove_sidecar(store.sidecar)
+        self._report_skipped(result.mismatched, "edge count changed since the run")
+        self._report_skipped(result.missing, "not found in this file")
+        self.report({'INFO'}, f"Reverted sharp edges on {result.reverted} mesh{'' if result.reverted == 1 else 'es'}")
+        return {'FINISHED'}
+
+
+REGISTER_CLASSES = [mesh_OT_mark_sharps_revert]
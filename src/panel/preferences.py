@@ -1,24 +1,103 @@
 import bpy
+from bpy.props import BoolProperty, EnumProperty, IntProperty, StringProperty
 
-from ..lib import pkginfo
+from ..lib import addon, lazy, pkginfo
+
+# Loads the engines, so only when auto-processing is turned on
+auto_process = lazy.lazy_import("..lib.auto_process", __package__)
 
 if "_LOADED" in locals():
     import importlib
 
-    for mod in (pkginfo,):  # list all imports here
+    for mod in (addon, lazy, pkginfo,):  # list all imports here
         importlib.reload(mod)
+    lazy.reload_loaded((auto_process,))
 _LOADED = True
 
 package_name = pkginfo.package_name()
 
 
+def _update_auto_process(self, context) -> None:
+    if self.auto_process or lazy.is_loaded(auto_process):
+        auto_process.set_enabled(self.auto_process)
+
+
 class PreferencesPanel(bpy.types.AddonPreferences):
     bl_idname = package_name
 
+    @classmethod
+    def post_register(cls) -> None:
+        prefs = addon.get_preferences()
+        if prefs is not None and prefs.auto_process:
+            auto_process.register_handlers()
+
+    @classmethod
+    def post_unregister(cls) -> None:
+        if lazy.is_loaded(auto_process):
+            auto_process.unregister_handlers()
+
+    parallel_backend: EnumProperty(
+        items=[
+            ("SERIAL", "Off", "Process one mesh at a time"),
+            ("THREAD", "Threads", "Calculate several meshes at once in a pool of threads"),
+            ("PROCESS", "Processes", "Calculate several meshes at once in a pool of processes, passing mesh data "
+                                     "through shared memory. Slower to start, but not limited by Python's GIL"),
+        ],
+        name="Parallel Processing",
+        description="How to spread calculations across CPU cores when using the NumPy engine",
+        default="THREAD"
+    )
+    parallel_workers: IntProperty(default=0, min=0, soft_max=64, name="Workers",
+                                  description="Number of threads or processes to use. 0 uses one per CPU core")
+
+    instrumentation: BoolProperty(default=False, name="Instrument Runs",
+                                  description="Time each stage of each mesh's processing and report where the time "
+                                              "went after each run. Also measures peak memory, which slows the BMesh "
+                                              "engine down")
+    instrumentation_log: StringProperty(default="", subtype="FILE_PATH", name="Run Log",
+                                        description="Append each instrumented run to this JSON-lines file (leave "
+                                                    "empty for none)")
+    profile: BoolProperty(default=False, name="Profile Runs",
+                          description="Capture a cProfile profile of each run and save it as a .prof file")
+    profile_dir: StringProperty(default="", subtype="DIR_PATH", name="Profile Directory",
+                                description="Where to save profiles (leave empty for the temporary directory)")
+    disk_cache: BoolProperty(default=False, name="Disk Cache",
+                             description="Keep calculated sharp edges in a cache on disk, shared by all files and "
+                                         "Blender sessions (and processes) using the same cache directory, so meshes "
+                                         "reused across files are only calculated once")
+    disk_cache_dir: StringProperty(default="", subtype="DIR_PATH", name="Cache Directory",
+                                   description="Where to keep the disk cache (leave empty for the temporary "
+                                               "directory)")
+    disk_cache_size: IntProperty(default=1024, min=1, soft_max=65536, name="Cache Size (MB)",
+                                 description="Size limit of the disk cache. The least recently used sharp edges are "
+                                             "dropped when it is reached")
+    auto_process: BoolProperty(default=False, name="Auto-Process New Meshes", update=_update_auto_process,
+                               description="Mark sharps on meshes appended or otherwise added to the open file, "
+                                           "shortly after they are added, with the default options and the NumPy "
+                                           "engine. Meshes already in a file when it is opened are left alone")
+
     def draw(self, context) -> None:
         layout = self.layout
         layout.label(text=f"Blender {bpy.app.version_string} is older than 4.1.x. The addon is loaded!",
                      icon="OUTLINER_OB_LIGHT")
+        layout.prop(self, "parallel_backend")
+        row = layout.row()
+        row.enabled = self.parallel_backend != "SERIAL"
+        row.prop(self, "parallel_workers")
+        layout.prop(self, "instrumentation")
+        row = layout.row()
+        row.enabled = self.instrumentation
+        row.prop(self, "instrumentation_log")
+        layout.prop(self, "profile")
+        row = layout.row()
+        row.enabled = self.profile
+        row.prop(self, "profile_dir")
+        layout.prop(self, "disk_cache")
+        col = layout.column()
+        col.enabled = self.disk_cache
+        col.prop(self, "disk_cache_dir")
+        col.prop(self, "disk_cache_size")
+        layout.prop(self, "auto_process")
 
 
 REGISTER_CLASSES = [PreferencesPanel]
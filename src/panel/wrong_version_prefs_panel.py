@@ -18,6 +18,7 @@ class WrongVersionPrefsPanel(bpy.types.AddonPreferences):
         layout = self.layout
         layout.label(text="This addon is not compatible with Blender 4.1 or later. The addon has not been loaded.",
                      icon="ERROR")
+        layout.label(text="Sharp-mask archives exported from older versions can still be applied from File > Import.")
 
 
 REGISTER_CLASSES = [WrongVersionPrefsPanel]
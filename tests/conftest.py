@@ -0,0 +1,28 @@
+"""
+Tests run the addon under plain CPython with tools/mock_bpy.py standing in for Blender:
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+# The batch converter and scanner run outside Blender, as scripts
+sys.path.insert(0, str(ROOT / "src" / "cli"))
+
+import mock_bpy  # noqa: E402
+
+
+@pytest.fixture
+def addon():
+    """The addon, registered against freshly reset mock data"""
+    mock_bpy.install()
+    mock_bpy.reset()
+    addon = mock_bpy.load_addon()
+    addon.register()
+    yield addon
+    addon.unregister()
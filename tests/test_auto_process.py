@@ -0,0 +1,61 @@
+"""
+Auto-processing marks sharps on meshes added to the open file, and leaves the meshes it has already seen alone.
+"""
+
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+import benchmark
+import mock_bpy
+
+
+@pytest.fixture
+def auto_process(addon):
+    module = importlib.import_module(f"{mock_bpy.ADDON_NAME}.lib.auto_process")
+    module.register_handlers()
+    yield module
+    module.unregister_handlers()
+
+
+def depsgraph(*ids):
+    return SimpleNamespace(updates=[SimpleNamespace(id=id_data) for id_data in ids])
+
+
+def run_timer() -> None:
+    """Run the registered timer as Blender would, until it is done"""
+    [timer] = mock_bpy.bpy.app.timers.registered
+    while timer() is not None:
+        pass
+    mock_bpy.bpy.app.timers.unregister(timer)
+
+
+def sharp_count(mesh: mock_bpy.Mesh) -> int:
+    return int(mesh.edges._attributes["use_edge_sharp"].sum())
+
+
+def test_added_mesh_is_processed(auto_process):
+    [old] = benchmark.make_grid(1_000)
+    auto_process.on_reset()
+    auto_process.on_depsgraph_update(None, depsgraph(old))
+    assert not mock_bpy.bpy.app.timers.registered
+
+    [new] = benchmark.make_grid(1_000)
+    auto_process.on_depsgraph_update(None, depsgraph())
+    run_timer()
+    assert sharp_count(new) and not sharp_count(old)
+
+
+@pytest.mark.parametrize("update", ["mesh", "object"])
+def test_mesh_replacing_another_is_processed(auto_process, update):
+    """Adding a mesh while removing another leaves the number of meshes the same, so the update itself is checked"""
+    [removed] = benchmark.make_grid(1_000)
+    auto_process.on_reset()
+    mock_bpy.bpy.data.meshes.remove(removed)
+    [new] = benchmark.make_grid(1_000)
+
+    updated = new if update == "mesh" else mock_bpy.bpy.data.objects.new("Grid", new)
+    auto_process.on_depsgraph_update(None, depsgraph(updated))
+    run_timer()
+    assert sharp_count(new)
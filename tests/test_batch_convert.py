@@ -0,0 +1,121 @@
+"""
+The batch converter's orchestration, driven by tools/fake_batch_worker.py, which crashes, hangs or fails by file name
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import batch_convert
+
+FAKE_WORKER = [sys.executable, str(Path(__file__).resolve().parents[1] / "tools" / "fake_batch_worker.py")]
+
+
+def make_files(directory: Path, *names: str) -> list[Path]:
+    paths = []
+    for name in names:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+        paths.append(path)
+    return paths
+
+
+def run(paths: list[Path], jobs: int = 2, **options) -> dict[str, batch_convert.FileResult]:
+    """Run the batch with the fake worker, returning the results by file name"""
+    options = {"timeout": 5, "startup_timeout": 10, **options}
+    results = batch_convert.BatchRunner(FAKE_WORKER, jobs=jobs, **options).run(str(path) for path in paths)
+    return {Path(result.path).name: result for result in results}
+
+
+def test_ok_and_failed(tmp_path):
+    results = run(make_files(tmp_path, "ok.blend", "fail.blend"), retries=1)
+    assert (results["ok.blend"].status, results["ok.blend"].attempts) == ("ok", 1)
+    assert (results["fail.blend"].status, results["fail.blend"].attempts) == ("failed", 2)
+    assert results["fail.blend"].details["error"] == "Simulated failure"
+
+
+def test_crash_is_retried_on_a_new_worker(tmp_path):
+    results = run(make_files(tmp_path, "a.blend", "crash.blend", "b.blend"), jobs=1, retries=1)
+    assert (results["crash.blend"].status, results["crash.blend"].attempts) == ("crashed", 2)
+    # The files after the crash are converted by a restarted worker
+    assert results["a.blend"].status == results["b.blend"].status == "ok"
+    assert results["a.blend"].details["pid"] != results["b.blend"].details["pid"]
+
+
+def test_hang_times_out(tmp_path):
+    results = run(make_files(tmp_path, "hang.blend", "after.blend"), jobs=1, timeout=1, retries=0)
+    assert (results["hang.blend"].status, results["hang.blend"].attempts) == ("timeout", 1)
+    assert results["after.blend"].status == "ok"
+
+
+def test_libraries_are_converted_once(tmp_path):
+    a, b, library, nested = make_files(tmp_path, "a.blend", "b.blend", "libs/library.blend", "libs/nested.blend")
+    for path, libraries in ((a, [library]), (b, [library, nested]), (library, [nested])):
+        Path(f"{path}.libraries").write_text("\n".join(str(library) for library in libraries))
+    results = batch_convert.BatchRunner(FAKE_WORKER, jobs=2, timeout=5, follow_libraries=True).run([str(a), str(b)])
+    assert sorted(Path(result.path).name for result in results) == ["a.blend", "b.blend", "library.blend",
+                                                                      "nested.blend"]
+    assert all(result.status == "ok" for result in results)
+
+
+def test_outputs_of_files_with_the_same_name_are_distinct(tmp_path):
+    first, second = make_files(tmp_path, "one/scene.blend", "two/scene.blend")
+    output_dir = tmp_path / "out"
+    results = batch_convert.BatchRunner(FAKE_WORKER, jobs=2, timeout=5, output_dir=str(output_dir)).run(
+        [str(first), str(second)])
+    outputs = {result.details["output"] for result in results}
+    assert len(outputs) == 2
+    assert all(Path(output).parent == output_dir and Path(output).name.startswith("scene-") for output in outputs)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Needs symbolic links")
+def test_duplicate_output_is_rejected(tmp_path):
+    scene, = make_files(tmp_path, "scene.blend")
+    link = tmp_path / "link.blend"
+    link.symlink_to(scene)
+    results = run([scene, link], output_dir=str(tmp_path / "out"))
+    assert results["scene.blend"].status == "ok"
+    assert results["link.blend"].status == "failed"
+    assert results["link.blend"].attempts == 0
+    assert "already used by" in results["link.blend"].details["error"]
+
+
+def test_main_writes_results_and_fails_on_failures(tmp_path):
+    make_files(tmp_path / "blends", "ok.blend", "fail.blend")
+    results_path = tmp_path / "results.jsonl"
+    status = batch_convert.main([str(tmp_path / "blends"), "--worker-command", " ".join(FAKE_WORKER), "--jobs", "2",
+                                 "--retries", "0", "--results", str(results_path)])
+    assert status == 1
+    records = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert sorted((Path(record["path"]).name, record["status"]) for record in records) == [("fail.blend", "failed"),
+                                                                                            ("ok.blend", "ok")]
+
+
+def test_started_batch_can_be_cancelled(tmp_path):
+    runner = batch_convert.BatchRunner(FAKE_WORKER, jobs=1, timeout=60, startup_timeout=10)
+    runner.start(str(path) for path in make_files(tmp_path, "hang.blend", "after.blend"))
+    # Long enough for the worker to start and take the hanging file
+    time.sleep(0.5)
+    assert not runner.finished
+    runner.cancel()
+    results = runner.wait()
+    assert runner.finished
+    assert [(Path(result.path).name, result.status) for result in results] == [("hang.blend", "cancelled")]
+
+
+def test_libraries_and_output_dir_are_rejected(tmp_path, capsys):
+    """Copies saved to the output directory would link the original libraries, not their converted copies"""
+    [scene] = make_files(tmp_path, "scene.blend")
+    output_dir = tmp_path / "out"
+    with pytest.raises(SystemExit) as exit_info:
+        batch_convert.main([str(scene), "--worker-command", " ".join(FAKE_WORKER), "--convert-libraries",
+                            "--output-dir", str(output_dir), "--results", str(tmp_path / "results.jsonl")])
+    assert exit_info.value.code == 2
+    assert "--convert-libraries can't be combined with --output-dir" in capsys.readouterr().err
+    assert not output_dir.exists() and not (tmp_path / "results.jsonl").exists()
+    with pytest.raises(ValueError):
+        batch_convert.BatchRunner(FAKE_WORKER, jobs=1, timeout=5, follow_libraries=True, output_dir=str(output_dir))
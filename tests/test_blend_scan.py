@@ -0,0 +1,272 @@
+"""
+The Blender-free scanner, on .blend files saved by Blender (tests/fixtures/blend, from tools/save_blend_fixtures.py)
+and, for the cases those don't cover, written by tools/blend_fixtures.py, its index, and batch_convert's use of it to
+select and order files
+"""
+
+import gzip
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+from functools import cache
+from math import radians
+from pathlib import Path
+
+import pytest
+
+import batch_convert
+import blend_fixtures
+import blend_scan
+from blend_fixtures import FixtureMesh
+
+TOOLS = Path(__file__).resolve().parents[1] / "tools"
+FAKE_WORKER = [sys.executable, str(TOOLS / "fake_batch_worker.py")]
+SAVED = Path(__file__).resolve().parent / "fixtures" / "blend"
+# What Blender read from each saved file
+SAVED_EXPECTED = json.loads((SAVED / "expected.json").read_text(encoding="utf-8"))
+NEEDS_ZSTD = pytest.mark.skipif(not blend_fixtures.zstd_available(),
+                                reason="Needs Python 3.14+ or the zstandard package")
+
+MESHES = [FixtureMesh("Cube"), FixtureMesh("Plane", auto_smooth=False, edges=4, polys=1, loops=4),
+          FixtureMesh("Scan", angle=radians(45), edges=30_000, polys=10_000, loops=40_000)]
+COMPRESSIONS = [None, "gzip", pytest.param("zstd", marks=NEEDS_ZSTD)]
+
+
+def mesh_summary(result: blend_scan.ScanResult) -> list[tuple]:
+    return [(mesh.name, mesh.auto_smooth, round(mesh.angle, 5), mesh.edges, mesh.polys, mesh.loops)
+            for mesh in result.meshes]
+
+
+EXPECTED_MESHES = [(mesh.name, mesh.auto_smooth, round(mesh.angle, 5), mesh.edges, mesh.polys, mesh.loops)
+                   for mesh in MESHES]
+
+
+@pytest.mark.parametrize("name", [pytest.param(name, marks=NEEDS_ZSTD if expected["compression"] == "zstd" else ())
+                                  for name, expected in SAVED_EXPECTED.items() if name.endswith(".blend")])
+def test_files_saved_by_blender(name):
+    expected = SAVED_EXPECTED[name]
+    result = blend_scan.scan_file(str(SAVED / name))
+    assert result.error is None
+    assert (result.version, result.compression) == (expected["version"], expected["compression"])
+    # Blender lists meshes by name, and the scanner in file order
+    assert sorted((mesh.name, mesh.auto_smooth, mesh.edges, mesh.polys, mesh.loops) for mesh in result.meshes) == [
+        (mesh["name"], mesh["auto_smooth"], mesh["edges"], mesh["polys"], mesh["loops"]) for mesh in expected["meshes"]]
+    assert sorted(mesh.angle for mesh in result.meshes if mesh.auto_smooth) == pytest.approx(
+        sorted(mesh["angle"] for mesh in expected["meshes"] if mesh["auto_smooth"]))
+    assert result.libraries == [os.path.normpath(SAVED / library[2:]) for library in expected["libraries"]]
+    assert result.needs_work == any(mesh["auto_smooth"] for mesh in expected["meshes"])
+
+
+@cache
+def bpy_version() -> tuple[int, ...] | None:
+    """The version of the bpy module importable by this Python, if any (tools/mock_bpy.py stands in for it here)"""
+    output = subprocess.run([sys.executable, "-c", "import bpy; print(*bpy.app.version)"], capture_output=True,
+                            text=True).stdout.split()
+    return tuple(map(int, output[-3:])) if len(output) >= 3 else None
+
+
+def set_auto_smooth(path: Path, mesh_name: str, angle: float) -> None:
+    """Turn Auto Smooth on for a mesh of an uncompressed 64-bit little-endian file, at the offsets its SDNA gives"""
+    data = bytearray(path.read_bytes())
+    block_header = struct.Struct("<4siQii")
+    position, meshes, sdna = 12, [], None
+    while (block := block_header.unpack_from(data, position))[0] != b"ENDB":
+        code, length, _, sdna_index, _ = block
+        start = position + block_header.size
+        if code == b"ME\0\0":
+            meshes.append((start, length, sdna_index))
+        elif code == b"DNA1":
+            sdna = blend_scan.Sdna(bytes(data[start:start + length]), "<", 8)
+        position = start + length
+    for start, length, sdna_index in meshes:
+        if blend_scan._mesh_info(bytes(data[start:start + length]), sdna, sdna_index).name == mesh_name:
+            layout = sdna.layout(sdna_index)
+            flag = layout["flag"].offset
+            struct.pack_into("<h", data, start + flag, struct.unpack_from("<h", data, start + flag)[0]
+                             | blend_scan.ME_AUTOSMOOTH)
+            struct.pack_into("<f", data, start + layout["smoothresh"].offset, angle)
+    path.write_bytes(data)
+
+
+@pytest.mark.skipif(not (bpy_version() or ()) >= (4, 1), reason="Needs the bpy module of Blender 4.1+")
+def test_blender_reads_auto_smooth_where_the_scanner_finds_it(tmp_path):
+    """Blender 4.1+ turns Auto Smooth in older files into a modifier, which save_blend_fixtures.describe reads back"""
+    path = tmp_path / "auto_smooth.blend"
+    with gzip.open(SAVED / "sculpting_280.blend") as source, open(path, "wb") as copy:
+        shutil.copyfileobj(source, copy)
+    set_auto_smooth(path, "Quad Sphere", radians(42))
+    scanned = blend_scan.scan_file(str(path))
+    assert [(mesh.name, mesh.auto_smooth, round(mesh.angle, 5)) for mesh in scanned.meshes] == [
+        ("Quad Sphere", True, round(radians(42), 5))]
+    script = f"import json, sys; sys.path.insert(0, {str(TOOLS)!r}); import save_blend_fixtures; " \
+             f"print(json.dumps(save_blend_fixtures.describe({str(path)!r})))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    read = json.loads(output.splitlines()[-1])
+    assert [(mesh["name"], mesh["auto_smooth"], round(mesh["angle"], 5)) for mesh in read["meshes"]] == [
+        ("Quad Sphere", True, round(radians(42), 5))]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_scan_file(tmp_path, compression):
+    """Files with Auto Smooth on, which Blender 4.1+ can't save"""
+    result = blend_scan.scan_file(blend_fixtures.write_blend(tmp_path / "a.blend", MESHES, compression=compression))
+    assert result.error is None
+    assert (result.version, result.compression) == ("306", compression)
+    assert mesh_summary(result) == EXPECTED_MESHES
+    assert result.needs_work
+    # The Plane's cost is left out, as it has nothing to convert
+    assert result.cost == pytest.approx(blend_scan.FILE_OVERHEAD + result.meshes[0].cost + result.meshes[2].cost)
+
+
+@pytest.mark.parametrize("endian, pointer_size, version", [(">", 4, 306), ("<", 4, 279), ("<", 8, 402)])
+def test_scan_file_layouts(tmp_path, endian, pointer_size, version):
+    path = blend_fixtures.write_blend(tmp_path / "a.blend", MESHES, endian=endian, pointer_size=pointer_size,
+                                      version=version)
+    result = blend_scan.scan_file(path)
+    assert result.error is None
+    assert result.version == str(version)
+    assert mesh_summary(result) == EXPECTED_MESHES
+
+
+def test_linked_library_paths(tmp_path):
+    """Absolute paths and relative paths outside the linking file's directory"""
+    absolute = tmp_path / "elsewhere" / "absolute.blend"
+    (tmp_path / "scenes").mkdir()
+    path = blend_fixtures.write_blend(tmp_path / "scenes" / "a.blend",
+                                      libraries=["//../libs/relative.blend", str(absolute)])
+    result = blend_scan.scan_file(str(path))
+    assert result.error is None
+    assert result.libraries == [str(tmp_path / "libs" / "relative.blend"), str(absolute)]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_newer_header_needs_no_work(tmp_path, compression):
+    result = blend_scan.scan_file(blend_fixtures.write_newer_blend(tmp_path / "a.blend", compression))
+    assert (result.error, result.version, result.meshes) == (None, "0500", [])
+    assert not result.needs_work
+
+
+@pytest.mark.parametrize("content, error", [(b"", "Empty file"), (b"not a blend file", "Not a .blend file"),
+                                            (b"BLENDER-v306", "Truncated file")])
+def test_unscannable_files_need_work(tmp_path, content, error):
+    path = tmp_path / "a.blend"
+    path.write_bytes(content)
+    result = blend_scan.scan_file(str(path))
+    assert result.error == error
+    assert result.needs_work
+
+
+@pytest.fixture
+def scan_calls(monkeypatch):
+    """The paths scan_file is called with"""
+    calls = []
+    scan_file = blend_scan.scan_file
+
+    def counting_scan_file(path):
+        calls.append(Path(path).name)
+        return scan_file(path)
+
+    monkeypatch.setattr(blend_scan, "scan_file", counting_scan_file)
+    return calls
+
+
+def test_index_reuses_unchanged_files(tmp_path, scan_calls):
+    paths = [blend_fixtures.write_blend(tmp_path / name, MESHES) for name in ("a.blend", "b.blend")]
+    index_path = str(tmp_path / "index.json")
+    index = blend_scan.ScanIndex(index_path)
+    first = index.scan(paths)
+    index.save()
+    assert sorted(scan_calls) == ["a.blend", "b.blend"]
+
+    scan_calls.clear()
+    again = blend_scan.ScanIndex(index_path).scan(paths)
+    assert scan_calls == []
+    assert again == first
+
+
+@pytest.mark.parametrize("change", ["mtime", "size"])
+def test_index_rescans_changed_files(tmp_path, scan_calls, change):
+    changed, unchanged = (blend_fixtures.write_blend(tmp_path / name, MESHES) for name in ("a.blend", "b.blend"))
+    index_path = str(tmp_path / "index.json")
+    index = blend_scan.ScanIndex(index_path)
+    index.scan([changed, unchanged])
+    index.save()
+
+    stat = os.stat(changed)
+    if change == "mtime":
+        os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    else:
+        blend_fixtures.write_blend(changed, MESHES[:1])
+        os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    scan_calls.clear()
+    [result, _] = blend_scan.ScanIndex(index_path).scan([changed, unchanged])
+    assert scan_calls == ["a.blend"]
+    assert len(result.meshes) == (len(MESHES) if change == "mtime" else 1)
+
+
+def test_index_of_another_version_is_ignored(tmp_path, scan_calls):
+    path = blend_fixtures.write_blend(tmp_path / "a.blend", MESHES)
+    index_path = tmp_path / "index.json"
+    index = blend_scan.ScanIndex(str(index_path))
+    index.scan([path])
+    index.save()
+    data = json.loads(index_path.read_text())
+    index_path.write_text(json.dumps({**data, "version": blend_scan.INDEX_VERSION - 1}))
+
+    scan_calls.clear()
+    blend_scan.ScanIndex(str(index_path)).scan([path])
+    assert scan_calls == ["a.blend"]
+
+
+@pytest.fixture
+def library_tree(tmp_path):
+    """Files of different sizes, one without Auto Smooth, one that can't be scanned, and a chain of libraries"""
+    scenes, libs = tmp_path / "scenes", tmp_path / "libs"
+    scenes.mkdir()
+    libs.mkdir()
+    blend_fixtures.write_blend(scenes / "small.blend", MESHES[:1])
+    blend_fixtures.write_blend(scenes / "large.blend", MESHES, libraries=["//../libs/library.blend"])
+    blend_fixtures.write_blend(scenes / "flat.blend", MESHES[1:2])
+    (scenes / "broken.blend").write_bytes(b"not a blend file")
+    blend_fixtures.write_blend(libs / "library.blend", [FixtureMesh("Linked", edges=3_000, polys=1_000, loops=4_000)],
+                               libraries=["//nested.blend"])
+    blend_fixtures.write_blend(libs / "nested.blend", MESHES[1:2])
+    return tmp_path
+
+
+def test_select_files_leaves_out_files_without_work_and_orders_by_cost(library_tree):
+    paths = sorted((library_tree / "scenes").iterdir())
+    selected = batch_convert.select_files(paths, str(library_tree / "index.json"), jobs=2)
+    # The unscannable file only has the per-file overhead, so it comes last
+    assert [path.name for path in selected] == ["large.blend", "small.blend", "broken.blend"]
+
+
+def test_select_files_adds_libraries(library_tree):
+    paths = sorted((library_tree / "scenes").iterdir())
+    selected = batch_convert.select_files(paths, str(library_tree / "index.json"), jobs=2, libraries=True)
+    # nested.blend is scanned, but has no Auto Smooth meshes
+    assert [path.name for path in selected] == ["large.blend", "library.blend", "small.blend", "broken.blend"]
+
+
+def test_main_converts_selected_files_in_order(library_tree):
+    results_path = library_tree / "results.jsonl"
+    status = batch_convert.main([str(library_tree / "scenes"), "--worker-command", " ".join(FAKE_WORKER),
+                                 "--jobs", "1", "--scan-index", str(library_tree / "index.json"),
+                                 "--results", str(results_path)])
+    assert status == 0
+    records = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert [Path(record["path"]).name for record in records] == ["large.blend", "small.blend", "broken.blend"]
+    assert json.loads((library_tree / "index.json").read_text())["version"] == blend_scan.INDEX_VERSION
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Library paths are written with forward slashes")
+def test_fixture_set(tmp_path):
+    written = blend_fixtures.write_fixtures(tmp_path)
+    results = {name: blend_scan.scan_file(str(path)) for name, path in written.items()}
+    assert all(result.error is None for result in results.values())
+    assert {name for name, result in results.items() if not result.needs_work} == {"no_auto_smooth", "linking",
+                                                                                     "newer_header"}
+    assert results["linking"].libraries == [str(written["library"])]
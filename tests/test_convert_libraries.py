@@ -0,0 +1,66 @@
+"""
+Converting linked libraries from the file operators, with tools/fake_batch_worker.py standing in for background
+Blender. Run modally, the conversion is polled from the operator's timer rather than waited for.
+"""
+
+import importlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import benchmark
+import mock_bpy
+
+FAKE_WORKER = [sys.executable, str(Path(__file__).resolve().parents[1] / "tools" / "fake_batch_worker.py")]
+
+
+@pytest.fixture
+def library(addon, tmp_path, monkeypatch):
+    """A library linking a mesh with Auto Smooth into the file, converted by the fake worker"""
+    batch_convert = importlib.import_module(f"{mock_bpy.ADDON_NAME}.cli.batch_convert")
+    monkeypatch.setattr(batch_convert, "worker_command", lambda *args: FAKE_WORKER)
+    monkeypatch.setattr(mock_bpy.bpy.app, "binary_path", "blender")
+    library = mock_bpy.bpy.data.libraries.new("library.blend", str(tmp_path / "library.blend"))
+    benchmark.make_grid(1_000)
+    [linked] = benchmark.make_grid(1_000)
+    linked.library = library
+    return library
+
+
+def event(event_type: str) -> SimpleNamespace:
+    return SimpleNamespace(type=event_type, value="PRESS")
+
+
+def test_execute_converts_and_reloads(addon, library):
+    result, reports = mock_bpy.run_operator(addon.operator.mark_sharps.mesh_OT_mark_sharps_file,
+                                            convert_libraries=True)
+    assert result == {'FINISHED'}
+    assert library.reload_count == 1
+    assert ('INFO', "Converted and reloaded 1 of 1 library files") in reports
+
+
+@pytest.mark.parametrize("cancel", [False, True])
+def test_modal_polls_the_conversion(addon, library, monkeypatch, cancel):
+    # Slow enough that the conversion is still running when it's first polled
+    monkeypatch.setenv("FAKE_WORKER_DELAY", "0.5")
+    monkeypatch.setattr(mock_bpy.bpy.app, "background", False)
+    operator = addon.operator.mark_sharps.mesh_OT_mark_sharps_file(convert_libraries=True)
+    context = mock_bpy.bpy.context
+    assert operator.invoke(context, event("NONE")) == {'RUNNING_MODAL'}
+    while operator._libraries is None:
+        assert operator.modal(context, event("TIMER")) == {'RUNNING_MODAL'}
+
+    start = time.perf_counter()
+    assert operator.modal(context, event("TIMER")) == {'RUNNING_MODAL'}
+    assert time.perf_counter() - start < 0.1
+    if cancel:
+        operator.modal(context, event("ESC"))
+    while (result := operator.modal(context, event("TIMER"))) == {'RUNNING_MODAL'}:
+        time.sleep(0.01)
+
+    assert result == {'FINISHED'}
+    assert context.window_manager.progress is None
+    assert library.reload_count == (0 if cancel else 1)
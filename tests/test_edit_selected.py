@@ -0,0 +1,100 @@
+"""
+The edit-mode operator marks only the selected edges, which are taken from the selection history when it accounts for
+the whole selection, and found by visiting the edges otherwise.
+"""
+
+import numpy as np
+import pytest
+
+import benchmark
+import mock_bpy
+
+
+class CountingEdges(list):
+    """A BMesh's edge sequence that counts the edges visited through it"""
+    visited = 0
+
+    def __iter__(self):
+        for edge in super().__iter__():
+            self.visited += 1
+            yield edge
+
+
+@pytest.fixture
+def mesh(addon):
+    mesh = benchmark.make_grid(2_000)[0]
+    mesh.edges._attributes["use_edge_sharp"][:] = np.random.default_rng(7).random(len(mesh.edges)) < 0.3
+    return mesh
+
+
+def select_faces(bm: mock_bpy.BMesh, faces: range, history: bool) -> set[int]:
+    """Select faces (and so their edges), as if clicked one by one when history is set. Returns the selected edges'
+    indices."""
+    selected = set()
+    for face in (bm.faces[index] for index in faces):
+        face.select = True
+        for edge in face.edges:
+            edge.select = True
+            selected.add(edge.index)
+        if history:
+            bm.select_history.append(face)
+    return selected
+
+
+@pytest.mark.parametrize("history", [True, False])
+def test_selected_edges(addon, mesh, history):
+    bm = mock_bpy.bmesh.from_edit_mesh(mesh)
+    expected = select_faces(bm, range(100, 120), history)
+    bm.edges = CountingEdges(bm.edges)
+
+    found = addon.lib.mark_sharps.selected_edges(bm, len(expected))
+    assert sorted(edge.index for edge in found) == sorted(expected)
+    if history:
+        assert bm.edges.visited == 0
+    else:
+        assert bm.edges.visited == max(expected) + 1
+
+
+def test_selection_history_missing_edges_falls_back(addon, mesh):
+    bm = mock_bpy.bmesh.from_edit_mesh(mesh)
+    expected = select_faces(bm, range(100, 120), True) | select_faces(bm, range(300, 305), False)
+    found = addon.lib.mark_sharps.selected_edges(bm, len(expected))
+    assert sorted(edge.index for edge in found) == sorted(expected)
+
+
+@pytest.mark.parametrize("retain", ["CLEAR_ALL", "RETAIN_SHARP", "RETAIN_SMOOTH"])
+def test_operator_marks_selected_edges_only(addon, mesh, retain):
+    mark_sharps = addon.lib.mark_sharps
+    original = mark_sharps.read_sharp_edges(mesh)
+    bm = mock_bpy.bmesh.from_edit_mesh(mesh)
+    selected = sorted(select_faces(bm, range(100, 120), True))
+    mesh.edges._attributes["select"][selected] = True
+    mock_bpy.bpy.context.mode = "EDIT_MESH"
+    mock_bpy.bpy.context.objects_in_mode_unique_data = [mock_bpy.bpy.data.objects.new("Grid", mesh)]
+
+    result, _ = mock_bpy.run_operator(addon.operator.mark_sharps_edit.mesh_OT_mark_sharps_edit_selected,
+                                      retain=retain)
+    assert result == {'FINISHED'}
+    marked = mark_sharps.read_sharp_edges(mesh)
+    mark_sharps.write_sharp_edges(mesh, original)
+    expected = mark_sharps.mark_edges(mesh, mesh.auto_smooth_angle, mark_sharps.RetainStrategy[retain])
+    unselected = np.ones(len(mesh.edges), dtype=bool)
+    unselected[selected] = False
+    assert np.array_equal(marked[selected], expected[selected])
+    assert np.array_equal(marked[unselected], original[unselected])
+
+
+def test_operator_leaves_auto_smooth_angle_alone(addon, mesh):
+    """Setting Auto Smooth to 180° would turn the unselected edges smooth, so the operator doesn't offer it"""
+    operator = addon.operator.mark_sharps_edit.mesh_OT_mark_sharps_edit_selected
+    assert not any("crank_auto_smooth" in vars(cls).get("__annotations__", {}) for cls in operator.__mro__)
+    angle = mesh.auto_smooth_angle
+    bm = mock_bpy.bmesh.from_edit_mesh(mesh)
+    selected = sorted(select_faces(bm, range(100, 120), True))
+    mesh.edges._attributes["select"][selected] = True
+    mock_bpy.bpy.context.mode = "EDIT_MESH"
+    mock_bpy.bpy.context.objects_in_mode_unique_data = [mock_bpy.bpy.data.objects.new("Grid", mesh)]
+
+    result, _ = mock_bpy.run_operator(operator)
+    assert result == {'FINISHED'}
+    assert mesh.auto_smooth_angle == angle
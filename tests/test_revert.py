@@ -0,0 +1,50 @@
+"""
+Reverting a revertible (no undo) run, from memory or from its revert file after the .blend file is reloaded, puts back
+the sharp edges and Auto Smooth angles, and only once.
+"""
+
+import importlib
+import os
+from math import pi, radians
+
+import numpy as np
+import pytest
+
+import benchmark
+import mock_bpy
+
+
+@pytest.fixture
+def saved_file(addon, tmp_path, monkeypatch):
+    """A saved .blend file with a mesh that has sharp edges, as (mesh, its sharp flags)"""
+    monkeypatch.setattr(mock_bpy.bpy.data, "filepath", str(tmp_path / "a.blend"))
+    [mesh] = benchmark.make_grid(1_000)
+    mesh.auto_smooth_angle = radians(20)
+    sharp = np.random.default_rng(3).random(len(mesh.edges)) < 0.3
+    addon.lib.mark_sharps.write_sharp_edges(mesh, sharp)
+    return mesh, sharp
+
+
+def revert_state():
+    return importlib.import_module(f"{mock_bpy.ADDON_NAME}.lib.revert_state")
+
+
+def run(operator_class: type, **props) -> None:
+    result, reports = mock_bpy.run_operator(operator_class, **props)
+    assert result == {'FINISHED'}, reports
+
+
+@pytest.mark.parametrize("reload", [False, True])
+def test_revert_restores_sharps_and_angle_once(addon, saved_file, reload):
+    mesh, sharp = saved_file
+    run(addon.operator.mark_sharps.mesh_OT_mark_sharps_file_no_undo, crank_auto_smooth=True, save_sidecar=True)
+    assert mesh.auto_smooth_angle == pytest.approx(pi)
+    assert os.path.exists(revert_state().sidecar_path())
+    if reload:
+        revert_state().forget()
+
+    run(addon.operator.revert.mesh_OT_mark_sharps_revert)
+    assert np.array_equal(addon.lib.mark_sharps.read_sharp_edges(mesh), sharp)
+    assert mesh.auto_smooth_angle == pytest.approx(radians(20))
+    assert not os.path.exists(revert_state().sidecar_path())
+    assert not addon.operator.revert.mesh_OT_mark_sharps_revert.poll(mock_bpy.bpy.context)
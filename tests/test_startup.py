@@ -0,0 +1,29 @@
+"""
+Registering the addon and drawing its menus must not load the engine modules, which only the first run needs
+"""
+
+import json
+import subprocess
+import sys
+
+import bench_startup
+import mock_bpy
+
+
+def test_registering_and_drawing_menus_leave_the_engines_unloaded():
+    # In a fresh process, as the other tests load the engines
+    output = subprocess.run([sys.executable, bench_startup.__file__, "--measure-once"], capture_output=True, text=True,
+                            check=True).stdout
+    sample = json.loads(output.splitlines()[-1])
+    for stage in ("registered_modules", "drawn_modules"):
+        assert not set(sample[stage]) & set(bench_startup.ENGINE_MODULES), stage
+    assert "lib.revert_state" in sample["drawn_modules"]
+
+
+def test_modules_run_at_registration_leave_bmesh_to_the_engines(addon):
+    """BMesh is only imported by the engines, or inside the operators that use it"""
+    prefix = mock_bpy.ADDON_NAME + "."
+    importers = [name for name, module in list(sys.modules.items())
+                 if name.startswith(prefix) and name[len(prefix):] not in bench_startup.ENGINE_MODULES
+                 and mock_bpy.bmesh in vars(module).values()]
+    assert importers == []
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of mesh_OT_mark_sharps_selected.poll latency against selection size, with the poll cache invalidated
+before every call (as after every selection change) and with it kept (as on redraws in between), using mock_bpy:
+
+    python tools/bench_poll.py [--sizes 10 1000 20000] [--repeat 200]
+
+The selection is all empties except the last object, the worst case for may_have_meshes. Under mock_bpy the uncached
+cost is only may_have_meshes' scan; in Blender, building context.selected_objects adds to it.
+"""
+
+import argparse
+from time import perf_counter
+
+import mock_bpy
+
+
+def time_poll(operator: type, repeat: int, invalidate) -> float:
+    """Median seconds per poll call"""
+    times = []
+    for _ in range(repeat):
+        if invalidate:
+            invalidate()
+        start = perf_counter()
+        operator.poll(mock_bpy.bpy.context)
+        times.append(perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 20_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    addon = mock_bpy.load_addon()
+    addon.register()
+    operator = addon.operator.mark_sharps.mesh_OT_mark_sharps_selected
+    poll_cache = addon.lib.poll_cache
+    bpy = mock_bpy.bpy
+
+    print(f"{'Selected':>10} {'Uncached':>12} {'Cached':>12}")
+    for size in args.sizes:
+        objects = [bpy.data.objects.new(f"Empty.{i}", None) for i in range(size - 1)]
+        objects.append(bpy.data.objects.new("Mesh", bpy.data.meshes.new("Mesh")))
+        bpy.context.selected_objects = objects
+        poll_cache.invalidate()
+        uncached = time_poll(operator, args.repeat, poll_cache.invalidate)
+        cached = time_poll(operator, args.repeat, None)
+        print(f"{size:>10,} {uncached * 1e6:>10.1f}us {cached * 1e6:>10.1f}us")
+
+    addon.unregister()
+
+
+if __name__ == "__main__":
+    main()
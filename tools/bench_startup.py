@@ -0,0 +1,166 @@
+"""
+Startup benchmark: the cost of importing, registering, reloading and unregistering the addon, of drawing its menus, and
+of the first run (which loads the engines registration leaves out), each measured in a fresh Python process under
+mock_bpy:
+
+    python tools/bench_startup.py [--repeat 10] [--output startup_results.json]
+
+Registration must not load the engine modules (ENGINE_MODULES), so the addon's share of every Blender start stays
+small, and neither must drawing the menus (which polls their operators, as Blender does on every redraw); the addon
+modules that have run after registering and after drawing the menus are listed, and any engine module among them fails
+the run.
+mock_bpy itself imports NumPy, so NumPy's own import time shows up in neither the import nor the first run here; in
+Blender, not loading the engines at registration also leaves NumPy unimported until the first run.
+
+Each stage records its best time over --repeat processes. Results are written to a JSON file. If a baseline file
+exists, results are compared with it, and the script exits with status 1 if any stage is slower than its baseline by
+more than the tolerance. Timings are machine-specific, so save a baseline (--save-baseline) on the machine the
+comparisons will be made on.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from types import ModuleType
+from typing import Any
+
+import mock_bpy
+
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("startup_baseline.json")
+STAGES = ("import", "register", "draw_menu", "first_run", "unregister", "reload")
+# Modules (relative to the addon package) that only the first run may load
+ENGINE_MODULES = ("lib.analyze", "lib.angle_cache", "lib.archive", "lib.auto_process", "lib.core", "lib.disk_cache",
+                  "lib.fingerprint", "lib.instrument", "lib.library", "lib.mark_sharps", "lib.parallel",
+                  "lib.planner", "lib.process", "lib.revert", "cli.batch_convert")
+# Times are compared with this much slack on top of the tolerance, so noise in very short stages isn't a regression
+TIME_SLACK = 0.002
+
+
+def loaded_modules() -> list[str]:
+    """The addon modules that have run (lazily imported modules that haven't been used yet are left out)"""
+    prefix = mock_bpy.ADDON_NAME + "."
+    return sorted(name[len(prefix):] for name, module in list(sys.modules.items())
+                  if name.startswith(prefix) and type(module) is ModuleType)
+
+
+def measure_once() -> dict[str, Any]:
+    """Time each stage once in this process, which must not have imported the addon yet"""
+    bpy = mock_bpy.install()
+    times = {}
+
+    start = perf_counter()
+    addon = mock_bpy.load_addon()
+    times["import"] = perf_counter() - start
+
+    start = perf_counter()
+    addon.register()
+    times["register"] = perf_counter() - start
+    registered = loaded_modules()
+
+    start = perf_counter()
+    mock_bpy.draw_menus()
+    times["draw_menu"] = perf_counter() - start
+    drawn = loaded_modules()
+
+    mesh = bpy.data.meshes.new("Startup")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)], [], [[0, 1, 2], [0, 1, 3]])
+    mesh.use_auto_smooth = True
+    start = perf_counter()
+    mock_bpy.run_operator(addon.operator.mark_sharps.mesh_OT_mark_sharps_file)
+    times["first_run"] = perf_counter() - start
+
+    start = perf_counter()
+    addon.unregister()
+    times["unregister"] = perf_counter() - start
+
+    # As Blender reloads an addon (e.g. F3 > Reload Scripts): run the package again, which reloads its modules
+    start = perf_counter()
+    addon.__spec__.loader.exec_module(addon)
+    addon.register()
+    times["reload"] = perf_counter() - start
+    addon.unregister()
+
+    return {"seconds": times, "registered_modules": registered, "drawn_modules": drawn}
+
+
+def run_suite(repeat: int) -> tuple[list[dict[str, Any]], list[str], list[str]]:
+    """Results for each stage (its best time over the processes), and the modules run after registering and after
+    drawing the menus"""
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, __file__, "--measure-once"], capture_output=True, text=True,
+                                check=True).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    results = [{"case": stage, "seconds": min(sample["seconds"][stage] for sample in samples)} for stage in STAGES]
+    return results, samples[-1]["registered_modules"], samples[-1]["drawn_modules"]
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], time_tolerance: float) -> list[str]:
+    """Descriptions of the results that regressed past the baseline"""
+    baseline_cases = {result["case"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_cases.get(result["case"])
+        if before is None:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + time_tolerance) + TIME_SLACK:
+            regressions.append(f"{result['case']}: {result['seconds']:.4f}s, baseline {before['seconds']:.4f}s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="Processes to take the best time of (default: %(default)s)")
+    parser.add_argument("--output", type=Path, default=Path("startup_results.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="Fraction slower than the baseline that counts as a regression (default: %(default)s)")
+    parser.add_argument("--measure-once", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_once:
+        print(json.dumps(measure_once()))
+        return
+
+    results, registered, drawn = run_suite(args.repeat)
+    for result in results:
+        print(f"{result['case']:>12} {result['seconds'] * 1000:>9.2f}ms")
+    print(f"Addon modules run after registering: {', '.join(registered)}")
+    print(f"Addon modules run after drawing the menus: {', '.join(drawn)}")
+    report = {"created": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+              "machine": platform.machine(), "platform": platform.platform(), "results": results,
+              "registered_modules": registered, "drawn_modules": drawn}
+    args.output.write_text(json.dumps(report, indent=1))
+    print(f"Results written to {args.output}")
+
+    for stage, modules in (("Registering", registered), ("Drawing the menus", drawn)):
+        engines = [name for name in modules if name in ENGINE_MODULES]
+        if engines:
+            print(f"{stage} loaded engine modules: {', '.join(engines)}")
+            sys.exit(1)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=1))
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline} to compare with")
+        return
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.time_tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Benchmark suite for the Mark Sharps engines and mesh traversal, run under plain CPython with mock_bpy (so it needs no
+Blender, display or GPU, only NumPy):
+
+    python tools/benchmark.py [--sizes 1k 10k 100k 1M 10M] [--scenarios grid scan] [--output results.json]
+
+Meshes are generated reproducibly (from fixed seeds) at each size, given in edges (by default 1k, 10k and 100k; 1M and
+10M take minutes and gigabytes of memory):
+ - grid: a subdivided grid of quads with a noisy height, so a good share of edges are sharp
+ - sphere: a UV sphere, smooth everywhere except at low resolutions
+ - scan: a noisy grid with holes (boundary edges), fins (non-manifold edges with three faces) and loose edges
+ - small: many small meshes with about 144 edges each, in collections instanced several times over
+ - several: eight noisy grids sharing the edges, where the thread and process pools have meshes to spread
+
+Each engine runs on each single-mesh scenario through mark_auto_smooth. The "small" and "several" scenarios are run
+through ProcessJob with each engine, and with the NumPy engine on each pool backend at each --workers count (1, 2 and 4
+by default), to show how the pools scale. The "small" scenario is also run through each traversal path of
+get_meshes_multiple (shared and fresh MeshIndex) and get_meshes_shallow. On single meshes, finding an edit-mode
+selection of 100 faces is timed from the selection history and by visiting the edges (as box select leaves it). Each
+case records its best time over --repeat runs, its throughput, and the peak memory allocated during a separate run
+under tracemalloc.
+
+Results are written to a JSON file. If a baseline file exists, results are compared with it, and the script exits
+with status 1 if any case is slower or uses more memory than its baseline by more than the tolerances. Timings are
+machine-specific, so save a baseline (--save-baseline) on the machine the comparisons will be made on.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+import mock_bpy
+
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("benchmark_baseline.json")
+DEFAULT_SIZES = ["1k", "10k", "100k"]
+SCENARIOS = ("grid", "sphere", "scan", "small", "several")
+SEVERAL_MESHES = 8
+EDIT_SELECTED_FACES = 100
+SMALL_MESH_GRID = 8
+SMALL_COLLECTION_SIZE = 100
+SMALL_INSTANCES = 5
+# Times are compared with this much slack on top of the tolerance, so noise in very short cases isn't a regression
+TIME_SLACK = 0.002
+
+
+def parse_size(text: str) -> int:
+    """Parse an edge count such as 10000, 10k or 1.5M"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = text[-1:].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for divisor, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if size >= divisor and size % divisor == 0:
+            return f"{size // divisor}{suffix}"
+    return str(size)
+
+
+# Mesh generation
+
+
+def build_mesh(name: str, coords: np.ndarray, loop_totals: np.ndarray, loop_verts: np.ndarray,
+               loose_edges: np.ndarray = None) -> mock_bpy.Mesh:
+    """Create a mock mesh from vertex positions, face sizes and face vertices (flattened), finding its edges"""
+    loop_totals = np.asarray(loop_totals, dtype=np.int32)
+    loop_verts = np.asarray(loop_verts, dtype=np.int32)
+    loop_starts = np.cumsum(loop_totals, dtype=np.int64) - loop_totals
+    following = np.arange(1, len(loop_verts) + 1)
+    following[loop_starts + loop_totals - 1] = loop_starts
+    pairs = np.sort(np.stack([loop_verts, loop_verts[following]], axis=1), axis=1)
+    if loose_edges is not None:
+        pairs = np.concatenate([np.sort(loose_edges, axis=1), pairs])
+    keys = pairs[:, 0].astype(np.int64) * len(coords) + pairs[:, 1]
+    unique, inverse = np.unique(keys, return_inverse=True)
+    edge_verts = np.stack([unique // len(coords), unique % len(coords)], axis=1)
+    loop_edges = inverse.ravel()[len(pairs) - len(loop_verts):]
+
+    mesh = mock_bpy.bpy.data.meshes.new(name)
+    mesh.set_arrays(coords, edge_verts, loop_starts, loop_totals, loop_verts, loop_edges)
+    mesh.use_auto_smooth = True
+    return mesh
+
+
+def grid_arrays(columns: int, rows: int, rng: np.random.Generator, height: float
+                ) -> tuple[np.ndarray, np.ndarray]:
+    """Vertex positions and quad vertex indices (one row per quad) of a grid with a noisy height"""
+    xs, ys = np.meshgrid(np.arange(columns + 1, dtype=np.float32), np.arange(rows + 1, dtype=np.float32))
+    coords = np.stack([xs.ravel(), ys.ravel(), rng.normal(0, height, xs.size).astype(np.float32)], axis=1)
+    corners = (np.arange(rows)[:, None] * (columns + 1) + np.arange(columns)[None, :]).ravel()
+    quads = np.stack([corners, corners + 1, corners + columns + 2, corners + columns + 1], axis=1)
+    return coords, quads
+
+
+def grid_side(edges: int) -> int:
+    # An n by n grid has 2n(n + 1) edges
+    return max(1, round((edges / 2) ** 0.5))
+
+
+def make_grid(edges: int, seed: int = 1) -> list[mock_bpy.Mesh]:
+    side = grid_side(edges)
+    coords, quads = grid_arrays(side, side, np.random.default_rng(seed), 0.4)
+    return [build_mesh("Grid", coords, np.full(len(quads), 4), quads.ravel())]
+
+
+def make_sphere(edges: int, seed: int = 2) -> list[mock_bpy.Mesh]:
+    # A sphere with s segments and r rings has 2sr - s edges; use twice as many segments as rings
+    rings = max(3, round((edges / 4) ** 0.5))
+    segments = 2 * rings
+    ring_angles = np.pi * np.arange(1, rings) / rings
+    segment_angles = 2 * np.pi * np.arange(segments) / segments
+    ring_coords = np.stack([np.outer(np.sin(ring_angles), np.cos(segment_angles)).ravel(),
+                            np.outer(np.sin(ring_angles), np.sin(segment_angles)).ravel(),
+                            np.repeat(np.cos(ring_angles), segments)], axis=1)
+    coords = np.concatenate([[[0, 0, 1], [0, 0, -1]], ring_coords]).astype(np.float32)
+
+    def vertex(ring: np.ndarray, segment: np.ndarray) -> np.ndarray:
+        return 2 + ring * segments + segment % segments
+
+    j = np.arange(segments)
+    top = np.stack([np.zeros(segments, dtype=np.int64), vertex(0, j + 1), vertex(0, j)], axis=1)
+    bottom = np.stack([np.ones(segments, dtype=np.int64), vertex(rings - 2, j), vertex(rings - 2, j + 1)], axis=1)
+    k, j = (grid.ravel() for grid in np.meshgrid(np.arange(rings - 2), np.arange(segments), indexing="ij"))
+    quads = np.stack([vertex(k, j), vertex(k, j + 1), vertex(k + 1, j + 1), vertex(k + 1, j)], axis=1)
+    loop_totals = np.concatenate([np.full(segments, 3), np.full(len(quads), 4), np.full(segments, 3)])
+    return [build_mesh("Sphere", coords, loop_totals, np.concatenate([top.ravel(), quads.ravel(), bottom.ravel()]))]
+
+
+def make_scan(edges: int, seed: int = 3) -> list[mock_bpy.Mesh]:
+    """A noisy grid with 5% of its faces removed, fins on 2% of the rest, and loose edges"""
+    rng = np.random.default_rng(seed)
+    side = grid_side(edges)
+    coords, quads = grid_arrays(side, side, rng, 0.8)
+    coords += rng.normal(0, 0.05, coords.shape).astype(np.float32)
+    quads = quads[rng.random(len(quads)) >= 0.05]
+
+    # Each fin is a triangle standing on a side of a quad, so that side has three faces
+    fin_quads = quads[rng.random(len(quads)) < 0.02]
+    fin_tops = (coords[fin_quads[:, 0]] + coords[fin_quads[:, 1]]) / 2 + np.float32([0, 0, 1])
+    fin_verts = len(coords) + np.arange(len(fin_quads))
+    fins = np.stack([fin_quads[:, 0], fin_quads[:, 1], fin_verts], axis=1)
+    coords = np.concatenate([coords, fin_tops])
+
+    # Loose edges across the diagonals of grid squares, which are never face edges
+    starts = rng.choice(np.arange(len(quads)), size=max(1, len(quads) // 200), replace=False)
+    loose = quads[starts][:, [0, 2]]
+
+    loop_totals = np.concatenate([np.full(len(quads), 4), np.full(len(fins), 3)])
+    return [build_mesh("Scan", coords, loop_totals, np.concatenate([quads.ravel(), fins.ravel()]), loose)]
+
+
+def make_small(edges: int, seed: int = 4) -> list[mock_bpy.Mesh]:
+    """Many small grids, each on its own object, grouped into collections that empties instance several times"""
+    rng = np.random.default_rng(seed)
+    bpy = mock_bpy.bpy
+    per_mesh = 2 * SMALL_MESH_GRID * (SMALL_MESH_GRID + 1)
+    meshes = []
+    for i in range(max(1, round(edges / per_mesh))):
+        coords, quads = grid_arrays(SMALL_MESH_GRID, SMALL_MESH_GRID, rng, 0.4)
+        meshes.append(build_mesh(f"Small.{i}", coords, np.full(len(quads), 4), quads.ravel()))
+
+    selection = []
+    for start in range(0, len(meshes), SMALL_COLLECTION_SIZE):
+        collection = bpy.data.collections.new(f"Collection.{start}")
+        collection.objects = [bpy.data.objects.new(mesh.name, mesh) for mesh in
+                              meshes[start:start + SMALL_COLLECTION_SIZE]]
+        for i in range(SMALL_INSTANCES):
+            instancer = bpy.data.objects.new(f"{collection.name}.Instance.{i}", None)
+            instancer.instance_type = "COLLECTION"
+            instancer.instance_collection = collection
+            selection.append(instancer)
+        # The collection's objects are selected directly, too
+        selection.extend(collection.objects)
+    bpy.context.selected_objects = selection
+    return meshes
+
+
+def make_several(edges: int, seed: int = 5) -> list[mock_bpy.Mesh]:
+    side = grid_side(edges / SEVERAL_MESHES)
+    rng = np.random.default_rng(seed)
+    meshes = []
+    for i in range(SEVERAL_MESHES):
+        coords, quads = grid_arrays(side, side, rng, 0.4)
+        meshes.append(build_mesh(f"Several.{i}", coords, np.full(len(quads), 4), quads.ravel()))
+    return meshes
+
+
+GENERATORS: dict[str, Callable[[int], list[mock_bpy.Mesh]]] = {
+    "grid": make_grid,
+    "sphere": make_sphere,
+    "scan": make_scan,
+    "small": make_small,
+    "several": make_several,
+}
+
+
+# Measurement
+
+
+def clear_sharp(meshes: list[mock_bpy.Mesh]) -> None:
+    """Reset the meshes' sharp edges, so every run has the same edges to change"""
+    for mesh in meshes:
+        mesh.edges._attributes["use_edge_sharp"][:] = False
+
+
+def measure(function: Callable[[], Any], reset: Callable[[], None], repeat: int) -> tuple[float, int]:
+    """Best time of repeat calls, and peak memory allocated during one more call under tracemalloc"""
+    times = []
+    for _ in range(repeat):
+        reset()
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+
+    reset()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def edit_selection_cases(mark_sharps: Any, mesh: mock_bpy.Mesh
+                         ) -> Iterator[tuple[str, Callable[[], Any], Callable[[], None], int, str]]:
+    """Finding the edit-mode selection (the last EDIT_SELECTED_FACES faces, where a scan finds them last), from the
+    selection history and by visiting the edges"""
+    bm = mock_bpy.bmesh.from_edit_mesh(mesh)
+    faces = bm.faces[-EDIT_SELECTED_FACES:]
+    for face in faces:
+        face.select = True
+        for edge in face.edges:
+            edge.select = True
+    count = int(sum(edge.select for edge in bm.edges))
+    history = {"history": faces, "scan": []}
+    for name, elements in history.items():
+        def find(elements: list = elements) -> None:
+            bm.select_history = elements
+            mark_sharps.selected_edges(bm, count)
+        yield f"edit-selected/{name}", find, lambda: None, count, "edges"
+
+
+def cases(addon: Any, scenario: str, meshes: list[mock_bpy.Mesh], args: argparse.Namespace
+          ) -> Iterator[tuple[str, Callable[[], Any], Callable[[], None], int, str]]:
+    """(path name, function, reset, items processed, item unit) for each path to run on the scenario's meshes"""
+    mark_sharps = addon.lib.mark_sharps
+    process = addon.lib.process
+    object_lib = addon.lib.object
+    parallel = addon.lib.parallel
+    edges = sum(len(mesh.edges) for mesh in meshes)
+
+    def reset() -> None:
+        clear_sharp(meshes)
+        addon.lib.angle_cache.cache.clear()
+
+    if scenario not in ("small", "several"):
+        for engine in mark_sharps.Engine:
+            if engine == mark_sharps.Engine.BMESH and edges > args.bmesh_max_edges:
+                continue
+            yield (engine.name,
+                   lambda engine=engine: mark_sharps.mark_auto_smooth(meshes[0], engine=engine, use_cache=False),
+                   reset, edges, "edges")
+        if edges <= args.bmesh_max_edges:
+            yield from edit_selection_cases(mark_sharps, meshes[0])
+        return
+
+    def run_job(engine: Any, executor: Any = None) -> None:
+        settings = process.MarkSettings(engine=engine, deduplicate=False, incremental=False)
+        process.ProcessJob(meshes, settings, executor).run()
+
+    for engine in mark_sharps.Engine:
+        if engine == mark_sharps.Engine.BMESH and edges > args.bmesh_max_edges:
+            continue
+        yield f"process/{engine.name}", lambda engine=engine: run_job(engine), reset, edges, "edges"
+    for backend in (parallel.Backend.THREAD, parallel.Backend.PROCESS):
+        for workers in args.workers:
+            executor = parallel.MaskExecutor(backend, workers)
+            try:
+                yield f"process/NUMPY-{backend.name}-{workers}", \
+                    lambda: run_job(mark_sharps.Engine.NUMPY, executor), reset, edges, "edges"
+            finally:
+                executor.shutdown()
+
+    if scenario != "small":
+        return
+
+    selection = mock_bpy.bpy.context.selected_objects
+    shared_index = object_lib.MeshIndex()
+    traversals = {
+        "deep": lambda: object_lib.get_meshes_multiple(selection),
+        "deep-shared-index": lambda: object_lib.get_meshes_multiple(selection, index=shared_index),
+        "shallow": lambda: object_lib.get_meshes_shallow(selection),
+    }
+    for name, traverse in traversals.items():
+        yield f"traverse/{name}", traverse, lambda: None, len(selection), "objects"
+
+
+def run_suite(addon: Any, args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for size in args.sizes:
+        for scenario in args.scenarios:
+            mock_bpy.reset()
+            meshes = GENERATORS[scenario](parse_size(size))
+            edges = sum(len(mesh.edges) for mesh in meshes)
+            for path, function, reset, items, unit in cases(addon, scenario, meshes, args):
+                repeat = 1 if edges >= args.single_run_edges else args.repeat
+                seconds, peak = measure(function, reset, repeat)
+                result = {"case": f"{scenario}/{format_size(parse_size(size))}/{path}", "scenario": scenario,
+                          "path": path, "meshes": len(meshes), "edges": edges, "items": items, "unit": unit,
+                          "seconds": seconds, "items_per_second": items / seconds if seconds else 0.0,
+                          "peak_memory": peak}
+                results.append(result)
+                print(f"{result['case']:<40} {edges:>12,} edges {seconds:>10.4f}s "
+                      f"{result['items_per_second']:>14,.0f} {unit}/s {peak / 2 ** 20:>10.1f} MB", flush=True)
+    return results
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], time_tolerance: float,
+            memory_tolerance: float) -> list[str]:
+    """Descriptions of the results that regressed past the baseline"""
+    baseline_cases = {result["case"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_cases.get(result["case"])
+        if before is None:
+            continue
+        time_limit = before["seconds"] * (1 + time_tolerance) + TIME_SLACK
+        if result["seconds"] > time_limit:
+            regressions.append(f"{result['case']}: {result['seconds']:.4f}s, baseline {before['seconds']:.4f}s")
+        memory_limit = before["peak_memory"] * (1 + memory_tolerance)
+        if result["peak_memory"] > memory_limit:
+            regressions.append(f"{result['case']}: peak memory {result['peak_memory']:,} bytes, "
+                               f"baseline {before['peak_memory']:,} bytes")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="Mesh sizes in edges, e.g. 1k 10k 100k 1M 10M (default: %(default)s)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the best time of (default: %(default)s)")
+    parser.add_argument("--single-run-edges", type=parse_size, default="1M",
+                        help="Run cases with at least this many edges only once (default: %(default)s)")
+    parser.add_argument("--bmesh-max-edges", type=parse_size, default="100k",
+                        help="Skip the BMesh engine and the edit-mode selection cases (which build a BMesh) above this "
+                             "many edges, as they are slow (default: %(default)s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="Pool worker counts to run the pool cases with (default: %(default)s)")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="Fraction slower than the baseline that counts as a regression (default: %(default)s)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25,
+                        help="Fraction more memory than the baseline that counts as a regression "
+                             "(default: %(default)s)")
+    args = parser.parse_args()
+
+    addon = mock_bpy.load_addon()
+    results = run_suite(addon, args)
+    report = {"created": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+              "numpy": np.__version__, "machine": platform.machine(), "platform": platform.platform(),
+              "results": results}
+    args.output.write_text(json.dumps(report, indent=1))
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=1))
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline} to compare with")
+        return
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.time_tolerance,
+                          args.memory_tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Writes small .blend files for testing src/cli/blend_scan.py without Blender: just the file header, Mesh and Library
+blocks, an unrelated Object block, and an SDNA block describing them, laid out as Blender writes them:
+
+    python tools/blend_fixtures.py OUTPUT_DIR
+
+The set written (by write_fixtures) covers uncompressed, gzip and Zstandard files (Zstandard needs Python 3.14+ or the
+zstandard package, and is left out without them), meshes with and without Auto Smooth, 32-bit big-endian files, the
+DNA field names of Blender 4.x, a file linking a library, and a file with the newer header of Blender 5.0+. write_blend
+writes other variants.
+
+This script only uses the standard library (plus zstandard, if installed).
+"""
+
+import argparse
+import gzip
+import struct
+from dataclasses import dataclass
+from math import radians
+from pathlib import Path
+from typing import Iterable
+
+# Mesh.flag bit of Auto Smooth (ME_AUTOSMOOTH in DNA_mesh_types.h)
+ME_AUTOSMOOTH = 1 << 5
+# Blender writes Zstandard files as independent frames of this much data
+ZSTD_FRAME_SIZE = 256
+
+_BASIC_TYPES = {"char": 1, "short": 2, "int": 4, "float": 4, "void": 0}
+_FORMATS = {"short": "h", "int": "i", "float": "f"}
+
+
+@dataclass
+class FixtureMesh:
+    name: str
+    auto_smooth: bool = True
+    # Auto Smooth angle, in radians
+    angle: float = radians(30)
+    edges: int = 12
+    polys: int = 6
+    loops: int = 24
+
+
+def _mesh_fields(version: int) -> tuple[str, str, str, str]:
+    """The DNA names of the Mesh edge, face and loop counts and Auto Smooth angle in the given Blender version"""
+    if version >= 400:
+        return "edges_num", "faces_num", "corners_num", "smoothresh_legacy"
+    return "totedge", "totpoly", "totloop", "smoothresh"
+
+
+def _structs(version: int) -> dict[str, list[tuple[str, str]]]:
+    """The (type, name) fields of each struct, named as the given Blender version names them"""
+    edges, polys, loops, angle = _mesh_fields(version)
+    return {
+        "ID": [("void", "*next"), ("void", "*prev"), ("char", "name[66]"), ("short", "flag"), ("int", "tag")],
+        "Mesh": [("ID", "id"), ("void", "*adt"), ("int", "totvert"), ("int", edges), ("int", polys),
+                 ("int", loops), ("short", "flag"), ("char", "_pad[2]"), ("float", angle), ("void", "**mat")],
+        "Library": [("ID", "id"), ("void", "*filedata"), ("char", "filepath[1024]")],
+        "Object": [("ID", "id"), ("void", "*data")],
+    }
+
+
+class _Layout:
+    """The SDNA block of the structs, and each struct's field offsets and size"""
+
+    def __init__(self, endian: str, pointer_size: int, version: int):
+        self.endian = endian
+        self.pointer_size = pointer_size
+        structs = _structs(version)
+        self.types = list(_BASIC_TYPES) + list(structs)
+        self.names = list(dict.fromkeys(name for fields in structs.values() for _, name in fields))
+        self.sizes = dict(_BASIC_TYPES)
+        # (type, offset) of each struct's fields by name
+        self.fields: dict[str, dict[str, tuple[str, int]]] = {}
+        for struct_name, fields in structs.items():
+            offset = 0
+            self.fields[struct_name] = {}
+            for type_name, name in fields:
+                self.fields[struct_name][name] = type_name, offset
+                offset += self._field_size(type_name, name)
+            self.sizes[struct_name] = offset
+        self.struct_index = {struct_name: index for index, struct_name in enumerate(structs)}
+        self.sdna = self._sdna(structs)
+
+    def _field_size(self, type_name: str, name: str) -> int:
+        size = self.pointer_size if name.startswith("*") else self.sizes[type_name]
+        for dimension in name.split("[")[1:]:
+            size *= int(dimension.rstrip("]"))
+        return size
+
+    def _sdna(self, structs: dict[str, list[tuple[str, str]]]) -> bytes:
+        def strings(tag: bytes, values: list[str]) -> bytes:
+            data = tag + struct.pack(f"{self.endian}i", len(values)) + b"".join(v.encode() + b"\0" for v in values)
+            return data + b"\0" * (-len(data) % 4)
+
+        data = b"SDNA" + strings(b"NAME", self.names) + strings(b"TYPE", self.types)
+        data += b"TLEN" + struct.pack(f"{self.endian}{len(self.types)}H", *(self.sizes[t] for t in self.types))
+        data += b"\0" * (-len(data) % 4)
+        data += b"STRC" + struct.pack(f"{self.endian}i", len(structs))
+        for struct_name, fields in structs.items():
+            data += struct.pack(f"{self.endian}2h", self.types.index(struct_name), len(fields))
+            for type_name, name in fields:
+                data += struct.pack(f"{self.endian}2h", self.types.index(type_name), self.names.index(name))
+        return data
+
+    def block(self, code: bytes, struct_name: str | None, data: bytes) -> bytes:
+        """A block: code, data length, old address, SDNA struct index, struct count, then the data"""
+        header = struct.Struct(self.endian + ("4siIii" if self.pointer_size == 4 else "4siQii"))
+        index = self.struct_index[struct_name] if struct_name else 0
+        return header.pack(code, len(data), 0x1000, index, 1) + data
+
+    def id_block(self, struct_name: str, code: str, name: str, values: dict[str, int | float | bytes]) -> bytes:
+        """A block of one struct, with the ID name and the given fields set (char arrays to bytes)"""
+        data = bytearray(self.sizes[struct_name])
+        values = {"id": (code + name).encode()[:65], **values}
+        for field, value in values.items():
+            type_name, offset = self.fields[struct_name][field]
+            if field == "id":
+                offset += self.fields["ID"]["name[66]"][1]
+            if isinstance(value, bytes):
+                data[offset:offset + len(value)] = value
+            else:
+                struct.pack_into(self.endian + _FORMATS[type_name], data, offset, value)
+        return self.block(code.encode().ljust(4, b"\0"), struct_name, bytes(data))
+
+
+def compress_zstd(data: bytes) -> bytes:
+    """Compress as Blender does, in independent frames. Raises ImportError without a Zstandard module."""
+    try:
+        # Python 3.14+
+        from compression.zstd import compress
+    except ImportError:
+        import zstandard
+        compress = zstandard.ZstdCompressor().compress
+    return b"".join(compress(data[start:start + ZSTD_FRAME_SIZE]) for start in range(0, len(data), ZSTD_FRAME_SIZE))
+
+
+def zstd_available() -> bool:
+    try:
+        compress_zstd(b"")
+    except ImportError:
+        return False
+    return True
+
+
+def _compress(data: bytes, compression: str | None) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "zstd":
+        return compress_zstd(data)
+    return data
+
+
+def write_blend(path: Path, meshes: Iterable[FixtureMesh] = (), libraries: Iterable[str] = (),
+                compression: str | None = None, endian: str = "<", pointer_size: int = 8, version: int = 306) -> Path:
+    """Write a .blend file with the meshes and linked library paths (written as given, e.g. "//lib.blend")"""
+    layout = _Layout(endian, pointer_size, version)
+    header = "BLENDER" + {8: "-", 4: "_"}[pointer_size] + {"<": "v", ">": "V"}[endian] + str(version)
+    data = header.encode()
+    data += layout.id_block("Object", "OB", "Unrelated", {})
+    for library in libraries:
+        data += layout.id_block("Library", "LI", Path(library).name, {"filepath[1024]": library.encode()})
+    edges, polys, loops, angle = _mesh_fields(version)
+    for mesh in meshes:
+        data += layout.id_block("Mesh", "ME", mesh.name, {
+            "totvert": mesh.loops, edges: mesh.edges, polys: mesh.polys, loops: mesh.loops,
+            "flag": ME_AUTOSMOOTH if mesh.auto_smooth else 0, angle: mesh.angle,
+        })
+    data += layout.block(b"DNA1", None, layout.sdna) + layout.block(b"ENDB", None, b"")
+    path = Path(path)
+    path.write_bytes(_compress(data, compression))
+    return path
+
+
+def write_newer_blend(path: Path, compression: str | None = None) -> Path:
+    """Write a file with the header of Blender 5.0+ (which has no Auto Smooth), and nothing else the scanner reads"""
+    path = Path(path)
+    path.write_bytes(_compress(b"BLENDER17-01v0500" + b"\0" * 64, compression))
+    return path
+
+
+def write_fixtures(directory: Path) -> dict[str, Path]:
+    """Write the fixture set into the directory, returning the files by fixture name"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meshes = [FixtureMesh("Cube"), FixtureMesh("Plane", auto_smooth=False, edges=4, polys=1, loops=4),
+              FixtureMesh("Scan", angle=radians(45), edges=30_000, polys=10_000, loops=40_000)]
+    compressions = ["gzip", "zstd"] if zstd_available() else ["gzip"]
+    written = {"plain": write_blend(directory / "plain.blend", meshes)}
+    for compression in compressions:
+        written[compression] = write_blend(directory / f"{compression}.blend", meshes, compression=compression)
+    written["no_auto_smooth"] = write_blend(directory / "no_auto_smooth.blend", [meshes[1]])
+    written["big_endian_32bit"] = write_blend(directory / "big_endian_32bit.blend", meshes, endian=">",
+                                              pointer_size=4)
+    written["blender_4"] = write_blend(directory / "blender_4.blend", meshes, version=402)
+    written["library"] = write_blend(directory / "library.blend", [FixtureMesh("Linked")])
+    written["linking"] = write_blend(directory / "linking.blend", [meshes[1]], libraries=["//library.blend"])
+    written["newer_header"] = write_newer_blend(directory / "newer_header.blend")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir", type=Path)
+    args = parser.parse_args()
+    for name, path in write_fixtures(args.output_dir).items():
+        print(f"{name:>18} {path}")
+
+
+if __name__ == "__main__":
+    main()
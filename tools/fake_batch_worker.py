@@ -0,0 +1,58 @@
+"""
+A stand-in for src/cli/batch_worker.py that speaks the same line protocol without Blender, for exercising the batch
+converter's orchestration:
+
+    python src/cli/batch_convert.py files/ --worker-command "python tools/fake_batch_worker.py"
+
+How it handles a file depends on the file name:
+ - "crash" in the name: the worker exits without answering
+ - "hang" in the name: the worker stops responding
+ - "fail" in the name: the worker answers with a failed status
+ - anything else: the worker answers with an ok status
+
+If FILE.libraries exists, the paths listed in it (one per line) are reported as the libraries FILE links meshes from.
+"""
+
+import json
+import os
+import sys
+import time
+
+PROTOCOL_PREFIX = "@@mark_sharps "
+
+
+def emit(message: dict) -> None:
+    sys.stdout.write(PROTOCOL_PREFIX + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main() -> None:
+    delay = float(os.environ.get("FAKE_WORKER_DELAY", "0.01"))
+    # Blender prints its own output around the protocol messages
+    print("Blender 3.6.0 (hash 000000000000 built 2023-06-27 00:00:00)", flush=True)
+    emit({"event": "ready"})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        path = request["path"]
+        name = os.path.basename(path)
+        print(f"Read blend: {path}", flush=True)
+        time.sleep(delay)
+        if "crash" in name:
+            sys.exit(11)
+        if "hang" in name:
+            time.sleep(3600)
+        if "fail" in name:
+            emit({"event": "done", "path": path, "status": "failed", "error": "Simulated failure"})
+            continue
+        libraries = []
+        if os.path.exists(path + ".libraries"):
+            with open(path + ".libraries", "r") as listing:
+                libraries = [line.strip() for line in listing if line.strip()]
+        emit({"event": "done", "path": path, "status": "ok", "meshes": 1, "libraries": libraries,
+              "output": request.get("output", path), "pid": os.getpid()})
+
+
+if __name__ == "__main__":
+    main()
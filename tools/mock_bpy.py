@@ -0,0 +1,686 @@
+"""
+A minimal stand-in for the parts of bpy and bmesh the Mark Sharps addon uses, so the addon's pipeline (get_meshes,
+mark_auto_smooth and the operators) can run and be timed under plain CPython, without a Blender process.
+
+Usage:
+    import mock_bpy
+    mock_bpy.install()
+    addon = mock_bpy.load_addon()
+    mesh = mock_bpy.bpy.data.meshes.new("Cube")
+    mesh.from_pydata(vertices, [], faces)
+    result, reports = mock_bpy.run_operator(addon.operator.mark_sharps.mesh_OT_mark_sharps_file)
+
+This is only as faithful as it needs to be for the addon. Face normals are calculated with the addon's own core
+module, so a mesh is only usable after load_addon() has been called.
+"""
+
+import importlib
+import importlib.util
+import itertools
+import math
+import sys
+import types
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+ADDON_SOURCE = Path(__file__).resolve().parents[1] / "src"
+ADDON_NAME = "mark_sharps"
+
+
+# bpy.props
+
+
+class _Property:
+    def __init__(self, kind: str, **kwargs):
+        self.kind = kind
+        self.keywords = kwargs
+
+    @property
+    def default(self) -> Any:
+        if "default" in self.keywords:
+            return self.keywords["default"]
+        if self.kind == "EnumProperty":
+            return self.keywords["items"][0][0]
+        return {"BoolProperty": False, "FloatProperty": 0.0, "IntProperty": 0, "StringProperty": ""}.get(self.kind)
+
+
+def _property_function(kind: str) -> Callable:
+    def prop(**kwargs) -> _Property:
+        return _Property(kind, **kwargs)
+
+    prop.__name__ = kind
+    return prop
+
+
+def _annotated_properties(cls: type) -> dict[str, _Property]:
+    props = {}
+    for base in reversed(cls.__mro__):
+        for name, value in vars(base).get("__annotations__", {}).items():
+            if isinstance(value, _Property):
+                props[name] = value
+    return props
+
+
+class _PropertyOwner:
+    """Base for bpy.types classes that hold properties declared as annotations"""
+
+    def __init__(self, **props):
+        for name, prop in _annotated_properties(type(self)).items():
+            setattr(self, name, prop.default)
+        for name, value in props.items():
+            setattr(self, name, value)
+
+
+# Mesh data
+
+
+class _ElementCollection:
+    """A mesh element collection (vertices, edges, polygons, loops) backed by NumPy arrays"""
+
+    def __init__(self, mesh: "Mesh", length: int, attributes: dict[str, np.ndarray]):
+        self._mesh = mesh
+        self._length = length
+        self._attributes = attributes
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _attribute(self, name: str) -> np.ndarray:
+        if name == "normal" and self is self._mesh.polygons:
+            return self._mesh._poly_normals()
+        return self._attributes[name]
+
+    def foreach_get(self, name: str, seq: np.ndarray) -> None:
+        values = self._attribute(name).ravel()
+        if len(seq) != len(values):
+            raise RuntimeError(f"internal error setting the array: {name} expects {len(values)} items")
+        seq[:] = values
+
+    def foreach_set(self, name: str, seq: Iterable) -> None:
+        values = self._attribute(name)
+        seq = np.asarray(seq)
+        if seq.size != values.size:
+            raise RuntimeError(f"internal error setting the array: {name} expects {values.size} items")
+        values[...] = seq.reshape(values.shape)
+
+
+class ID:
+    _session_uids = itertools.count(1)
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.session_uid = next(ID._session_uids)
+        self.library = None
+        self.users = 1
+        self._properties = {}
+
+    @property
+    def name_full(self) -> str:
+        return self.name
+
+    @property
+    def original(self) -> "ID":
+        # There are no evaluated copies here, so every ID is its own original
+        return self
+
+    def as_pointer(self) -> int:
+        return id(self)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._properties[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._properties[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._properties[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._properties
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._properties.get(key, default)
+
+    def update_tag(self, refresh: set = frozenset()) -> None:
+        pass
+
+
+class Mesh(ID):
+    def __init__(self, name: str = "Mesh"):
+        super().__init__(name)
+        self.use_auto_smooth = False
+        self.auto_smooth_angle = math.radians(30)
+        self.update_count = 0
+        self.from_pydata([], [], [])
+
+    def from_pydata(self, vertices: Iterable, edges: Iterable, faces: Iterable) -> None:
+        coords = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        faces = [list(face) for face in faces]
+        loop_totals = np.array([len(face) for face in faces], dtype=np.int32)
+        loop_verts = np.array([v for face in faces for v in face], dtype=np.int32)
+
+        # Edges are the explicit (loose) edges plus the sides of every face, deduplicated
+        edge_index = {}
+        for edge in edges:
+            edge_index.setdefault(tuple(sorted(edge)), len(edge_index))
+        loop_edges = np.empty(len(loop_verts), dtype=np.int32)
+        loop = 0
+        for face in faces:
+            for corner, vert in enumerate(face):
+                key = tuple(sorted((vert, face[(corner + 1) % len(face)])))
+                loop_edges[loop] = edge_index.setdefault(key, len(edge_index))
+                loop += 1
+
+        self.set_arrays(coords, np.array(list(edge_index), dtype=np.int32).reshape(-1, 2),
+                        np.cumsum(loop_totals) - loop_totals, loop_totals, loop_verts, loop_edges)
+
+    def set_arrays(self, coords: np.ndarray, edge_verts: np.ndarray, loop_starts: np.ndarray, loop_totals: np.ndarray,
+                   loop_verts: np.ndarray, loop_edges: np.ndarray, sharp: np.ndarray = None) -> None:
+        """Set the mesh geometry directly from arrays, for generating large meshes quickly"""
+        edge_count = len(edge_verts)
+        self.vertices = _ElementCollection(self, len(coords), {"co": np.asarray(coords, dtype=np.float32)})
+        self.edges = _ElementCollection(self, edge_count, {
+            "vertices": np.asarray(edge_verts, dtype=np.int32),
+            "use_edge_sharp": np.zeros(edge_count, dtype=bool) if sharp is None else np.asarray(sharp, dtype=bool),
+            "select": np.zeros(edge_count, dtype=bool),
+        })
+        self.polygons = _ElementCollection(self, len(loop_totals), {
+            "loop_start": np.asarray(loop_starts, dtype=np.int32),
+            "loop_total": np.asarray(loop_totals, dtype=np.int32),
+            "use_smooth": np.ones(len(loop_totals), dtype=bool),
+        })
+        self.loops = _ElementCollection(self, len(loop_verts), {
+            "vertex_index": np.asarray(loop_verts, dtype=np.int32),
+            "edge_index": np.asarray(loop_edges, dtype=np.int32),
+        })
+        self._normals = None
+        self._edit_bmesh = None
+
+    @property
+    def total_edge_sel(self) -> int:
+        return int(np.count_nonzero(self.edges._attributes["select"]))
+
+    def _poly_normals(self) -> np.ndarray:
+        if self._normals is None:
+            core = importlib.import_module(f"{ADDON_NAME}.lib.core")
+            self._normals = core.poly_normals(self.vertices._attributes["co"], self.polygons._attributes["loop_start"],
+                                              self.polygons._attributes["loop_total"],
+                                              self.loops._attributes["vertex_index"])
+        return self._normals
+
+    def update(self) -> None:
+        self._normals = None
+        self.update_count += 1
+
+
+class Text(ID):
+    def __init__(self, name: str = "Text"):
+        super().__init__(name)
+        self._body = ""
+
+    def clear(self) -> None:
+        self._body = ""
+
+    def write(self, text: str) -> None:
+        self._body += text
+
+    def as_string(self) -> str:
+        return self._body
+
+
+class Library(ID):
+    def __init__(self, name: str = "Library", filepath: str = ""):
+        super().__init__(name)
+        self.filepath = filepath or f"//{name}"
+        self.parent = None
+        self.reload_count = 0
+
+    def reload(self) -> None:
+        self.reload_count += 1
+
+
+class Object(ID):
+    def __init__(self, name: str = "Object", data: ID = None):
+        super().__init__(name)
+        self.data = data
+        self.instance_type = "NONE"
+        self.instance_collection = None
+        self.children = []
+        self._selected = False
+
+    def select_get(self) -> bool:
+        return self._selected
+
+    def select_set(self, state: bool) -> None:
+        self._selected = state
+
+
+class Collection(ID):
+    def __init__(self, name: str = "Collection"):
+        super().__init__(name)
+        self.objects = []
+        self.children = []
+
+    @property
+    def children_recursive(self) -> list["Collection"]:
+        found = []
+        for child in self.children:
+            found.append(child)
+            found.extend(c for c in child.children_recursive if c not in found)
+        return found
+
+    @property
+    def all_objects(self) -> list[Object]:
+        found = list(self.objects)
+        for child in self.children_recursive:
+            found.extend(obj for obj in child.objects if obj not in found)
+        return found
+
+
+class _IDCollection(list):
+    def __init__(self, id_type: type):
+        super().__init__()
+        self._id_type = id_type
+
+    def new(self, name: str, *args) -> ID:
+        item = self._id_type(name, *args)
+        self.append(item)
+        return item
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return next((item for item in self if item.name == name), default)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        return super().__getitem__(key)
+
+
+# bpy.types
+
+
+class Operator(_PropertyOwner):
+    bl_idname = ""
+    bl_label = ""
+    bl_options = set()
+    poll_message = None
+
+    def __init__(self, **props):
+        super().__init__(**props)
+        self.reports = []
+
+    def report(self, level: set[str], message: str) -> None:
+        self.reports.append((next(iter(level)), message))
+
+    @classmethod
+    def poll_message_set(cls, message: str, *args) -> None:
+        cls.poll_message = message
+
+
+class UILayout:
+    """Records what is drawn. Operators are polled as they're drawn, as Blender does to gray out the ones that can't
+    run."""
+
+    def __init__(self):
+        self.operator_context = "INVOKE_DEFAULT"
+        # (kind, name, text, enabled) of each item, including those of the columns and rows drawn in it
+        self.items: list[tuple[str, str, str | None, bool]] = []
+
+    def operator(self, idname: str, text: str = None, **kwargs) -> None:
+        cls = next((cls for cls in bpy.utils.registered_classes if getattr(cls, "bl_idname", None) == idname), None)
+        enabled = cls is not None and (not hasattr(cls, "poll") or cls.poll(bpy.context))
+        self.items.append(("operator", idname, text, enabled))
+
+    def menu(self, idname: str, text: str = None, **kwargs) -> None:
+        self.items.append(("menu", idname, text, True))
+
+    def label(self, text: str = "", **kwargs) -> None:
+        self.items.append(("label", text, text, True))
+
+    def separator(self) -> None:
+        pass
+
+    def prop(self, data: Any, name: str, **kwargs) -> None:
+        self.items.append(("prop", name, kwargs.get("text"), True))
+
+    def column(self, **kwargs) -> "UILayout":
+        return self
+
+    def row(self, **kwargs) -> "UILayout":
+        return self
+
+
+class Menu(_PropertyOwner):
+    pass
+
+
+class Panel(_PropertyOwner):
+    pass
+
+
+class AddonPreferences(_PropertyOwner):
+    pass
+
+
+class PropertyGroup(_PropertyOwner):
+    pass
+
+
+class _WindowManager:
+    def __init__(self):
+        self.progress = None
+        self.timers = []
+        self.modal_handlers = []
+
+    def event_timer_add(self, time_step: float, window: Any = None) -> object:
+        timer = types.SimpleNamespace(time_step=time_step)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer: object) -> None:
+        self.timers.remove(timer)
+
+    def modal_handler_add(self, operator: Operator) -> bool:
+        self.modal_handlers.append(operator)
+        return True
+
+    def progress_begin(self, low: float, high: float) -> None:
+        self.progress = low
+
+    def progress_update(self, value: float) -> None:
+        self.progress = value
+
+    def progress_end(self) -> None:
+        self.progress = None
+
+
+class Context:
+    def __init__(self):
+        self.selected_objects = []
+        self.window_manager = _WindowManager()
+        self.preferences = types.SimpleNamespace(addons={})
+        self.mode = "OBJECT"
+        self.objects_in_mode_unique_data = []
+        self.window = None
+        self.view_layer = ID("ViewLayer")
+
+
+bpy = types.ModuleType("bpy")
+bmesh = types.ModuleType("bmesh")
+bpy_extras = types.ModuleType("bpy_extras")
+
+
+def reset() -> None:
+    """Clear all data, selection and registration state"""
+    bpy.data = types.SimpleNamespace(meshes=_IDCollection(Mesh), objects=_IDCollection(Object),
+                                     collections=_IDCollection(Collection), libraries=_IDCollection(Library),
+                                     texts=_IDCollection(Text),
+                                     filepath="")
+    bpy.context = Context()
+    for cls in getattr(bpy.utils, "registered_classes", []):
+        del cls.bl_rna
+    bpy.utils.registered_classes = []
+    for handlers in vars(bpy.app.handlers).values():
+        if isinstance(handlers, list):
+            handlers.clear()
+    bpy.app.timers.registered = []
+
+
+def _register_class(cls: type) -> None:
+    if cls in bpy.utils.registered_classes:
+        raise ValueError(f"register_class(...): already registered as a subclass '{cls.__name__}'")
+    bpy.utils.registered_classes.append(cls)
+    cls.bl_rna = types.SimpleNamespace(identifier=cls.__name__)
+
+
+def _unregister_class(cls: type) -> None:
+    if cls not in bpy.utils.registered_classes:
+        raise RuntimeError(f"unregister_class(...): missing bl_rna attribute from '{cls.__name__}'")
+    bpy.utils.registered_classes.remove(cls)
+    del cls.bl_rna
+
+
+def _timer_register(function: Callable, first_interval: float = 0, persistent: bool = False) -> None:
+    bpy.app.timers.registered.append(function)
+
+
+def _timer_unregister(function: Callable) -> None:
+    bpy.app.timers.registered.remove(function)
+
+
+def _timer_is_registered(function: Callable) -> bool:
+    return function in bpy.app.timers.registered
+
+
+def _persistent(function: Callable) -> Callable:
+    function._bpy_persistent = True
+    return function
+
+
+def _draw_hooks() -> type:
+    class DrawHookType:
+        """A menu or header type that draw functions can be appended to"""
+
+        def __init__(self):
+            self.draw_functions = []
+
+        def append(self, function: Callable) -> None:
+            self.draw_functions.append(function)
+
+        def remove(self, function: Callable) -> None:
+            self.draw_functions.remove(function)
+
+    return DrawHookType
+
+
+def _build_modules() -> None:
+    bpy.types = types.ModuleType("bpy.types")
+    for cls in (Operator, Menu, UILayout, Panel, AddonPreferences, PropertyGroup, Context, ID, Mesh, Text, Library,
+                Object, Collection):
+        setattr(bpy.types, cls.__name__, cls)
+    draw_hook_type = _draw_hooks()
+    for name in ("VIEW3D_MT_editor_menus", "VIEW3D_MT_object_context_menu", "VIEW3D_MT_edit_mesh_context_menu",
+                 "TOPBAR_MT_file_import", "TOPBAR_MT_file_export"):
+        setattr(bpy.types, name, draw_hook_type())
+
+    bpy.props = types.ModuleType("bpy.props")
+    for kind in ("BoolProperty", "EnumProperty", "FloatProperty", "IntProperty", "StringProperty"):
+        setattr(bpy.props, kind, _property_function(kind))
+
+    bpy.path = types.ModuleType("bpy.path")
+    bpy.path.abspath = lambda path, library=None: str(Path(path[2:] if path.startswith("//") else path).resolve())
+
+    bpy.utils = types.ModuleType("bpy.utils")
+    bpy.utils.register_class = _register_class
+    bpy.utils.unregister_class = _unregister_class
+
+    bpy.app = types.ModuleType("bpy.app")
+    bpy.app.version = (3, 6, 0)
+    bpy.app.version_string = "3.6.0"
+    bpy.app.background = True
+    bpy.app.debug = False
+    bpy.app.debug_python = False
+    bpy.app.binary_path = ""
+    bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+    for name in ("load_post", "load_pre", "depsgraph_update_post", "save_pre", "undo_post", "redo_post"):
+        setattr(bpy.app.handlers, name, [])
+    bpy.app.handlers.persistent = _persistent
+    bpy.app.timers = types.SimpleNamespace(register=_timer_register, unregister=_timer_unregister,
+                                           is_registered=_timer_is_registered, registered=[])
+
+    bpy_extras.io_utils = types.ModuleType("bpy_extras.io_utils")
+    bpy_extras.io_utils.ExportHelper = type("ExportHelper", (), {"__annotations__": {
+        "filepath": bpy.props.StringProperty(subtype="FILE_PATH")}})
+    bpy_extras.io_utils.ImportHelper = type("ImportHelper", (), {"__annotations__": {
+        "filepath": bpy.props.StringProperty(subtype="FILE_PATH")}})
+
+    bmesh.new = lambda: BMesh()
+    bmesh.types = types.ModuleType("bmesh.types")
+    bmesh.types.BMesh = BMesh
+    bmesh.types.BMEdge = BMEdge
+    bmesh.types.BMFace = BMFace
+    bmesh.from_edit_mesh = _from_edit_mesh
+    bmesh.update_edit_mesh = _update_edit_mesh
+    reset()
+
+
+# bmesh
+
+
+class BMEdge:
+    def __init__(self, bm: "BMesh", index: int, smooth: bool, select: bool = False):
+        self._bm = bm
+        self.index = index
+        self.smooth = smooth
+        self.select = select
+
+    def calc_face_angle(self, fallback: Any = None) -> float:
+        faces = self._bm.edge_faces[self.index]
+        if len(faces) != 2:
+            if fallback is None:
+                raise ValueError("BMEdge.calc_face_angle(): edge is not manifold")
+            return fallback
+        a, b = (self._bm.normals[face].astype(np.float64) for face in faces)
+        # Blender's angle_normalized_v3v3
+        if np.dot(a, b) >= 0:
+            return 2.0 * math.asin(min(np.linalg.norm(a - b) / 2.0, 1.0))
+        return math.pi - 2.0 * math.asin(min(np.linalg.norm(a + b) / 2.0, 1.0))
+
+
+class BMFace:
+    def __init__(self, edges: list[BMEdge], select: bool = False):
+        self.edges = edges
+        self.select = select
+
+
+class BMesh:
+    """Just enough of a BMesh to run the addon's per-edge BMesh engine and its edit-mode selection"""
+
+    def __init__(self):
+        self.edges = []
+        self.edge_faces = []
+        self.normals = None
+        self.select_history = []
+        self._faces = None
+
+    @property
+    def faces(self) -> list[BMFace]:
+        # Built when first asked for, so the BMesh engine (which doesn't use them) doesn't pay for them
+        if self._faces is None:
+            face_edges = [[] for _ in range(len(self.normals))]
+            for edge, faces in zip(self.edges, self.edge_faces):
+                for face in faces:
+                    face_edges[face].append(edge)
+            self._faces = [BMFace(edges, all(edge.select for edge in edges)) for edges in face_edges]
+        return self._faces
+
+    def from_mesh(self, mesh: Mesh) -> None:
+        self.normals = mesh._poly_normals()
+        self._faces = None
+        polys = mesh.polygons._attributes
+        loop_edges = mesh.loops._attributes["edge_index"]
+        self.edge_faces = [[] for _ in range(len(mesh.edges))]
+        for face, (start, total) in enumerate(zip(polys["loop_start"], polys["loop_total"])):
+            for edge in loop_edges[start:start + total]:
+                self.edge_faces[edge].append(face)
+        sharp = mesh.edges._attributes["use_edge_sharp"]
+        select = mesh.edges._attributes["select"]
+        self.edges = [BMEdge(self, index, not sharp[index], select[index]) for index in range(len(mesh.edges))]
+
+    def to_mesh(self, mesh: Mesh) -> None:
+        mesh.edges.foreach_set("use_edge_sharp", [not edge.smooth for edge in self.edges])
+
+    def free(self) -> None:
+        self.edges = []
+        self.edge_faces = []
+        self.select_history = []
+        self._faces = None
+
+
+def _from_edit_mesh(mesh: Mesh) -> BMesh:
+    """The mesh's edit-mode BMesh, read from the mesh when first asked for (as entering edit mode would)"""
+    if mesh._edit_bmesh is None:
+        mesh._edit_bmesh = BMesh()
+        mesh._edit_bmesh.from_mesh(mesh)
+    return mesh._edit_bmesh
+
+
+def _update_edit_mesh(mesh: Mesh, loop_triangles: bool = True, destructive: bool = True) -> None:
+    # Write edits straight back, so tests can check the mesh without leaving edit mode
+    mesh._edit_bmesh.to_mesh(mesh)
+
+
+def install() -> types.ModuleType:
+    """Install the mock bpy and bmesh modules into sys.modules. Returns the mock bpy module."""
+    if not hasattr(bpy, "types"):
+        _build_modules()
+    sys.modules.update({
+        "bpy": bpy,
+        "bpy.types": bpy.types,
+        "bpy.props": bpy.props,
+        "bpy.utils": bpy.utils,
+        "bpy.path": bpy.path,
+        "bpy.app": bpy.app,
+        "bpy.app.handlers": bpy.app.handlers,
+        "bmesh": bmesh,
+        "bmesh.types": bmesh.types,
+        "bpy_extras": bpy_extras,
+        "bpy_extras.io_utils": bpy_extras.io_utils,
+    })
+    return bpy
+
+
+def load_addon(name: str = ADDON_NAME, source: Path = ADDON_SOURCE) -> types.ModuleType:
+    """Import the addon source directory as a package (as Blender would when it is installed) with the mock modules"""
+    install()
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, source / "__init__.py", submodule_search_locations=[str(source)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def draw_menus() -> UILayout:
+    """Draw the registered menus and the functions appended to Blender's menus, as opening each of them would"""
+    layout = UILayout()
+    owner = types.SimpleNamespace(layout=layout)
+    for hook in vars(bpy.types).values():
+        for function in getattr(hook, "draw_functions", []):
+            function(owner, bpy.context)
+    for cls in bpy.utils.registered_classes:
+        if issubclass(cls, Menu):
+            menu = cls()
+            menu.layout = layout
+            menu.draw(bpy.context)
+    return layout
+
+
+def run_operator(operator_class: type, invoke: bool = False, events: Iterable[str] = (),
+                 **props) -> tuple[set[str], list[tuple[str, str]]]:
+    """Poll and execute (or invoke) an operator class with the mock context. Returns the result set and the operator's
+    reports. A modal operator is sent the given event types, then TIMER events until it finishes."""
+    if hasattr(operator_class, "poll") and not operator_class.poll(bpy.context):
+        return {"CANCELLED"}, [("ERROR", operator_class.poll_message or "Poll failed")]
+    operator = operator_class(**props)
+    if not invoke:
+        return operator.execute(bpy.context), operator.reports
+
+    background = bpy.app.background
+    bpy.app.background = False
+    try:
+        result = operator.invoke(bpy.context, types.SimpleNamespace(type="NONE", value="NOTHING"))
+        events = iter(events)
+        while "RUNNING_MODAL" in result:
+            event_type = next(events, "TIMER")
+            result = operator.modal(bpy.context, types.SimpleNamespace(type=event_type, value="PRESS"))
+    finally:
+        bpy.app.background = background
+    bpy.context.window_manager.modal_handlers.clear()
+    return result, operator.reports
@@ -0,0 +1,114 @@
+"""
+Saves the .blend files in tests/fixtures/blend with Blender itself, for testing src/cli/blend_scan.py against files
+Blender wrote (where tools/blend_fixtures.py only writes what the scanner expects):
+
+    blender -b --factory-startup --python tools/save_blend_fixtures.py -- tests/fixtures/blend
+
+or, with the bpy module installed, python tools/save_blend_fixtures.py tests/fixtures/blend
+
+It saves library.blend, with a mesh "Linked" (compressed), and scene.blend, with objects using meshes "Cube" and
+"Plane" and "Linked", linked from //library.blend (uncompressed, and compressed as scene_compressed.blend). Where
+Blender still has Auto Smooth (before 4.1), "Cube" and "Linked" have it on, at 40° and 35°, and "Plane" has it off. It
+also copies Blender's own Sculpting template (saved by Blender 2.80) as sculpting_280.blend, gzip-compressed as Blender
+2.8x compressed files, for the older DNA field names.
+
+What Blender reports for each file (its meshes' edge, face and loop counts and Auto Smooth settings, and its libraries)
+is written to expected.json, which the tests compare the scanner's results with. The tests also use describe() to
+check, where the bpy module is installed, that Blender reads Auto Smooth where the scanner finds it.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+from math import radians
+
+import bpy
+
+SCULPTING_TEMPLATE = ("startup", "bl_app_templates_system", "Sculpting", "startup.blend")
+
+
+def output_dir() -> str:
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    if len(argv) != 1:
+        sys.exit("Usage: save_blend_fixtures.py OUTPUT_DIR")
+    return os.path.abspath(argv[0])
+
+
+def add_object(add, name: str, auto_smooth: bool, angle: float = radians(30)) -> bpy.types.Object:
+    add()
+    obj = bpy.context.object
+    obj.name = obj.data.name = name
+    mesh = obj.data
+    # Gone in Blender 4.1+
+    if hasattr(mesh, "use_auto_smooth"):
+        mesh.use_auto_smooth = auto_smooth
+        mesh.auto_smooth_angle = angle
+    return obj
+
+
+def auto_smooth(mesh: bpy.types.Mesh) -> tuple[bool, float | None]:
+    """The mesh's Auto Smooth setting and angle, which Blender 4.1+ turns into an Auto Smooth modifier on the objects
+    using it when it loads a file saved with Auto Smooth on"""
+    if hasattr(mesh, "use_auto_smooth"):
+        return mesh.use_auto_smooth, mesh.auto_smooth_angle if mesh.use_auto_smooth else None
+    for obj in bpy.data.objects:
+        if obj.data == mesh:
+            for modifier in obj.modifiers:
+                if modifier.type == 'NODES' and modifier.name == "Auto Smooth" and modifier.node_group is not None:
+                    angle = next(item.identifier for item in modifier.node_group.interface.items_tree
+                                 if item.item_type == 'SOCKET' and item.in_out == 'INPUT' and item.name == "Angle")
+                    return True, modifier[angle]
+    return False, None
+
+
+def describe(path: str) -> dict:
+    """What Blender reads from the file, in the scanner's terms"""
+    with open(path, "rb") as file:
+        magic = file.read(4)
+    compression = "gzip" if magic[:2] == b"\x1f\x8b" else "zstd" if magic == b"\x28\xb5\x2f\xfd" else None
+    bpy.ops.wm.open_mainfile(filepath=path, load_ui=False)
+    meshes = [{"name": mesh.name, **dict(zip(("auto_smooth", "angle"), auto_smooth(mesh))), "edges": len(mesh.edges),
+               "polys": len(mesh.polygons), "loops": len(mesh.loops)}
+              for mesh in bpy.data.meshes if mesh.library is None]
+    version = bpy.data.version
+    return {"version": f"{version[0]}{version[1]:02}", "compression": compression, "meshes": meshes,
+            "libraries": [library.filepath for library in bpy.data.libraries]}
+
+
+def main() -> None:
+    directory = output_dir()
+    os.makedirs(directory, exist_ok=True)
+    library_path = os.path.join(directory, "library.blend")
+
+    # Only the meshes and objects are written, with fake users to keep them, leaving out the UI and scene data that
+    # would make up most of the files
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    linked_mesh = add_object(bpy.ops.mesh.primitive_cube_add, "Linked", True, radians(35)).data
+    bpy.data.libraries.write(library_path, {linked_mesh}, fake_user=True, compress=True)
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    objects = {add_object(bpy.ops.mesh.primitive_cube_add, "Cube", True, radians(40)),
+               add_object(bpy.ops.mesh.primitive_plane_add, "Plane", False)}
+    with bpy.data.libraries.load(library_path, link=True, relative=True) as (_, linked):
+        linked.meshes = ["Linked"]
+    objects.add(bpy.data.objects.new("Linked", bpy.data.meshes["Linked"]))
+    for name, compress in (("scene.blend", False), ("scene_compressed.blend", True)):
+        bpy.data.libraries.write(os.path.join(directory, name), objects, fake_user=True, path_remap="RELATIVE_ALL",
+                                 compress=compress)
+
+    template = os.path.join(bpy.utils.system_resource('SCRIPTS'), *SCULPTING_TEMPLATE)
+    with open(template, "rb") as source, gzip.open(os.path.join(directory, "sculpting_280.blend"), "wb") as copy:
+        shutil.copyfileobj(source, copy)
+
+    expected = {name: describe(os.path.join(directory, name))
+                for name in ("library.blend", "scene.blend", "scene_compressed.blend", "sculpting_280.blend")}
+    expected["saved_by"] = bpy.app.version_string
+    with open(os.path.join(directory, "expected.json"), "w", encoding="utf-8") as file:
+        json.dump(expected, file, indent=1)
+    print(f"Saved the fixtures in {directory} with Blender {bpy.app.version_string}")
+
+
+if __name__ == "__main__":
+    main()